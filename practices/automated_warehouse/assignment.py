@@ -0,0 +1,56 @@
+import numpy as np
+
+
+def hungarian(costs: np.ndarray) -> list[tuple[int, int]]:
+    """
+    Solves the (rectangular) assignment problem for the given cost matrix,
+    using the shortest augmenting path version of the Hungarian algorithm,
+    with its inner loop vectorized. Runs in O(n^2 m) time for ``n <= m``.
+
+    Infinite costs mark forbidden pairs, which are never returned.
+    :return: The ``(row, column)`` pairs of a minimum cost assignment.
+    """
+    n, m = costs.shape
+    if not n or not m:
+        return []
+    if n > m:
+        return [(i, j) for j, i in hungarian(costs.T)]
+    finite: np.ndarray = np.isfinite(costs)
+    # Forbidden pairs get a cost higher than any complete assignment.
+    big: float = (np.abs(costs[finite]).max(initial=0.0) + 1.0) * (n + 1)
+    a: np.ndarray = np.where(finite, costs, big).astype(float)
+    # Potentials and matches are 1-indexed; column 0 is a sentinel.
+    u: np.ndarray = np.zeros(n + 1)
+    v: np.ndarray = np.zeros(m + 1)
+    match: np.ndarray = np.zeros(m + 1, dtype=int)
+    way: np.ndarray = np.zeros(m + 1, dtype=int)
+    for i in range(1, n + 1):
+        match[0] = i
+        j0: int = 0
+        min_v: np.ndarray = np.full(m + 1, np.inf)
+        used: np.ndarray = np.zeros(m + 1, dtype=bool)
+        while match[j0]:
+            used[j0] = True
+            i0: int = match[j0]
+            free: np.ndarray = ~used[1:]
+            reduced: np.ndarray = a[i0 - 1] - u[i0] - v[1:]
+            better: np.ndarray = free & (reduced < min_v[1:])
+            min_v[1:][better] = reduced[better]
+            way[1:][better] = j0
+            candidates: np.ndarray = np.where(free, min_v[1:], np.inf)
+            j1: int = int(np.argmin(candidates)) + 1
+            delta: float = candidates[j1 - 1]
+            u[match[used]] += delta
+            v[used] -= delta
+            min_v[1:][free] -= delta
+            j0 = j1
+        # Flips the augmenting path.
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+    return [
+        (int(match[j]) - 1, j - 1)
+        for j in range(1, m + 1)
+        if match[j] and finite[match[j] - 1, j - 1]
+    ]
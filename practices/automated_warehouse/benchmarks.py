@@ -0,0 +1,881 @@
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable
+
+import numpy as np
+
+import util
+from assignment import hungarian
+from events import EventSimulator
+from experiments import Estimate
+from experiments import MonteCarlo
+from experiments import Result
+from experiments import Scenario
+from generators import generate_warehouse
+from hierarchical import HierarchicalPlanner
+from maps import WarehouseMap
+from models import Fleet
+from models import Package
+from models import Robot
+from oracle import DistanceOracle
+from orders import OrderQueue
+from orders import poisson_orders
+from policies import GridPolicy
+from problems import CellType
+from problems import CompiledGrid2D
+from problems import Grid2D
+from problems import Location2D
+from profiling import Profiler
+from renderers import TerminalRenderer
+from reservations import CooperativeSimulator
+from search import AStar
+from search import Dijkstra
+from search import MultiPolicy
+from simulators import ConsoleSimulator
+from simulators import Metrics
+from spatial import GridIndex
+from tours import TourSimulator
+from traces import Trace
+from traces import TraceRecorder
+
+MAZES_DIR: str = "resources/mazes"
+
+
+def best_time(function: Callable[[], any], repeat: int = 3) -> float:
+    """
+    Returns the best wall-clock time (in seconds) of `repeat` calls to
+    `function`.
+    """
+    times: list[float] = []
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def free_cells(grid: list[str]) -> list[Location2D]:
+    """
+    Returns the free cells in `grid`.
+    """
+    return [
+        Location2D(j, i)
+        for i, row in enumerate(grid)
+        for j, cell in enumerate(row)
+        if cell == CellType.FREE.value
+    ]
+
+
+def corner_rests(grid: list[str]) -> list[Location2D]:
+    """
+    Returns the free cells closest to each corner of `grid`.
+    """
+    cells: list[Location2D] = free_cells(grid)
+    corners: list[tuple[int, int]] = [
+        (0, 0), (len(grid[0]), 0), (0, len(grid)), (len(grid[0]), len(grid))
+    ]
+    return list(dict.fromkeys(
+        min(cells, key=lambda c: abs(c.x - x) + abs(c.y - y))
+        for x, y in corners
+    ))
+
+
+def bench_profiling(
+    n_ticks: int = 5000,
+    repeat: int = 3,
+    seed: int = 0,
+) -> None:
+    """
+    Measures the overhead of profiling `ConsoleSimulator` runs (with one robot
+    and package per corner resting location, keeping the best of `repeat`
+    runs): without a `Profiler`, with one, and with one tracing memory too.
+    Then shows the time spent in each phase of the profiled runs.
+    """
+    print(f"{'maze':<20}{'profiler':<10}{'ticks/s':>10}{'overhead':>10}")
+    for path in warehouse_maps():
+        rests: list[Location2D] = corner_rests(util.read_map(path))
+        # Tracing memory slows down everything else, so it starts last.
+        profilers: dict[str, Callable[[], Profiler | None]] = {
+            "off": lambda: None,
+            "on": Profiler,
+            "memory": lambda: Profiler(trace_memory=True),
+        }
+        baseline: float = 0.0
+        phases: dict[str, dict[str, float]] = {}
+        name: str = os.path.basename(path)
+        for mode, new_profiler in profilers.items():
+            profiler: Profiler | None = new_profiler()
+            simulator: ConsoleSimulator = ConsoleSimulator(
+                path, rests, profiler=profiler
+            )
+            simulator.warm_up()
+            elapsed: float = min(
+                simulator.run_headless(
+                    len(rests), len(rests), max_ticks=n_ticks, seed=seed
+                ).elapsed
+                for _ in range(repeat)
+            )
+            baseline = baseline or elapsed
+            if mode == "on":
+                phases = profiler.summary()["phases"]
+            print(
+                f"{name:<20}{mode:<10}{n_ticks / elapsed:>10.0f}"
+                f"{elapsed / baseline - 1:>10.1%}"
+            )
+            if profiler is not None:
+                profiler.close()
+        for phase, stats in phases.items():
+            print(f"  {phase:<18}{stats['calls']:>10}{stats['total']:>11.3f}s")
+
+
+def bench_queues(repeat: int = 3) -> None:
+    """
+    Compares the priority queues in `util` by running `Dijkstra` from the
+    middle free cell of each bundled maze.
+    """
+    queues: list[type] = [
+        util.LinearPriorityQueue,
+        util.PriorityQueue,
+        util.LazyPriorityQueue,
+    ]
+    print(f"{'maze':<20}{'cells':>8}" + "".join(
+        f"{queue.__name__:>22}" for queue in queues
+    ))
+    for name in sorted(os.listdir(MAZES_DIR)):
+        grid: list[str] = util.read_map(os.path.join(MAZES_DIR, name))
+        cells: list[Location2D] = free_cells(grid)
+        problem: Grid2D = Grid2D(grid, [cells[len(cells) // 2]], [])
+        times: list[float] = [
+            best_time(lambda: Dijkstra(queue, False).run(problem), repeat)
+            for queue in queues
+        ]
+        print(f"{name:<20}{len(cells):>8}" + "".join(
+            f"{1000 * t:>20.2f}ms" for t in times
+        ))
+
+
+def bench_routes(repeat: int = 3) -> None:
+    """
+    Compares single-pair `AStar` queries between the first and last free cells
+    of each bundled maze against computing a whole-map `Dijkstra` policy.
+    """
+    print(f"{'maze':<20}{'cells':>8}{'AStar':>14}{'Dijkstra':>14}")
+    for name in sorted(os.listdir(MAZES_DIR)):
+        grid: list[str] = util.read_map(os.path.join(MAZES_DIR, name))
+        cells: list[Location2D] = free_cells(grid)
+        problem: Grid2D = Grid2D(grid, cells[:1], cells[-1:])
+        problem.compile()
+        times: list[float] = [
+            best_time(lambda: AStar().run(problem), repeat),
+            best_time(lambda: Dijkstra().run(problem), repeat),
+        ]
+        print(f"{name:<20}{len(cells):>8}" + "".join(
+            f"{1000 * t:>12.2f}ms" for t in times
+        ))
+
+
+def bench_hierarchical(
+    cluster_size: int = 8,
+    n_queries: int = 100,
+    seed: int = 0,
+) -> None:
+    """
+    Compares `HierarchicalPlanner` queries between random free cells of each
+    bundled maze against `AStar`, reporting the mean path length overhead.
+    """
+    print(
+        f"{'maze':<20}{'cells':>8}{'build':>12}{'HPA*':>12}{'AStar':>12}"
+        f"{'overhead':>10}"
+    )
+    rng: random.Random = random.Random(seed)
+    for name in sorted(os.listdir(MAZES_DIR)):
+        grid: list[str] = util.read_map(os.path.join(MAZES_DIR, name))
+        cells: list[Location2D] = free_cells(grid)
+        graph: CompiledGrid2D = CompiledGrid2D(grid)
+        start: float = time.perf_counter()
+        planner: HierarchicalPlanner = HierarchicalPlanner(grid, cluster_size)
+        build: float = time.perf_counter() - start
+        queries: list[tuple[Location2D, Location2D]] = [
+            (rng.choice(cells), rng.choice(cells)) for _ in range(n_queries)
+        ]
+        start = time.perf_counter()
+        paths: list[list[Location2D]] = [planner.path(*q) for q in queries]
+        hpa: float = (time.perf_counter() - start) / n_queries
+        start = time.perf_counter()
+        optimal: list[dict] = [
+            AStar().run_compiled(graph, [graph.index(a)], [graph.index(b)])
+            for a, b in queries
+        ]
+        a_star: float = (time.perf_counter() - start) / n_queries
+        length: int = sum(max(len(path) - 1, 0) for path in paths)
+        best: int = sum(max(len(path) - 1, 0) for path in optimal)
+        overhead: float = length / best - 1 if best else 0.0
+        print(
+            f"{name:<20}{len(cells):>8}{1000 * build:>10.2f}ms"
+            f"{1000 * hpa:>10.2f}ms{1000 * a_star:>10.2f}ms{overhead:>10.1%}"
+        )
+
+
+def warehouse_maps() -> list[str]:
+    """
+    Returns the paths of the bundled maps with belts and racks, reporting the
+    skipped ones.
+    """
+    paths: list[str] = []
+    for name in sorted(os.listdir(MAZES_DIR)):
+        path: str = os.path.join(MAZES_DIR, name)
+        cells: str = "".join(util.read_map(path))
+        belt, rack = CellType.BELT.value, CellType.RACK.value
+        if belt not in cells or rack not in cells:
+            print(f"{name:<20}  skipped (no belts or racks)")
+            continue
+        paths.append(path)
+    return paths
+
+
+def bench_assignment(n_ticks: int = 5000, seed: int = 0) -> None:
+    """
+    Compares the delivery throughput of the package assignment strategies of
+    `ConsoleSimulator`, with one robot per corner resting location and four
+    packages per robot in each wave.
+    """
+    strategies: list[str] = ["greedy", "batch"]
+    print(f"{'maze':<20}" + "".join(f"{s:>14}" for s in strategies))
+    for path in warehouse_maps():
+        rests: list[Location2D] = corner_rests(util.read_map(path))
+        throughputs: list[float] = [
+            ConsoleSimulator(path, rests, assignment=strategy).run_headless(
+                len(rests), 4 * len(rests), max_ticks=n_ticks, seed=seed
+            ).deliveries_per_tick
+            for strategy in strategies
+        ]
+        name: str = os.path.basename(path)
+        print(f"{name:<20}" + "".join(f"{t:>14.4f}" for t in throughputs))
+
+
+def bench_cooperative(
+    sizes: tuple[int, ...] = (10, 50, 100, 200),
+    n_ticks: int = 500,
+    seed: int = 0,
+) -> None:
+    """
+    Compares the delivery throughput of robots following their policies
+    independently (`ConsoleSimulator`) and without collisions
+    (`CooperativeSimulator`), reporting the planning cost per tick of the
+    latter. Waves have one package per robot.
+    """
+    print(
+        f"{'maze':<20}{'robots':>8}{'independent':>13}{'cooperative':>13}"
+        f"{'planning':>12}"
+    )
+    for path in warehouse_maps():
+        rests: list[Location2D] = corner_rests(util.read_map(path))
+        for size in sizes:
+            independent: Metrics = ConsoleSimulator(path, rests).run_headless(
+                size, size, max_ticks=n_ticks, seed=seed
+            )
+            cooperative: Metrics = CooperativeSimulator(
+                path, rests
+            ).run_headless(size, size, max_ticks=n_ticks, seed=seed)
+            name: str = os.path.basename(path)
+            print(
+                f"{name:<20}{size:>8}"
+                f"{independent.deliveries_per_tick:>13.4f}"
+                f"{cooperative.deliveries_per_tick:>13.4f}"
+                f"{cooperative.planning_time / n_ticks * 1e3:>10.2f}ms"
+            )
+
+
+def bench_experiments(
+    fleets: tuple[int, ...] = (2, 4, 8),
+    n_seeds: int = 8,
+    n_ticks: int = 2000,
+) -> None:
+    """
+    Measures a fleet-sizing study (`fleets` robots with the corner resting
+    locations, over `n_seeds` seeds) run by `MonteCarlo` on 1 up to all the
+    CPUs, reporting the speedup and the estimated throughput of each fleet.
+    """
+    counts: list[int] = [1]
+    while counts[-1] < (os.cpu_count() or 1):
+        counts.append(min(2 * counts[-1], os.cpu_count() or 1))
+    for path in warehouse_maps():
+        rests: tuple[Location2D, ...] = tuple(
+            corner_rests(util.read_map(path))
+        )
+        scenarios: list[Scenario] = [
+            Scenario(n, rests, 2 * n) for n in fleets
+        ]
+        name: str = os.path.basename(path)
+        with MonteCarlo(path, assignment="greedy") as runner:
+            start: float = time.perf_counter()
+            runner.precompute(scenarios)
+            print(
+                f"{name}: policies stored in "
+                f"{time.perf_counter() - start:.2f}s"
+            )
+            print(f"{'workers':>8}{'elapsed':>10}{'speedup':>10}")
+            results: list[Result] = []
+            serial: float = 0.0
+            for workers in counts:
+                runner.workers = workers
+                start = time.perf_counter()
+                results = runner.run(scenarios, list(range(n_seeds)), n_ticks)
+                elapsed: float = time.perf_counter() - start
+                serial = serial or elapsed
+                print(f"{workers:>8}{elapsed:>9.2f}s{serial / elapsed:>9.2f}x")
+        print(f"{'robots':>8}{'dlv/tick':>10}{'95% CI':>20}{'latency':>10}")
+        for result in results:
+            throughput: Estimate = result.deliveries_per_tick
+            print(
+                f"{result.scenario.n_robots:>8}{throughput.mean:>10.4f}"
+                f"{throughput.low:>10.4f}{throughput.high:>10.4f}"
+                f"{result.mean_latency.mean:>10.1f}"
+            )
+
+
+def bench_fleet(
+    sizes: tuple[int, ...] = (10, 100, 500),
+    n_ticks: int = 100,
+    seed: int = 0,
+) -> None:
+    """
+    Compares stepping robots one at a time (`Robot`) and all at once
+    (`Fleet`), with every robot carrying a package between random racks and
+    belts of each bundled maze.
+    """
+    print(f"{'maze':<20}{'robots':>8}{'Robot':>12}{'Fleet':>12}")
+    for path in warehouse_maps():
+        rng: random.Random = random.Random(seed)
+        simulator: ConsoleSimulator = ConsoleSimulator(path, [])
+        racks: list[Location2D] = rng.sample(
+            simulator._get_cells(CellType.RACK), 8
+        )
+        policies: dict[Location2D, GridPolicy] = simulator._get_policies(racks)
+        cells: list[Location2D] = free_cells(simulator.map)
+        for size in sizes:
+            locations: list[Location2D] = rng.sample(cells, size)
+            packages: list[Package] = [
+                Package(rng.choice(racks), rng.choice(simulator.belts))
+                for _ in locations
+            ]
+            robots: list[Robot] = [Robot(location) for location in locations]
+            fleet: Fleet = Fleet(locations)
+            for robot, view, package in zip(robots, fleet, packages):
+                for r in (robot, view):
+                    r.prepare(
+                        package,
+                        policies[package.location],
+                        simulator.belt_policies[package.destination],
+                    )
+
+            def step_robots() -> None:
+                for _ in range(n_ticks):
+                    for robot in robots:
+                        robot.step()
+
+            def step_fleet() -> None:
+                for _ in range(n_ticks):
+                    fleet.step()
+
+            name: str = os.path.basename(path)
+            times: list[float] = [
+                best_time(step, repeat=1) / n_ticks * 1e3
+                for step in (step_robots, step_fleet)
+            ]
+            print(
+                f"{name:<20}{size:>8}"
+                + "".join(f"{t:>10.3f}ms" for t in times)
+            )
+
+
+def bench_maps(scales: tuple[int, ...] = (1, 8, 32), seed: int = 0) -> None:
+    """
+    Compares loading each warehouse map (tiled `scales` times along each
+    axis) from text, listing its racks by scanning every cell, with loading
+    its compiled version (see `WarehouseMap.save`) and reading its rack
+    index. Also measures sampling 100 racks from the index, and compiling the
+    search graph.
+    """
+    print(
+        f"{'maze':<20}{'cells':>10}{'text':>12}{'compiled':>12}"
+        f"{'sample':>12}{'graph':>12}"
+    )
+    for path in warehouse_maps():
+        grid: list[str] = util.read_map(path)
+        for scale in scales:
+            tiled: list[str] = [row * scale for row in grid] * scale
+            with tempfile.TemporaryDirectory() as directory:
+                text: str = os.path.join(directory, "map")
+                compiled: str = os.path.join(directory, "map.bin")
+                with open(text, "w") as file:
+                    file.write("\n".join(tiled))
+                WarehouseMap.from_lines(tiled).save(compiled)
+
+                def scan() -> list[Location2D]:
+                    lines: list[str] = util.read_map(text)
+                    return [
+                        Location2D(j, i)
+                        for i, row in enumerate(lines)
+                        for j, cell in enumerate(row)
+                        if cell == CellType.RACK.value
+                    ]
+
+                def load() -> np.ndarray:
+                    return WarehouseMap.load(compiled).cells[CellType.RACK]
+
+                layout: WarehouseMap = WarehouseMap.load(compiled)
+                rng: random.Random = random.Random(seed)
+                times: list[float] = [
+                    best_time(function) * 1e3
+                    for function in (
+                        scan,
+                        load,
+                        lambda: layout.sample(CellType.RACK, 100, rng),
+                        lambda: CompiledGrid2D(tiled),
+                    )
+                ]
+                del layout
+            name: str = os.path.basename(path)
+            print(
+                f"{name:<20}{len(tiled) * len(tiled[0]):>10}"
+                + "".join(f"{t:>10.2f}ms" for t in times)
+            )
+
+
+def bench_multipolicy(scales: tuple[int, ...] = (1, 2)) -> None:
+    """
+    Measures computing the policies of every belt and rack of each warehouse
+    map (tiled `scales` times along each axis), as `ConsoleSimulator` does
+    on startup and waves, with `MultiPolicy` on 1 up to all the CPUs.
+    """
+    counts: list[int] = [1]
+    while counts[-1] < (os.cpu_count() or 1):
+        counts.append(min(2 * counts[-1], os.cpu_count() or 1))
+    print(
+        f"{'maze':<20}{'cells':>10}{'targets':>10}"
+        + "".join(f"{f'{n} proc':>12}" for n in counts)
+    )
+    for path in warehouse_maps():
+        grid: list[str] = util.read_map(path)
+        for scale in scales:
+            tiled: list[str] = [row * scale for row in grid] * scale
+            layout: WarehouseMap = WarehouseMap.from_lines(tiled)
+            targets: list[Location2D] = [
+                *layout.locations(CellType.BELT),
+                *layout.locations(CellType.RACK),
+            ]
+            graph: CompiledGrid2D = CompiledGrid2D(tiled)
+            times: list[float] = []
+            for n in counts:
+                with MultiPolicy(workers=n) as search:
+                    times.append(best_time(
+                        lambda: search.run_compiled(graph, targets),
+                        repeat=1,
+                    ))
+            name: str = os.path.basename(path)
+            print(
+                f"{name:<20}{len(graph):>10}{len(targets):>10}"
+                + "".join(f"{t:>11.2f}s" for t in times)
+            )
+
+
+def bench_oracle(
+    n_ticks: int = 5000,
+    n_routes: int = 200,
+    seed: int = 0,
+) -> None:
+    """
+    Measures building a `DistanceOracle` over the racks, belts and resting
+    locations of each bundled maze, and compares the Euclidean and oracle
+    estimates: in the throughput of the greedy assignment, and in the time
+    to find routes between random cells (see `ConsoleSimulator.get_route`).
+    """
+    print(
+        f"{'maze':<20}{'estimate':<10}{'build':>10}{'size':>10}"
+        f"{'dlv/tick':>10}{'routes':>12}"
+    )
+    for path in warehouse_maps():
+        rests: list[Location2D] = corner_rests(util.read_map(path))
+        simulator: ConsoleSimulator = ConsoleSimulator(path, rests)
+        keys: list[Location2D] = [
+            *simulator._get_cells(CellType.RACK), *simulator.belts, *rests
+        ]
+        start: float = time.perf_counter()
+        oracle: DistanceOracle = DistanceOracle.build(simulator.graph, keys)
+        build: float = time.perf_counter() - start
+        size: int = oracle.distances.nbytes + oracle.landmarks.nbytes
+        rng: random.Random = random.Random(seed)
+        cells: list[Location2D] = free_cells(simulator.map)
+        routes: list[tuple[Location2D, Location2D]] = [
+            (rng.choice(cells), rng.choice(cells)) for _ in range(n_routes)
+        ]
+        for estimate in ("euclidean", "oracle"):
+            simulator = ConsoleSimulator(
+                path,
+                rests,
+                assignment="greedy",
+                oracle=oracle if estimate == "oracle" else None,
+            )
+            metrics: Metrics = simulator.run_headless(
+                len(rests), 4 * len(rests), max_ticks=n_ticks, seed=seed
+            )
+            elapsed: float = best_time(
+                lambda: [simulator.get_route(*route) for route in routes]
+            )
+            name: str = os.path.basename(path)
+            print(
+                f"{name:<20}{estimate:<10}{build:>9.2f}s"
+                f"{size / 2 ** 10:>8.0f}KB"
+                f"{metrics.deliveries_per_tick:>10.4f}"
+                f"{elapsed / n_routes * 1e3:>10.3f}ms"
+            )
+
+
+def bench_orders(
+    rates: tuple[float, ...] = (0.01, 0.02, 0.05, 0.1),
+    n_ticks: int = 20000,
+    capacity: int = 50,
+    seed: int = 0,
+) -> None:
+    """
+    Measures the sustained throughput of `EventSimulator` under streams of
+    orders arriving at increasing rates (orders per tick), with one robot per
+    corner resting location and a bounded order queue.
+    """
+    print(
+        f"{'maze':<20}{'rate':>8}{'dlv/hour':>10}{'latency':>10}"
+        f"{'blocked':>10}"
+    )
+    for path in warehouse_maps():
+        rests: list[Location2D] = corner_rests(util.read_map(path))
+        simulator: EventSimulator = EventSimulator(path, rests)
+        racks: list[Location2D] = simulator._get_cells(CellType.RACK)
+        for rate in rates:
+            orders: OrderQueue = OrderQueue(
+                poisson_orders(rate, racks, simulator.belts, seed), capacity
+            )
+            metrics: Metrics = simulator.run_headless(
+                len(rests), max_ticks=n_ticks, seed=seed, orders=orders
+            )
+            name: str = os.path.basename(path)
+            print(
+                f"{name:<20}{rate:>8.3f}{metrics.per_hour():>10.1f}"
+                f"{metrics.mean_latency:>10.1f}{len(orders.blocked):>10}"
+            )
+
+
+def bench_spatial(
+    sizes: tuple[int, ...] = (100, 1000, 10000),
+    n_queries: int = 1000,
+    seed: int = 0,
+) -> None:
+    """
+    Compares finding the package closest to random robots (as
+    `ConsoleSimulator._get_package` does) with a linear scan and with a
+    `GridIndex`, for increasing numbers of untaken packages. Each indexed
+    query also takes the package found, and puts it back.
+    """
+    print(f"{'maze':<20}{'packages':>10}{'linear':>12}{'indexed':>12}")
+    for path in warehouse_maps():
+        rng: random.Random = random.Random(seed)
+        grid: list[str] = util.read_map(path)
+        racks, belts = (
+            [
+                Location2D(j, i)
+                for i, row in enumerate(grid)
+                for j, cell in enumerate(row)
+                if cell == type_.value
+            ]
+            for type_ in (CellType.RACK, CellType.BELT)
+        )
+        cells: list[Location2D] = free_cells(grid)
+        robots: list[Location2D] = [
+            rng.choice(cells) for _ in range(n_queries)
+        ]
+        for size in sizes:
+            packages: list[Package] = [
+                Package(rng.choice(racks), rng.choice(belts), order)
+                for order in range(size)
+            ]
+            # Distance of each package into its belt.
+            offsets: dict[Package, float] = {
+                package: util.distance(package.location, package.destination)
+                for package in packages
+            }
+            index: GridIndex = GridIndex(len(grid), len(grid[0]))
+            for package in packages:
+                index.insert(
+                    package, package.location, offset=offsets[package]
+                )
+
+            def cost(robot: Location2D, package: Package) -> float:
+                distance: float = util.distance(robot, package.location)
+                return distance + offsets[package]
+
+            def scan() -> None:
+                for robot in robots:
+                    min(packages, key=lambda package: cost(robot, package))
+
+            def query() -> None:
+                for robot in robots:
+                    package: Package = index.nearest(
+                        robot, lambda package: cost(robot, package)
+                    )
+                    index.remove(package)
+                    index.insert(
+                        package, package.location, offset=offsets[package]
+                    )
+
+            name: str = os.path.basename(path)
+            times: list[float] = [
+                best_time(function, repeat=1) / n_queries * 1e6
+                for function in (scan, query)
+            ]
+            print(
+                f"{name:<20}{size:>10}"
+                + "".join(f"{t:>10.1f}us" for t in times)
+            )
+
+
+def bench_tours(
+    capacities: tuple[int, ...] = (1, 2, 4, 8),
+    n_robots: int = 20,
+    rate: float = 0.5,
+    n_ticks: int = 3000,
+    seed: int = 0,
+) -> None:
+    """
+    Measures the throughput of `TourSimulator` for increasing robot
+    capacities, under a stream of orders arriving faster than they can be
+    delivered, so that hundreds of them are pending on each decision.
+    """
+    print(
+        f"{'maze':<20}{'capacity':>10}{'dlv/tick':>10}{'latency':>10}"
+        f"{'pending':>10}{'planning':>12}"
+    )
+    for path in warehouse_maps():
+        rests: list[Location2D] = corner_rests(util.read_map(path))
+        for capacity in capacities:
+            simulator: TourSimulator = TourSimulator(
+                path, rests, capacity=capacity
+            )
+            racks: list[Location2D] = simulator._get_cells(CellType.RACK)
+            orders: OrderQueue = OrderQueue(
+                poisson_orders(rate, racks, simulator.belts, seed)
+            )
+            metrics: Metrics = simulator.run_headless(
+                n_robots, max_ticks=n_ticks, seed=seed, orders=orders
+            )
+            name: str = os.path.basename(path)
+            print(
+                f"{name:<20}{capacity:>10}"
+                f"{metrics.deliveries_per_tick:>10.4f}"
+                f"{metrics.mean_latency:>10.1f}{orders.open:>10}"
+                f"{metrics.planning_time / n_ticks * 1e3:>10.2f}ms"
+            )
+
+
+def bench_traces(
+    n_robots: int = 20,
+    n_ticks: int = 5000,
+    n_seeks: int = 1000,
+    seed: int = 0,
+) -> None:
+    """
+    Measures the overhead of recording `ConsoleSimulator` runs of `n_robots`
+    robots (with as many packages per wave) into a `TraceRecorder`, the size
+    of the traces, and the time to seek and render random ticks of them,
+    compared to running the simulation up to those ticks again.
+    """
+    print(
+        f"{'maze':<20}{'ticks/s':>10}{'overhead':>10}{'bytes/tick':>12}"
+        f"{'seek':>10}{'render':>10}{'rerun':>10}"
+    )
+    rng: random.Random = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for path in warehouse_maps():
+            rests: list[Location2D] = corner_rests(util.read_map(path))
+            simulator: ConsoleSimulator = ConsoleSimulator(path, rests)
+            simulator.warm_up()
+            elapsed: float = simulator.run_headless(
+                n_robots, n_robots, max_ticks=n_ticks, seed=seed
+            ).elapsed
+            trace_path: str = os.path.join(tmp_dir, os.path.basename(path))
+            recorded: float = simulator.run_headless(
+                n_robots,
+                n_robots,
+                max_ticks=n_ticks,
+                seed=seed,
+                recorder=TraceRecorder(trace_path),
+            ).elapsed
+            size: int = sum(
+                os.path.getsize(f"{trace_path}.{name}.bin")
+                for name in ("frames", "events", "offsets")
+            )
+            trace: Trace = Trace(trace_path)
+            # Finds the waiting packages of every tick, once.
+            trace.packages(0)
+            ticks: list[int] = [
+                rng.randrange(n_ticks) for _ in range(n_seeks)
+            ]
+            start: float = time.perf_counter()
+            for tick in ticks:
+                trace.robots(tick)
+                trace.tick_events(tick)
+            seek: float = (time.perf_counter() - start) / n_seeks
+            start = time.perf_counter()
+            for tick in ticks:
+                trace.render(tick)
+            render: float = (time.perf_counter() - start) / n_seeks
+            name: str = os.path.basename(path)
+            # Running again up to a tick takes half a run, on average.
+            print(
+                f"{name:<20}{n_ticks / recorded:>10.0f}"
+                f"{recorded / elapsed - 1:>10.1%}{size / n_ticks:>12.0f}"
+                f"{seek * 1e6:>8.1f}us{render * 1e3:>8.2f}ms"
+                f"{elapsed / 2 * 1e3:>8.0f}ms"
+            )
+
+
+def measure(function: Callable[[], any]) -> tuple[any, float, int]:
+    """
+    Calls `function` twice: once to time it, and once to trace the peak
+    memory it allocates (as tracing slows down pure Python code).
+    :return: The result of the first call, its wall-clock time in seconds,
+        and the peak memory in bytes.
+    """
+    start: float = time.perf_counter()
+    result: any = function()
+    elapsed: float = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def bench_scaling(
+    sizes: tuple[int, ...] = (100, 250, 500, 1000),
+    n_targets: int = 4,
+    seed: int = 0,
+) -> None:
+    """
+    Measures the time and peak memory of each stage of the pipeline on square
+    warehouses generated by `generate_warehouse`, of increasing `sizes`
+    (up to 2000 is supported, but slow): generating and compiling the map,
+    a single `Dijkstra` search (with a binary heap), the policies of
+    `n_targets` belts and racks with `MultiPolicy`, assigning as many random
+    robots to them, and drawing the first frame on a terminal.
+    """
+    print(
+        f"{'size':>6}{'cells':>10}  {'stage':<12}{'time':>12}{'memory':>12}"
+    )
+    for size in sizes:
+        rng: random.Random = random.Random(seed)
+        grid, *stats = measure(lambda: generate_warehouse(size, size))
+        layout: WarehouseMap = WarehouseMap.from_lines(grid)
+        stages: dict[str, list[float]] = {"generate": stats}
+        graph, *stages["compile"] = measure(lambda: CompiledGrid2D(grid))
+        targets: list[Location2D] = [
+            *layout.locations(CellType.BELT)[:n_targets // 2],
+            *layout.sample(CellType.RACK, n_targets // 2, rng),
+        ]
+        _, *stages["dijkstra"] = measure(
+            lambda: Dijkstra(wavefront=False).run_compiled(
+                graph, [graph.index(targets[0])]
+            )
+        )
+        fields, *stages["multipolicy"] = measure(
+            lambda: MultiPolicy().run_compiled(graph, targets)
+        )
+        robots: list[Location2D] = layout.sample(
+            CellType.FREE, len(targets), rng
+        )
+
+        def assign() -> list[tuple[int, int]]:
+            ids: list[int] = [graph.index(robot) for robot in robots]
+            costs: np.ndarray = np.stack(
+                [np.asarray(field.costs)[ids] for field in fields], axis=1
+            )
+            return hungarian(costs)
+
+        def render() -> None:
+            renderer: TerminalRenderer = TerminalRenderer(
+                grid, [], io.StringIO()
+            )
+            renderer.render([], robots)
+
+        _, *stages["assignment"] = measure(assign)
+        _, *stages["render"] = measure(render)
+        for stage, (elapsed, peak) in stages.items():
+            print(
+                f"{size:>6}{len(graph):>10}  {stage:<12}{elapsed:>11.3f}s"
+                f"{peak / 2 ** 20:>10.1f}MB"
+            )
+
+
+def bench_simulator(n_ticks: int = 2000, seed: int = 0) -> None:
+    """
+    Runs `ConsoleSimulator` and `EventSimulator` headless on each bundled maze
+    with belts and racks, using one robot and one package per corner resting
+    location.
+    """
+    print(
+        f"{'maze':<20}{'engine':<8}{'ticks/s':>10}{'dlv/tick':>10}"
+        f"{'latency':>10}{'planning':>12}{'stepping':>12}"
+    )
+    engines: dict[str, type[ConsoleSimulator]] = {
+        "tick": ConsoleSimulator,
+        "event": EventSimulator,
+    }
+    for path in warehouse_maps():
+        rests: list[Location2D] = corner_rests(util.read_map(path))
+        for engine, simulator_type in engines.items():
+            simulator: ConsoleSimulator = simulator_type(path, rests)
+            metrics: Metrics = simulator.run_headless(
+                len(rests), len(rests), max_ticks=n_ticks, seed=seed
+            )
+            name: str = os.path.basename(path)
+            print(
+                f"{name:<20}{engine:<8}{metrics.ticks_per_second:>10.0f}"
+                f"{metrics.deliveries_per_tick:>10.4f}"
+                f"{metrics.mean_latency:>10.1f}"
+                f"{metrics.planning_time:>11.3f}s"
+                f"{metrics.stepping_time:>11.3f}s"
+            )
+
+
+benchmarks: dict[str, Callable[[], None]] = {
+    "assignment": bench_assignment,
+    "cooperative": bench_cooperative,
+    "experiments": bench_experiments,
+    "fleet": bench_fleet,
+    "hierarchical": bench_hierarchical,
+    "maps": bench_maps,
+    "multipolicy": bench_multipolicy,
+    "oracle": bench_oracle,
+    "orders": bench_orders,
+    "profiling": bench_profiling,
+    "queues": bench_queues,
+    "routes": bench_routes,
+    "scaling": bench_scaling,
+    "simulator": bench_simulator,
+    "spatial": bench_spatial,
+    "tours": bench_tours,
+    "traces": bench_traces,
+}
+
+
+if __name__ == "__main__":
+    names: list[str] = sys.argv[1:] or list(benchmarks)
+    for name in names:
+        print(f"== {name}")
+        benchmarks[name]()
@@ -11,4 +11,4 @@ if __name__ == "__main__":
         Location2D(75, 43),
     ]
     n: int = len(rests)
-    ConsoleSimulator(map_, rests).run(n, n)
+    ConsoleSimulator(map_, rests, ".cache/policies").run(n, n)
@@ -0,0 +1,213 @@
+import enum
+import heapq
+import math
+import time
+
+import numpy as np
+
+from models import Package
+from models import RobotView
+from orders import OrderQueue
+from policies import GridPolicy
+from policies import NO_ACTION
+from problems import Action
+from problems import Location2D
+from simulators import ConsoleSimulator
+from simulators import Metrics
+from traces import TraceRecorder
+
+
+_moves: list[tuple[int, int]] = [action.value for action in Action]
+
+
+class Event(enum.IntEnum):
+    """
+    Meaningful events of a robot's trip, for `EventSimulator`.
+    """
+
+    PICKUP = 0
+    DELIVERY = 1
+
+
+class EventSimulator(ConsoleSimulator):
+    """
+    Discrete-event version of `ConsoleSimulator`.
+
+    Instead of stepping every robot on every tick, each robot schedules its
+    next meaningful event (picking up or delivering a package) using the
+    length of its path, and the clock jumps straight between events. Robots
+    going to rest are only located when needed. The results are the same as
+    the ones of `ConsoleSimulator.run_headless`.
+    """
+
+    def __init__(self, *args: any, **kwargs: any) -> None:
+        super().__init__(*args, **kwargs)
+        # Elements are: ``(time, padding, event, robot index)``
+        self._events: list[tuple[int, int, Event, int]] = []
+        self._padding: int = 0
+        self._now: int = 0
+        # Where each trip's next event takes place.
+        self._targets: dict[int, Location2D] = {}
+        # Time and location at which each robot started going to rest.
+        self._resting: dict[int, tuple[int, Location2D]] = {}
+
+    def run_headless(
+        self,
+        n_robots: int = 1,
+        n_packages: int = 1,
+        max_ticks: int | None = None,
+        max_deliveries: int | None = None,
+        seed: int = 0,
+        orders: OrderQueue | None = None,
+        recorder: TraceRecorder | None = None,
+    ) -> Metrics:
+        if max_ticks is None and max_deliveries is None:
+            raise ValueError("either max_ticks or max_deliveries is needed")
+        if recorder is not None:
+            # Robots are not located on every tick.
+            raise ValueError("use ConsoleSimulator to record traces")
+        self.random.seed(seed)
+        self._start(n_robots, orders)
+        self._events, self._targets, self._resting = [], {}, {}
+        metrics: Metrics = self.metrics
+        start: float = time.perf_counter()
+        now: int = 0
+        decide: bool = True
+        while max_ticks is None or now < max_ticks:
+            planning: float = time.perf_counter()
+            if decide:
+                self._now = now
+                self._decide(n_packages)
+            stepping: float = time.perf_counter()
+            metrics.planning_time += stepping - planning
+            delivered: bool = False
+            with self._phase("stepping"):
+                while self._events and self._events[0][0] == now:
+                    _, _, event, i = heapq.heappop(self._events)
+                    delivered |= self._handle(event, i, now)
+            metrics.stepping_time += time.perf_counter() - stepping
+            metrics.ticks = now + 1
+            if max_deliveries and metrics.deliveries >= max_deliveries:
+                break
+            # Freed robots are only queried on the next tick.
+            times: list[int] = [now + 1] if delivered else []
+            if self._events:
+                times.append(self._events[0][0])
+            arrival: int | None = orders.next_tick() if orders else None
+            if arrival is not None:
+                times.append(max(arrival, now + 1))
+            if not times and max_ticks is None:
+                break
+            now = min(times, default=max_ticks)
+            decide = delivered or arrival is not None and arrival <= now
+        else:
+            metrics.ticks = max_ticks
+        metrics.elapsed = time.perf_counter() - start
+        self._profile_run()
+        return metrics
+
+    def _decide(self, n_packages: int) -> None:
+        """
+        Creates new packages if all previous have been delivered, and assigns
+        packages or resting locations to the free robots, at `self._now`.
+        """
+        with self._phase("stepping"):
+            for i, robot in enumerate(self.robots):
+                if robot.is_free and i in self._resting:
+                    since, location = self._resting[i]
+                    policy: GridPolicy = robot.rest_policy
+                    robot.location, _ = _walk(
+                        policy, location, self._now - since, enter=True
+                    )
+        with self._phase("packages"):
+            if self.orders is not None:
+                self._admit_orders(self._now)
+            elif not self.packages and all(r.is_free for r in self.robots):
+                self._package_policies = self._new_packages(n_packages)
+                for package in self.packages:
+                    self._created[package] = self._now
+                self._assignment_pending = True
+        with self._phase("assignment"):
+            if self.assignment == "batch" and self._assignment_pending:
+                self._assign_packages()
+            for i, robot in enumerate(self.robots):
+                if not robot.is_free:
+                    continue
+                if self.assignment == "greedy" and (
+                    package := self._get_package(robot)
+                ):
+                    self._prepare(robot, package)
+                elif rest := self._get_optimal_rest(robot):
+                    self._claim_rest(robot, rest)
+                    self._resting[i] = (self._now, robot.location)
+
+    def _handle(self, event: Event, i: int, now: int) -> bool:
+        """
+        Processes the `event` of the `i`-th robot, taking place at `now`.
+        :return: Whether the robot delivered its package.
+        """
+        robot: RobotView = self.robots[i]
+        robot.location = self._targets.pop(i)
+        if event == Event.PICKUP:
+            del self.packages[robot.package]
+            robot.is_picking_up = False
+            robot.is_delivering = True
+            policy: GridPolicy = self.belt_policies[
+                robot.package.destination
+            ]
+            self._schedule(i, policy, now + 1, Event.DELIVERY)
+            return False
+        self._deliver(robot.package, now)
+        robot.package = None
+        robot.is_delivering = False
+        return True
+
+    def _prepare(self, robot: RobotView, package: Package) -> None:
+        super()._prepare(robot, package)
+        i: int = self.robots.index(robot)
+        self._resting.pop(i, None)
+        policy: GridPolicy = self._package_policies[package]
+        self._schedule(i, policy, self._now, Event.PICKUP)
+
+    def _schedule(
+        self,
+        i: int,
+        policy: GridPolicy,
+        now: int,
+        event: Event,
+    ) -> None:
+        """
+        Schedules the `event` reached by the `i`-th robot following `policy`,
+        starting at `now`. Robots cut off from the policy's target are left
+        waiting forever, as in `ConsoleSimulator`.
+        """
+        robot: RobotView = self.robots[i]
+        if policy.get(robot.location) is None:
+            return
+        self._targets[i], steps = _walk(policy, robot.location)
+        heapq.heappush(self._events, (now + steps, self._padding, event, i))
+        self._padding += 1
+
+
+def _walk(
+    policy: GridPolicy,
+    location: Location2D,
+    max_steps: float = math.inf,
+    enter: bool = False,
+) -> tuple[Location2D, int]:
+    """
+    Follows `policy` from `location` for up to `max_steps` moves, stopping
+    right before its target (or on it, if `enter`). Works on the raw action
+    grid, as this is the hot loop of `EventSimulator`.
+    :return: The final location and the number of moves.
+    """
+    actions: np.ndarray = policy.actions
+    x, y = location
+    steps: int = 0
+    while steps < max_steps and (code := actions.item(y, x)) >= 0:
+        dy, dx = _moves[code]
+        if not enter and actions.item(y + dy, x + dx) == NO_ACTION:
+            break
+        x, y = x + dx, y + dy
+        steps += 1
+    return Location2D(x, y), steps
@@ -0,0 +1,289 @@
+import dataclasses
+import math
+import os
+import statistics
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from orders import OrderQueue
+from orders import poisson_orders
+from problems import CellType
+from problems import Location2D
+from simulators import ConsoleSimulator
+from simulators import Metrics
+
+
+@dataclasses.dataclass(frozen=True)
+class Scenario:
+    """
+    Fleet configuration evaluated by `MonteCarlo`, over several seeds.
+    """
+
+    n_robots: int
+    rests: tuple[Location2D, ...]
+    # Packages per wave, unless orders arrive as a stream.
+    n_packages: int = 1
+    # Mean number of orders per tick, streamed through an `OrderQueue`
+    # instead of the waves of packages.
+    rate: float | None = None
+    name: str = ""
+
+
+@dataclasses.dataclass(frozen=True)
+class Estimate:
+    """
+    Sample mean of a measurement, with its confidence interval.
+    """
+
+    mean: float
+    low: float
+    high: float
+    n: int
+
+    @classmethod
+    def of(cls, values: list[float], confidence: float = 0.95) -> "Estimate":
+        """
+        Estimates the mean of `values` with a Student's t interval at the
+        given `confidence` level (degenerate for fewer than two values).
+        """
+        mean: float = statistics.fmean(values)
+        if len(values) < 2:
+            return cls(mean, mean, mean, len(values))
+        error: float = statistics.stdev(values) / math.sqrt(len(values))
+        margin: float = t_quantile(0.5 + confidence / 2, len(values) - 1)
+        return cls(
+            mean, mean - margin * error, mean + margin * error, len(values)
+        )
+
+    @property
+    def half_width(self) -> float:
+        return (self.high - self.low) / 2
+
+
+@dataclasses.dataclass
+class Result:
+    """
+    Measurements of the episodes of a `Scenario`, one per seed.
+    """
+
+    scenario: Scenario
+    metrics: list[Metrics]
+    confidence: float = 0.95
+
+    @property
+    def deliveries_per_tick(self) -> Estimate:
+        return self.estimate("deliveries_per_tick")
+
+    @property
+    def mean_latency(self) -> Estimate:
+        return self.estimate("mean_latency")
+
+    def estimate(self, name: str) -> Estimate:
+        """
+        Returns the estimate of the given `Metrics.summary` measurement.
+        """
+        values: list[float] = [m.summary()[name] for m in self.metrics]
+        return Estimate.of(values, self.confidence)
+
+
+class MonteCarlo:
+    """
+    Runs headless episodes of `ConsoleSimulator` (or a subclass) for several
+    scenarios and seeds on a pool of worker processes.
+
+    The policies of the belts, resting locations and racks are computed once,
+    before starting the workers, and stored in a `PolicyStore`: workers then
+    memory-map them, sharing the same pages instead of each computing and
+    holding its own copy. Each worker builds one simulator per rest layout,
+    reused across its episodes.
+    """
+
+    def __init__(
+        self,
+        map_path: str,
+        simulator: type[ConsoleSimulator] = ConsoleSimulator,
+        cache_dir: str | None = None,
+        workers: int | None = None,
+        **options: any,
+    ) -> None:
+        """
+        :param map_path: File path of the warehouse layout.
+        :param simulator: Simulator class run by the workers.
+        :param cache_dir: Directory of the shared `PolicyStore`. A temporary
+            one, removed by `close`, is used if not given.
+        :param workers: Number of worker processes (by default, one per CPU).
+            With 0, episodes run in the calling process.
+        :param options: Extra arguments of `simulator` (e.g., `assignment`).
+        """
+        self.map_path: str = map_path
+        self.simulator: type[ConsoleSimulator] = simulator
+        self.options: dict[str, any] = options
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.workers: int = workers
+        self._tmp: tempfile.TemporaryDirectory | None = None
+        if cache_dir is None:
+            self._tmp = tempfile.TemporaryDirectory()
+            cache_dir = self._tmp.name
+        self.cache_dir: str = cache_dir
+        # Layouts whose policies are already in the store.
+        self._stored: set[tuple[Location2D, ...]] = set()
+        self._racks_stored: bool = False
+
+    def run(
+        self,
+        scenarios: list[Scenario],
+        seeds: list[int],
+        max_ticks: int,
+        confidence: float = 0.95,
+    ) -> list[Result]:
+        """
+        Runs an episode of `max_ticks` ticks for each scenario and seed, and
+        returns the results of each scenario, in order.
+
+        Episodes only depend on their scenario and seed, so results don't
+        depend on the number of workers.
+        """
+        self.precompute(scenarios)
+        episodes: list[tuple[Scenario, int, int]] = [
+            (scenario, seed, max_ticks)
+            for scenario in scenarios
+            for seed in seeds
+        ]
+        setup: tuple[any, ...] = (
+            self.map_path, self.simulator, self.cache_dir, self.options
+        )
+        if self.workers == 0:
+            _init_worker(*setup)
+            metrics: list[Metrics] = list(map(_run_episode, episodes))
+        else:
+            with ProcessPoolExecutor(
+                self.workers, initializer=_init_worker, initargs=setup
+            ) as executor:
+                metrics = list(executor.map(_run_episode, episodes))
+        return [
+            Result(scenario, metrics[k:k + len(seeds)], confidence)
+            for scenario, k in zip(
+                scenarios, range(0, len(metrics), len(seeds))
+            )
+        ]
+
+    def precompute(self, scenarios: list[Scenario]) -> None:
+        """
+        Stores the policies of the belts, of every rack and of the resting
+        locations of `scenarios`, unless already stored.
+        """
+        layouts: set[tuple[Location2D, ...]] = {s.rests for s in scenarios}
+        rests: list[Location2D] = list(
+            dict.fromkeys(
+                rest
+                for layout in layouts - self._stored
+                for rest in layout
+            )
+        )
+        if rests or not self._racks_stored:
+            with ConsoleSimulator(
+                self.map_path, rests, cache_dir=self.cache_dir
+            ) as simulator:
+                if not self._racks_stored:
+                    self._store_racks(simulator)
+                    self._racks_stored = True
+        self._stored |= layouts
+
+    @staticmethod
+    def _store_racks(simulator: ConsoleSimulator) -> None:
+        """
+        Stores the policies of every rack, a chunk of `simulator.search` at a
+        time, so that only the fields of one chunk are held at once.
+        """
+        racks: list[Location2D] = simulator._get_cells(CellType.RACK)
+        size: int = simulator.search.chunk_size * max(
+            simulator.search.workers, 1
+        )
+        for i in range(0, len(racks), size):
+            simulator._get_policies(racks[i:i + size])
+
+    def close(self) -> None:
+        """
+        Removes the temporary policy store, if any.
+        """
+        if self._tmp is not None:
+            self._tmp.cleanup()
+            self._tmp = None
+
+    def __enter__(self) -> "MonteCarlo":
+        return self
+
+    def __exit__(self, *exc_info: any) -> None:
+        self.close()
+
+
+def t_quantile(p: float, df: int) -> float:
+    """
+    Returns the `p`-quantile of Student's t distribution with `df` degrees of
+    freedom: exact for 1 and 2, and otherwise by its Cornish-Fisher expansion
+    around the normal quantile (within 0.1% from 3 on).
+    """
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    z: float = statistics.NormalDist().inv_cdf(p)
+    return (
+        z
+        + (z ** 3 + z) / (4 * df)
+        + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+        + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3)
+        + (
+            79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3
+            - 945 * z
+        ) / (92160 * df ** 4)
+    )
+
+
+# Settings of the current worker process, and its simulator for each rest
+# layout.
+_setup: tuple[any, ...] = ()
+_simulators: dict[tuple[Location2D, ...], ConsoleSimulator] = {}
+
+
+def _init_worker(
+    map_path: str,
+    simulator: type[ConsoleSimulator],
+    cache_dir: str,
+    options: dict[str, any],
+) -> None:
+    global _setup
+    _setup = (map_path, simulator, cache_dir, options)
+    _simulators.clear()
+
+
+def _run_episode(episode: tuple[Scenario, int, int]) -> Metrics:
+    """
+    Runs the given ``(scenario, seed, max_ticks)`` episode in this worker.
+    """
+    scenario, seed, max_ticks = episode
+    map_path, simulator_class, cache_dir, options = _setup
+    simulator: ConsoleSimulator | None = _simulators.get(scenario.rests)
+    if simulator is None:
+        simulator = simulator_class(
+            map_path, list(scenario.rests), cache_dir=cache_dir, **options
+        )
+        _simulators[scenario.rests] = simulator
+    orders: OrderQueue | None = None
+    if scenario.rate is not None:
+        orders = OrderQueue(
+            poisson_orders(
+                scenario.rate,
+                simulator._get_cells(CellType.RACK),
+                simulator.belts,
+                seed,
+            )
+        )
+    return simulator.run_headless(
+        scenario.n_robots,
+        scenario.n_packages,
+        max_ticks=max_ticks,
+        seed=seed,
+        orders=orders,
+    )
@@ -0,0 +1,89 @@
+import sys
+
+import numpy as np
+
+from maps import WarehouseMap
+from problems import CellType
+
+
+def generate_warehouse(
+    rows: int,
+    cols: int,
+    aisle_width: int = 5,
+    rack_width: int = 2,
+    block_length: int = 20,
+    cross_aisle: int = 3,
+    n_belts: int | None = None,
+    belt_margin: int = 4,
+    empty_rate: float = 0.0,
+    seed: int = 0,
+) -> list[str]:
+    """
+    Generates a warehouse layout like ``warehouse_medium``, in the text format
+    read by `util.read_map`: walls around the floor, and blocks of racks
+    separated by aisles, above a row of conveyor belts.
+
+    :param rows: Number of rows, walls included.
+    :param cols: Number of columns, walls included.
+    :param aisle_width: Free columns between (and around) the rack blocks.
+    :param rack_width: Columns of racks of each block, at most 2 so that every
+        rack can be reached from an aisle.
+    :param block_length: Rows of racks of each block.
+    :param cross_aisle: Free rows between the blocks along a column.
+    :param n_belts: Number of belts, evenly spread along the bottom row
+        (by default, one per 14 columns).
+    :param belt_margin: Free rows between the racks and the belts.
+    :param empty_rate: Fraction of rack cells left empty, chosen at random.
+    :param seed: Seed of the empty rack cells.
+    """
+    if not 1 <= rack_width <= 2:
+        raise ValueError("rack blocks must be 1 or 2 racks wide")
+    bottom: int = rows - 3 - belt_margin
+    if bottom < 1 or cols < 2 * aisle_width + rack_width + 2:
+        raise ValueError(f"a {rows}x{cols} floor is too small")
+    if n_belts is None:
+        n_belts = max(1, (cols - 2) // 14)
+    grid: np.ndarray = np.full(
+        (rows, cols), ord(CellType.FREE.value), np.uint8
+    )
+    # Rack columns, leaving an aisle before and after each block, and rack
+    # rows, leaving a cross aisle after each block.
+    xs: np.ndarray = np.arange(cols)
+    period: int = aisle_width + rack_width
+    rack_cols: np.ndarray = (
+        ((xs - 1) % period >= aisle_width)
+        & (xs - 1 - aisle_width >= 0)
+        & (xs + aisle_width <= cols - 2)
+    )
+    ys: np.ndarray = np.arange(rows)
+    rack_rows: np.ndarray = (
+        ((ys - 1) % (block_length + cross_aisle) < block_length)
+        & (ys >= 1)
+        & (ys <= bottom)
+    )
+    racks: np.ndarray = rack_rows[:, None] & rack_cols[None, :]
+    if empty_rate > 0:
+        rng: np.random.Generator = np.random.default_rng(seed)
+        racks &= rng.random(racks.shape) >= empty_rate
+    grid[racks] = ord(CellType.RACK.value)
+    belts: np.ndarray = 1 + (2 * np.arange(n_belts) + 1) * (cols - 2) // (
+        2 * n_belts
+    )
+    grid[rows - 2, belts] = ord(CellType.BELT.value)
+    wall: int = ord(CellType.WALL.value)
+    grid[[0, -1], :] = wall
+    grid[:, [0, -1]] = wall
+    return [row.tobytes().decode("ascii") for row in grid]
+
+
+if __name__ == "__main__":
+    # Usage: python generators.py <rows> <cols> <map> [seed]
+    # Maps ending with ``.bin`` are compiled (see `WarehouseMap.save`).
+    rows, cols, path = int(sys.argv[1]), int(sys.argv[2]), sys.argv[3]
+    seed: int = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+    grid: list[str] = generate_warehouse(rows, cols, seed=seed)
+    if path.endswith(".bin"):
+        WarehouseMap.from_lines(grid).save(path)
+    else:
+        with open(path, "w") as file:
+            file.write("\n".join(grid) + "\n")
@@ -0,0 +1,514 @@
+import heapq
+import itertools
+import math
+from collections import defaultdict
+
+import numpy as np
+
+from problems import Action
+from problems import CellType
+from problems import Location2D
+from search import wavefront
+
+_actions: list[Action] = list(Action)
+_moves: dict[tuple[int, int], Action] = {
+    action.value: action for action in Action
+}
+
+# Clusters are identified by their ``(row, column)`` in the cluster grid.
+Cluster = tuple[int, int]
+# Pairs of adjacent clusters, where the first one is above or to the left.
+Border = tuple[Cluster, Cluster]
+# Virtual nodes of the abstract graph, linked to the ends of a query.
+_START: int = -1
+_GOAL: int = -2
+
+
+class HierarchicalPlanner:
+    """
+    Implements hierarchical path-finding (HPA*) over a 2D-grid map, where all
+    moves cost the same.
+
+    The map is split into square clusters. The free cells on both sides of
+    each cluster border (its entrances) become the nodes of an abstract
+    graph, linked by the distances between them within each cluster. Route
+    queries search the (much smaller) abstract graph, then refine the result
+    into a cell-level path.
+
+    The distances and actions from each node to every cell of its cluster
+    are kept, so that the ends of a query are linked into the abstract graph
+    and the result is refined without searching the clusters again.
+    """
+
+    def __init__(
+        self,
+        grid: list[str],
+        cluster_size: int = 64,
+        weight: float = 1.25,
+    ) -> None:
+        """
+        :param grid: Map layout.
+        :param cluster_size: Side length of the clusters, in cells.
+        :param weight: Weight of the heuristic in the abstract search. Above
+            1, queries expand far fewer nodes, for paths at most that many
+            times longer than through the abstract graph's shortest one.
+        """
+        self.rows: int = len(grid)
+        self.cols: int = len(grid[0])
+        self.size: int = cluster_size
+        self.weight: float = weight
+        self.free: np.ndarray = np.array(
+            [[cell == CellType.FREE.value for cell in row] for row in grid],
+            dtype=bool,
+        )
+        # Transitions ``(cell, cell)`` crossing each border.
+        self._borders: dict[Border, list[tuple[int, int]]] = {}
+        # Abstract nodes (cell ids) of each cluster.
+        self._nodes: dict[Cluster, list[int]] = {}
+        # Action fields and steps (`search.wavefront`) from each node of each
+        # cluster, in the order of `_nodes`.
+        self._fields: dict[Cluster, np.ndarray] = {}
+        self._steps: dict[Cluster, np.ndarray] = {}
+        # Position of each node in the nodes of its cluster.
+        self._slots: dict[int, int] = {}
+        # Cells along the intra-cluster edges ``(node, node)`` refined so far
+        # (without the first one), by cluster.
+        self._segments: dict[Cluster, dict[tuple[int, int], list[int]]] = {}
+        # Offset of the cell ids, and of the cluster-local ones, of each move,
+        # by cluster width.
+        self._moves: dict[int, list[tuple[int, int]]] = {
+            width: [
+                (dy * self.cols + dx, dy * width + dx)
+                for dy, dx in (action.value for action in _actions)
+            ]
+            for width in {self.size, self.cols % self.size or self.size}
+        }
+        # Abstract graph, as ``{node: {neighbour: cost}}``.
+        self._edges: defaultdict[int, dict[int, float]] = defaultdict(dict)
+        clusters: list[Cluster] = list(itertools.product(
+            range(math.ceil(self.rows / self.size)),
+            range(math.ceil(self.cols / self.size)),
+        ))
+        for cluster in clusters:
+            for border in self._get_borders(cluster):
+                if border not in self._borders:
+                    self._build_border(border)
+        for cluster in clusters:
+            self._build_cluster(cluster)
+
+    @property
+    def n_nodes(self) -> int:
+        """
+        Number of nodes in the abstract graph.
+        """
+        return sum(len(nodes) for nodes in self._nodes.values())
+
+    def path(self, start: Location2D, goal: Location2D) -> list[Location2D]:
+        """
+        Returns the locations along a (near) shortest path from `start` to
+        `goal`, both included, or an empty list if there's none.
+
+        Either end can be a non-free cell (e.g., a rack or a belt), in which
+        case the path goes through its closest free neighbour.
+        """
+        cells: list[int] = self._path(
+            self._get_endpoints(start), self._get_endpoints(goal), goal
+        )
+        if not cells:
+            return []
+        ys, xs = np.divmod(np.array(cells), self.cols)
+        # Same as ``Location2D(x, y)``, without calling back into Python.
+        path: list[Location2D] = list(map(
+            tuple.__new__,
+            itertools.repeat(Location2D),
+            zip(xs.tolist(), ys.tolist()),
+        ))
+        if path[0] != start:
+            path.insert(0, start)
+        if path[-1] != goal:
+            path.append(goal)
+        return path
+
+    def route(
+        self,
+        start: Location2D,
+        goal: Location2D,
+    ) -> dict[Location2D, Action]:
+        """
+        Returns the policy to reach `goal` from `start`, which only covers the
+        locations along the path returned by `path`.
+        """
+        path: list[Location2D] = self.path(start, goal)
+        route: dict[Location2D, Action] = {
+            u: _moves[(v.y - u.y, v.x - u.x)] for u, v in zip(path, path[1:])
+        }
+        if path:
+            route[goal] = None
+        return route
+
+    def update(self, changes: dict[Location2D, CellType]) -> None:
+        """
+        Changes the type of the given cells, repairing only the clusters
+        affected by them (and their neighbours' entrances).
+        """
+        clusters: set[Cluster] = set()
+        for (x, y), type_ in changes.items():
+            self.free[y, x] = type_ == CellType.FREE
+            clusters.add(self._get_cluster(self._index(Location2D(x, y))))
+        borders: set[Border] = {
+            border
+            for cluster in clusters
+            for border in self._get_borders(cluster)
+        }
+        for border in borders:
+            for a, b in self._borders.pop(border, []):
+                self._edges[a].pop(b, None)
+                self._edges[b].pop(a, None)
+            self._build_border(border)
+        for cluster in clusters.union(*borders):
+            self._build_cluster(cluster)
+
+    def _build_border(self, border: Border) -> None:
+        """
+        Finds the transitions crossing `border`, linking them in the abstract
+        graph. Each maximal segment of free cell pairs gets one transition in
+        its middle, or two at its ends if it's long.
+        """
+        (cy, cx), (dy, dx) = border
+        y0, y1, x0, x1 = self._get_bounds((cy, cx))
+        if dy > cy:
+            # Horizontal border, between rows ``y1 - 1`` and ``y1``.
+            pairs: list[tuple[int, int]] = [
+                ((y1 - 1) * self.cols + x, y1 * self.cols + x)
+                for x in range(x0, x1)
+            ]
+            open_: np.ndarray = self.free[y1 - 1, x0:x1] & self.free[y1, x0:x1]
+        else:
+            # Vertical border, between columns ``x1 - 1`` and ``x1``.
+            pairs = [
+                (y * self.cols + x1 - 1, y * self.cols + x1)
+                for y in range(y0, y1)
+            ]
+            open_ = self.free[y0:y1, x1 - 1] & self.free[y0:y1, x1]
+        transitions: list[tuple[int, int]] = []
+        i: int = 0
+        for is_open, segment in itertools.groupby(open_.tolist()):
+            n: int = len(list(segment))
+            if is_open:
+                ends: list[int] = [i + n // 2] if n < 6 else [i, i + n - 1]
+                transitions.extend(pairs[j] for j in ends)
+            i += n
+        for a, b in transitions:
+            self._edges[a][b] = 1.0
+            self._edges[b][a] = 1.0
+        self._borders[border] = transitions
+
+    def _build_cluster(self, cluster: Cluster) -> None:
+        """
+        (Re)computes the nodes of `cluster`, and the intra-cluster edges
+        between them.
+        """
+        old: list[int] = self._nodes.get(cluster, [])
+        for a in old:
+            self._slots.pop(a)
+            for b in old:
+                self._edges[a].pop(b, None)
+        nodes: list[int] = sorted({
+            transition[border.index(cluster)]
+            for border in self._get_borders(cluster)
+            for transition in self._borders.get(border, [])
+        })
+        y0, y1, x0, x1 = self._get_bounds(cluster)
+        sources: np.ndarray = np.zeros((len(nodes), y1 - y0, x1 - x0), bool)
+        ys, xs = np.divmod(np.array(nodes, dtype=int), self.cols)
+        sources[np.arange(len(nodes)), ys - y0, xs - x0] = True
+        steps, actions = wavefront(self.free[y0:y1, x0:x1], sources)
+        distances: np.ndarray = steps[:, ys - y0, xs - x0].astype(float)
+        distances[distances < 0] = math.inf
+        # Edges whose shortest path goes through another node of the cluster
+        # are left out, as the path through that node costs the same.
+        detours: np.ndarray = distances.copy()
+        np.fill_diagonal(detours, math.inf)
+        redundant: np.ndarray = (
+            detours[:, :, None] + detours[None, :, :] == distances[:, None, :]
+        ).any(axis=1)
+        for i, j in zip(*np.nonzero(np.isfinite(distances) & ~redundant)):
+            if i != j:
+                self._edges[nodes[i]][nodes[j]] = distances.item(i, j)
+        self._nodes[cluster] = nodes
+        self._fields[cluster] = actions
+        self._steps[cluster] = steps.astype(np.int16)
+        self._slots.update((node, k) for k, node in enumerate(nodes))
+        self._segments[cluster] = {}
+        for a in old:
+            if not self._edges.get(a):
+                self._edges.pop(a, None)
+
+    def _get_endpoints(self, location: Location2D) -> list[int]:
+        """
+        Returns the cell id of `location` if it's free, or else the ones of its
+        free neighbours.
+        """
+        if self.free[location.y, location.x]:
+            return [self._index(location)]
+        return [
+            self._index(neighbour)
+            for action in Action
+            if 0 <= (neighbour := action.apply(location)).y < self.rows
+            and 0 <= neighbour.x < self.cols
+            and self.free[neighbour.y, neighbour.x]
+        ]
+
+    def _get_borders(self, cluster: Cluster) -> list[Border]:
+        """
+        Returns the borders of `cluster` with its (up to 4) neighbours.
+        """
+        cy, cx = cluster
+        rows: int = math.ceil(self.rows / self.size)
+        cols: int = math.ceil(self.cols / self.size)
+        borders: list[Border] = []
+        if cy > 0:
+            borders.append(((cy - 1, cx), cluster))
+        if cx > 0:
+            borders.append(((cy, cx - 1), cluster))
+        if cy + 1 < rows:
+            borders.append((cluster, (cy + 1, cx)))
+        if cx + 1 < cols:
+            borders.append((cluster, (cy, cx + 1)))
+        return borders
+
+    def _get_bounds(self, cluster: Cluster) -> tuple[int, int, int, int]:
+        """
+        Returns the rows ``[y0, y1)`` and columns ``[x0, x1)`` of `cluster`.
+        """
+        cy, cx = cluster
+        y0, x0 = cy * self.size, cx * self.size
+        return (
+            y0, min(y0 + self.size, self.rows),
+            x0, min(x0 + self.size, self.cols),
+        )
+
+    def _get_cluster(self, i: int) -> Cluster:
+        y, x = divmod(i, self.cols)
+        return y // self.size, x // self.size
+
+    def _get_links(self, endpoints: list[int]) -> dict[int, tuple[int, int]]:
+        """
+        Returns the distance from the closest of the free cells `endpoints` to
+        each node of their clusters, along with that endpoint.
+        """
+        links: dict[int, tuple[int, int]] = {}
+        for i in endpoints:
+            cluster: Cluster = self._get_cluster(i)
+            y0, _, x0, _ = self._get_bounds(cluster)
+            y, x = divmod(i, self.cols)
+            distances: np.ndarray = self._steps[cluster][:, y - y0, x - x0]
+            for node, d in zip(self._nodes[cluster], distances.tolist()):
+                if d >= 0 and (node not in links or d < links[node][0]):
+                    links[node] = (d, i)
+        return links
+
+    def _path(
+        self,
+        sources: list[int],
+        targets: list[int],
+        goal: Location2D,
+    ) -> list[int]:
+        """
+        Returns the cells along a (near) shortest path from the closest of the
+        free cells `sources` to the closest of the free cells `targets` (which
+        are `goal` or its neighbours).
+        """
+        s_links: dict[int, tuple[int, int]] = self._get_links(sources)
+        g_links: dict[int, tuple[int, int]] = self._get_links(targets)
+        # Shortest path within a single cluster, as ``(cost, cells)``.
+        direct: tuple[int, list[int]] | None = None
+        for cluster in {self._get_cluster(s) for s in sources}:
+            ends: list[int] = [
+                g for g in targets if self._get_cluster(g) == cluster
+            ]
+            if not ends:
+                continue
+            cells: list[int] = self._search_cluster(
+                cluster,
+                [s for s in sources if self._get_cluster(s) == cluster],
+                ends,
+                goal,
+            )
+            if cells and (direct is None or len(cells) - 1 < direct[0]):
+                direct = (len(cells) - 1, cells)
+        abstract: list[int] = self._search(
+            s_links, g_links, goal, None if direct is None else direct[0]
+        )
+        if len(abstract) < 3:
+            return direct[1] if abstract else []
+        first, last = abstract[1], abstract[-2]
+        cells: list[int] = self._trace_node(first, s_links[first][1])
+        for u, v in zip(abstract[1:-2], abstract[2:-1]):
+            cluster = self._get_cluster(u)
+            if cluster != self._get_cluster(v):
+                cells.append(v)
+                continue
+            segments: dict[tuple[int, int], list[int]] = (
+                self._segments[cluster]
+            )
+            if (u, v) not in segments:
+                segments[u, v] = self._trace_node(v, u)[1:]
+            cells.extend(segments[u, v])
+        cells.extend(self._trace_node(last, g_links[last][1])[-2::-1])
+        return cells
+
+    def _search(
+        self,
+        s_links: dict[int, tuple[int, int]],
+        g_links: dict[int, tuple[int, int]],
+        goal: Location2D,
+        direct: int | None = None,
+    ) -> list[int]:
+        """
+        Runs A* over the abstract graph, from a virtual start linked to the
+        nodes of `s_links` into a virtual goal linked to the ones of `g_links`
+        (and to the start, if there's a `direct` path within a cluster), with
+        the Manhattan distance to `goal` (times `weight`) as heuristic. Ties
+        are broken towards the nodes closest to `goal`.
+        :return: The sequence of nodes, from `_START` to `_GOAL`.
+        """
+        cols, weight = self.cols, self.weight
+        gy, gx = goal.y, goal.x
+        # Paths end next to `goal` if it can't be stepped on.
+        slack: int = 0 if self.free[gy, gx] else 1
+        costs: dict[int, float] = {_START: 0.0}
+        parents: dict[int, int | None] = {_START: None}
+        # Elements are: ``(cost + heuristic, heuristic, node)``
+        frontier: list[tuple[float, int, int]] = [(0.0, 0, _START)]
+        if direct is not None:
+            costs[_GOAL], parents[_GOAL] = direct, _START
+            frontier.append((direct, 0, _GOAL))
+        closed: set[int] = set()
+        while frontier:
+            u: int = heapq.heappop(frontier)[2]
+            if u == _GOAL:
+                path: list[int] = []
+                while u is not None:
+                    path.append(u)
+                    u = parents[u]
+                return path[::-1]
+            if u in closed:
+                continue
+            closed.add(u)
+            cost: float = costs[u]
+            if u in g_links:
+                total_cost: float = cost + g_links[u][0]
+                if total_cost < costs.get(_GOAL, math.inf):
+                    costs[_GOAL], parents[_GOAL] = total_cost, u
+                    heapq.heappush(frontier, (total_cost, 0, _GOAL))
+            if u == _START:
+                edges: list[tuple[int, float]] = [
+                    (v, d) for v, (d, _) in s_links.items()
+                ]
+            else:
+                edges = self._edges[u].items()
+            for v, edge_cost in edges:
+                total_cost = cost + edge_cost
+                if total_cost < costs.get(v, math.inf):
+                    costs[v] = total_cost
+                    parents[v] = u
+                    y, x = divmod(v, cols)
+                    h: float = abs(y - gy) + abs(x - gx) - slack
+                    h = weight * h if h > 0 else 0
+                    heapq.heappush(frontier, (total_cost + h, h, v))
+        return []
+
+    def _search_cluster(
+        self,
+        cluster: Cluster,
+        sources: list[int],
+        targets: list[int],
+        goal: Location2D,
+    ) -> list[int]:
+        """
+        Runs A* within `cluster`, from its free cells `sources` to the closest
+        of its free cells `targets` (which are `goal` or its neighbours).
+        :return: The cells along the path, or an empty list if there's none.
+        """
+        y0, y1, x0, x1 = self._get_bounds(cluster)
+        height, width = y1 - y0, x1 - x0
+        free: list[bool] = self.free[y0:y1, x0:x1].ravel().tolist()
+        gy, gx = goal.y - y0, goal.x - x0
+        slack: int = 0 if self.free[goal.y, goal.x] else 1
+        ends: set[int] = {
+            (g // self.cols - y0) * width + g % self.cols - x0
+            for g in targets
+        }
+        # Cells are cluster-local here, i.e., ``y * width + x``.
+        parents: dict[int, int | None] = {
+            (s // self.cols - y0) * width + s % self.cols - x0: None
+            for s in sources
+        }
+        costs: dict[int, int] = dict.fromkeys(parents, 0)
+        # Elements are: ``(cost + heuristic, heuristic, cell)``
+        frontier: list[tuple[int, int, int]] = [(0, 0, j) for j in parents]
+        closed: set[int] = set()
+        while frontier:
+            j: int = heapq.heappop(frontier)[2]
+            if j in ends:
+                path: list[int] = []
+                while j is not None:
+                    y, x = divmod(j, width)
+                    path.append((y + y0) * self.cols + x + x0)
+                    j = parents[j]
+                return path[::-1]
+            if j in closed:
+                continue
+            closed.add(j)
+            y, x = divmod(j, width)
+            cost: int = costs[j] + 1
+            for k, inside in (
+                (j - width, y > 0),
+                (j + width, y < height - 1),
+                (j - 1, x > 0),
+                (j + 1, x < width - 1),
+            ):
+                if inside and free[k] and cost < costs.get(k, math.inf):
+                    costs[k], parents[k] = cost, j
+                    ky, kx = divmod(k, width)
+                    h: int = max(abs(ky - gy) + abs(kx - gx) - slack, 0)
+                    heapq.heappush(frontier, (cost + h, h, k))
+        return []
+
+    def _trace(
+        self,
+        cluster: Cluster,
+        actions: np.ndarray,
+        i: int,
+    ) -> list[int]:
+        """
+        Follows the (cluster-local) action field `actions` backwards from the
+        cell `i`, until reaching one of its initial cells.
+        """
+        y0, _, x0, x1 = self._get_bounds(cluster)
+        width: int = x1 - x0
+        y, x = divmod(i, self.cols)
+        j: int = (y - y0) * width + x - x0
+        moves: list[tuple[int, int]] = self._moves[width]
+        flat: np.ndarray = actions.ravel()
+        path: list[int] = [i]
+        while (k := flat.item(j)) >= 0:
+            move, local_move = moves[k]
+            i -= move
+            j -= local_move
+            path.append(i)
+        return path
+
+    def _trace_node(self, node: int, i: int) -> list[int]:
+        """
+        Returns the cells along the shortest path from the cell `i` to `node`,
+        in the same cluster, using the node's action field.
+        """
+        cluster: Cluster = self._get_cluster(node)
+        return self._trace(
+            cluster, self._fields[cluster][self._slots[node]], i
+        )
+
+    def _index(self, location: Location2D) -> int:
+        return location.y * self.cols + location.x
@@ -0,0 +1,155 @@
+import math
+from collections.abc import Iterable
+
+import numpy as np
+
+import util
+from policies import GridPolicy
+from policies import MISSING
+from policies import NO_ACTION
+from problems import Action
+from problems import Location2D
+
+
+class IncrementalField:
+    """
+    Keeps the cost-to-go and action grids of a `GridPolicy` up to date while
+    the map changes, using Lifelong Planning A* (LPA*) without a heuristic.
+    Only the cells whose cost-to-go changes (and their neighbours) are
+    visited, instead of searching the whole map again.
+
+    The policy's arrays are updated in place, so anyone following the policy
+    (e.g., a `Robot`) sees the repaired version right away.
+    """
+
+    def __init__(
+        self,
+        free: np.ndarray,
+        policy: GridPolicy,
+        cost: float = 1.0,
+    ) -> None:
+        """
+        :param free: Whether each cell can be stepped on, with shape ``(rows,
+            cols)``. It's shared with the caller, who changes it before calling
+            `repair`.
+        :param policy: Policy computed over `free`, including its costs.
+        :param cost: Cost of each move.
+        """
+        if policy.costs is None:
+            raise ValueError("the policy has no costs to repair")
+        if not policy.actions.flags.writeable:
+            policy.actions = np.array(policy.actions)
+        if not policy.costs.flags.writeable:
+            policy.costs = np.array(policy.costs)
+        self.free: np.ndarray = free
+        self.policy: GridPolicy = policy
+        self.cost: float = cost
+        self.rows, self.cols = free.shape
+        costs: np.ndarray = policy.costs.astype(float).ravel()
+        if np.issubdtype(policy.costs.dtype, np.integer):
+            unreachable: int = np.iinfo(policy.costs.dtype).max
+            costs[policy.costs.ravel() == unreachable] = math.inf
+        # Current (`g`) and one-step lookahead (`rhs`) costs of each cell.
+        self._g: list[float] = costs.tolist()
+        self._rhs: list[float] = costs.tolist()
+        self._sources: set[int] = set(
+            np.flatnonzero(policy.actions.ravel() == NO_ACTION).tolist()
+        )
+        self._moves: list[tuple[int, int]] = [a.value for a in Action]
+
+    def repair(self, cells: Iterable[Location2D]) -> int:
+        """
+        Updates the policy after the given cells changed in `free`.
+        :return: The number of cells whose cost-to-go changed.
+        """
+        queue: util.PriorityQueue = util.PriorityQueue()
+        changed: set[int] = set()
+        for x, y in cells:
+            i: int = y * self.cols + x
+            self._update_cell(i, queue)
+            for j in self._neighbours(i):
+                self._update_cell(j, queue)
+        g, rhs = self._g, self._rhs
+        while queue:
+            i = queue.pop()
+            changed.add(i)
+            if g[i] > rhs[i]:
+                g[i] = rhs[i]
+            else:
+                g[i] = math.inf
+                self._update_cell(i, queue)
+            for j in self._neighbours(i):
+                self._update_cell(j, queue)
+        self._write({
+            j for i in changed for j in (i, *self._neighbours(i))
+        })
+        return len(changed)
+
+    def _expandable(self, i: int) -> bool:
+        """
+        Whether the search can go through the cell `i`.
+        """
+        return i in self._sources or self.free.item(i)
+
+    def _neighbours(self, i: int) -> list[int]:
+        y, x = divmod(i, self.cols)
+        return [
+            (y + dy) * self.cols + x + dx
+            for dy, dx in self._moves
+            if 0 <= y + dy < self.rows and 0 <= x + dx < self.cols
+        ]
+
+    def _update_cell(self, i: int, queue: util.PriorityQueue) -> None:
+        """
+        Recomputes the lookahead cost of the cell `i`, queueing it if it's
+        inconsistent.
+        """
+        if i not in self._sources:
+            self._rhs[i] = math.inf
+            if self.free.item(i):
+                self._rhs[i] = min(
+                    (
+                        self._g[j] + self.cost
+                        for j in self._neighbours(i)
+                        if self._expandable(j)
+                    ),
+                    default=math.inf,
+                )
+        if self._g[i] != self._rhs[i]:
+            queue.set(i, min(self._g[i], self._rhs[i]))
+        else:
+            queue.remove(i)
+
+    def _write(self, cells: set[int]) -> None:
+        """
+        Copies the costs of the given cells into the policy, along with the
+        action leading to their best neighbour.
+        """
+        actions: np.ndarray = self.policy.actions.reshape(-1)
+        costs: np.ndarray = self.policy.costs.reshape(-1)
+        inf: float = math.inf
+        if np.issubdtype(costs.dtype, np.integer):
+            inf = np.iinfo(costs.dtype).max
+        for i in cells:
+            g: float = self._g[i]
+            costs[i] = inf if g == math.inf else g
+            if g == math.inf:
+                actions[i] = MISSING
+            elif i in self._sources:
+                actions[i] = NO_ACTION
+            else:
+                actions[i] = self._get_action(i)
+
+    def _get_action(self, i: int) -> int:
+        """
+        Returns the index (in `Action`) of the action leading from the cell `i`
+        to its neighbour with the lowest cost-to-go.
+        """
+        y, x = divmod(i, self.cols)
+        for k, (dy, dx) in enumerate(self._moves):
+            if not (0 <= y + dy < self.rows and 0 <= x + dx < self.cols):
+                continue
+            j: int = (y + dy) * self.cols + x + dx
+            if self._expandable(j) and self._g[j] + self.cost == self._g[i]:
+                return k
+        return MISSING
@@ -0,0 +1,143 @@
+import mmap
+import random
+import struct
+import sys
+
+import numpy as np
+
+import util
+from problems import CellType
+from problems import Location2D
+
+# Header of the compiled map files: magic bytes, rows, columns and number of
+# cell types, followed by the code and number of cells of each type.
+MAGIC: bytes = b"WHMAP\x00\x00\x01"
+_HEADER: struct.Struct = struct.Struct("<8sIII")
+_TYPE: struct.Struct = struct.Struct("<4sQ")
+
+
+class WarehouseMap:
+    """
+    Warehouse layout as a grid of cell type codes (the ``uint8`` value of
+    each `CellType` character), plus the ids (``y * cols + x``) of the cells
+    of each type, so that they can be listed or sampled without scanning the
+    grid.
+
+    Maps can be compiled into a binary file (see `save`), which `load` maps
+    into memory instead of parsing it.
+    """
+
+    def __init__(
+        self,
+        grid: np.ndarray,
+        cells: dict[CellType, np.ndarray] | None = None,
+    ) -> None:
+        """
+        :param grid: ``uint8`` array of shape ``(rows, cols)``.
+        :param cells: ``int32`` ids of the cells of each type, in increasing
+            order. Computed from `grid` if not given.
+        """
+        self.grid: np.ndarray = grid
+        self.rows, self.cols = grid.shape
+        if cells is None:
+            flat: np.ndarray = grid.ravel()
+            cells = {
+                type_: np.flatnonzero(flat == ord(type_.value)).astype(
+                    np.int32
+                )
+                for type_ in CellType
+            }
+        self.cells: dict[CellType, np.ndarray] = cells
+
+    @classmethod
+    def from_lines(cls, lines: list[str]) -> "WarehouseMap":
+        """
+        Builds the map of a text layout, as read by `util.read_map`.
+        """
+        content: bytes = "".join(lines).encode("ascii")
+        grid: np.ndarray = np.frombuffer(content, np.uint8)
+        return cls(grid.reshape(len(lines), -1).copy())
+
+    @classmethod
+    def load(cls, path: str) -> "WarehouseMap":
+        """
+        Loads the map in `path`, either compiled (memory-mapped, without
+        copying nor parsing it) or as text.
+        """
+        with open(path, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                return cls.from_lines(util.read_map(path))
+            buffer: mmap.mmap = mmap.mmap(
+                file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        _, rows, cols, n_types = _HEADER.unpack_from(buffer)
+        offset: int = _HEADER.size
+        counts: dict[CellType, int] = {}
+        for _ in range(n_types):
+            code, count = _TYPE.unpack_from(buffer, offset)
+            counts[CellType(code.rstrip(b"\x00").decode())] = count
+            offset += _TYPE.size
+        grid: np.ndarray = np.frombuffer(buffer, np.uint8, rows * cols, offset)
+        offset = _align(offset + rows * cols)
+        cells: dict[CellType, np.ndarray] = {}
+        for type_, count in counts.items():
+            cells[type_] = np.frombuffer(buffer, np.int32, count, offset)
+            offset += count * 4
+        return cls(grid.reshape(rows, cols), cells)
+
+    def save(self, path: str) -> None:
+        """
+        Compiles the map into the binary file `path`, for `load`.
+        """
+        with open(path, "wb") as file:
+            file.write(
+                _HEADER.pack(MAGIC, self.rows, self.cols, len(self.cells))
+            )
+            for type_, cells in self.cells.items():
+                file.write(_TYPE.pack(type_.value.encode(), len(cells)))
+            file.write(self.grid.tobytes())
+            file.write(b"\x00" * (_align(file.tell()) - file.tell()))
+            for cells in self.cells.values():
+                file.write(cells.astype("<i4").tobytes())
+
+    def lines(self) -> list[str]:
+        """
+        Returns the map as a text layout, as read by `util.read_map`.
+        """
+        return [row.tobytes().decode("ascii") for row in self.grid]
+
+    def locations(self, type_: CellType) -> list[Location2D]:
+        """
+        Returns the cells of the given `type_`, in row-major order.
+        """
+        return [self._location(i) for i in self.cells[type_].tolist()]
+
+    def sample(
+        self,
+        type_: CellType,
+        k: int,
+        rng: random.Random,
+    ) -> list[Location2D]:
+        """
+        Returns `k` distinct random cells of the given `type_`, as
+        ``rng.sample(self.locations(type_), k)`` would, but without listing
+        all of them.
+        """
+        cells: np.ndarray = self.cells[type_]
+        return [
+            self._location(cells.item(j))
+            for j in rng.sample(range(len(cells)), k)
+        ]
+
+    def _location(self, i: int) -> Location2D:
+        y, x = divmod(i, self.cols)
+        return Location2D(x, y)
+
+
+def _align(offset: int, alignment: int = 8) -> int:
+    return -(-offset // alignment) * alignment
+
+
+if __name__ == "__main__":
+    # Usage: python maps.py <text map> <compiled map>
+    WarehouseMap.load(sys.argv[1]).save(sys.argv[2])
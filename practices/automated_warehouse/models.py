@@ -1,9 +1,20 @@
 import dataclasses
+import enum
+from collections.abc import Mapping
+from collections.abc import Sequence
 from typing import Callable
 
+import numpy as np
+
+from policies import GridPolicy
+from policies import NO_ACTION
 from problems import Action
 from problems import Location2D
 
+# Displacement of each action, indexed by its position in `Action`.
+_dys: np.ndarray = np.array([action.value[0] for action in Action])
+_dxs: np.ndarray = np.array([action.value[1] for action in Action])
+
 
 @dataclasses.dataclass(frozen=True)
 class Package:
@@ -15,6 +26,9 @@ class Package:
 
     location: Location2D
     destination: Location2D
+    # Number of the order it belongs to, telling apart packages from the same
+    # rack into the same belt.
+    order: int = 0
 
 
 @dataclasses.dataclass
@@ -29,9 +43,9 @@ class Robot:
     rest: Location2D | None = None
 
     def __post_init__(self) -> None:
-        self._delivery_policy: dict[Location2D, Action] = {}
-        self._pickup_policy: dict[Location2D, Action] = {}
-        self._rest_policy: dict[Location2D, Action] = {}
+        self._delivery_policy: Mapping[Location2D, Action] = {}
+        self._pickup_policy: Mapping[Location2D, Action] = {}
+        self._rest_policy: Mapping[Location2D, Action] = {}
         # Whether the robot is navigating to the package's location.
         self.is_picking_up: bool = False
         # Whether the robot is navigating to the package's destination.
@@ -70,13 +84,15 @@ class Robot:
 
     def policy_step(
         self,
-        policy: dict[Location2D, Action],
+        policy: Mapping[Location2D, Action],
         stop_condition: Callable[[Location2D, Location2D], bool],
     ) -> Package:
         """
-        Follows `policy` from the start until `stop_condition` is met.
+        Follows `policy` from the start until `stop_condition` is met. The
+        robot stays in place where `policy` has no action (e.g., if a map
+        change cut it off).
         """
-        if action := policy[self.location]:
+        if action := policy.get(self.location):
             new_location: Location2D = action.apply(self.location)
             # Stop before stepping on the conveyor belt.
             if stop_condition(self.location, new_location):
@@ -97,8 +113,8 @@ class Robot:
     def prepare(
         self,
         package: Package,
-        pickup_policy: dict[Location2D, Action],
-        delivery_policy: dict[Location2D, Action],
+        pickup_policy: Mapping[Location2D, Action],
+        delivery_policy: Mapping[Location2D, Action],
     ) -> None:
         self.package = package
         self.rest = None
@@ -111,9 +127,264 @@ class Robot:
     def set_rest(
         self,
         rest: Location2D,
-        rest_policy: dict[Location2D, Action],
+        rest_policy: Mapping[Location2D, Action],
     ) -> None:
         self.is_picking_up = False
         self.is_delivering = False
         self.rest = rest
         self.rest_policy = rest_policy
+
+
+class Phase(enum.IntEnum):
+    """
+    What a robot of a `Fleet` is currently doing.
+    """
+
+    IDLE = 0
+    PICKUP = 1
+    DELIVERY = 2
+    REST = 3
+
+
+class Fleet(Sequence):
+    """
+    Struct-of-arrays container of robots, whose locations, phases and
+    policies are kept in NumPy arrays, so that all of them are advanced at
+    once by `step`.
+
+    Policies must be array-backed (`GridPolicy` instances): each one is copied
+    into a stack of action grids, so a single gather returns the action of
+    every robot. Indexing the fleet returns a `RobotView`, which behaves as a
+    `Robot`.
+    """
+
+    def __init__(self, locations: list[Location2D]) -> None:
+        """
+        :param locations: Initial location of each robot.
+        """
+        n: int = len(locations)
+        self.xs: np.ndarray = np.array([x for x, _ in locations], np.intp)
+        self.ys: np.ndarray = np.array([y for _, y in locations], np.intp)
+        self.phases: np.ndarray = np.zeros(n, np.int8)
+        # Index (in the stack) of the policy used in each phase, or -1.
+        self.policy_ids: np.ndarray = np.full((n, len(Phase)), -1, np.intp)
+        self.packages: list[Package | None] = [None] * n
+        self.rests: list[Location2D | None] = [None] * n
+        self._policies: list[GridPolicy] = []
+        # Index of each policy in the stack, by `id`.
+        self._ids: dict[int, int] = {}
+        self._stack: np.ndarray | None = None
+        self._views: list[RobotView] = [RobotView(self, i) for i in range(n)]
+
+    def step(
+        self,
+        robots: np.ndarray | None = None,
+    ) -> tuple[list[Package], list[Package]]:
+        """
+        Moves every robot one step forward according to its current policy.
+        Robots stop right before their package's rack or destination belt, and
+        on their resting location. Where the policy has no action (e.g., if a
+        map change cut it off), robots stay in place.
+        :param robots: Optional indexes of the only robots to move.
+        :return: The packages picked up and delivered in this step.
+        """
+        if robots is None:
+            robots = np.flatnonzero(self.phases != Phase.IDLE)
+        else:
+            robots = robots[self.phases[robots] != Phase.IDLE]
+        if not len(robots):
+            return [], []
+        phases: np.ndarray = self.phases[robots]
+        ids: np.ndarray = self.policy_ids[robots, phases]
+        xs, ys = self.xs[robots], self.ys[robots]
+        codes: np.ndarray = self._stack[ids, ys, xs]
+        moving: np.ndarray = codes >= 0
+        robots, phases, ids = robots[moving], phases[moving], ids[moving]
+        codes = codes[moving]
+        new_xs: np.ndarray = xs[moving] + _dxs[codes]
+        new_ys: np.ndarray = ys[moving] + _dys[codes]
+        # Only the racks and belts are targets not to be stepped on.
+        arrived: np.ndarray = (phases != Phase.REST) & (
+            self._stack[ids, new_ys, new_xs] == NO_ACTION
+        )
+        self.xs[robots[~arrived]] = new_xs[~arrived]
+        self.ys[robots[~arrived]] = new_ys[~arrived]
+        picked: list[Package] = []
+        delivered: list[Package] = []
+        for i, phase in zip(
+            robots[arrived].tolist(), phases[arrived].tolist()
+        ):
+            if phase == Phase.PICKUP:
+                self.phases[i] = Phase.DELIVERY
+                picked.append(self.packages[i])
+            else:
+                self.phases[i] = Phase.IDLE
+                self.policy_ids[i] = -1
+                delivered.append(self.packages[i])
+                self.packages[i] = None
+        return picked, delivered
+
+    def register(self, policy: GridPolicy) -> int:
+        """
+        Adds `policy` to the stack of action grids, if not already there.
+        :return: Its index in the stack.
+        """
+        if (index := self._ids.get(id(policy))) is not None:
+            return index
+        if self._stack is None:
+            self._stack = np.empty((8, *policy.actions.shape), np.int8)
+        if len(self._policies) == len(self._stack):
+            self._compact()
+        index = len(self._policies)
+        self._stack[index] = policy.actions
+        self._policies.append(policy)
+        self._ids[id(policy)] = index
+        return index
+
+    def refresh(self) -> None:
+        """
+        Copies the action grids again, after the registered policies were
+        changed in place (e.g., by `IncrementalField.repair`).
+        """
+        for index, policy in enumerate(self._policies):
+            self._stack[index] = policy.actions
+
+    def policy(self, i: int, phase: Phase) -> GridPolicy | None:
+        """
+        Returns the policy followed by the `i`-th robot in `phase`, if any.
+        """
+        index: int = int(self.policy_ids[i, phase])
+        return self._policies[index] if index >= 0 else None
+
+    def _compact(self) -> None:
+        """
+        Drops the policies no robot uses anymore, doubling the size of the
+        stack if most of them are still in use.
+        """
+        used: list[int] = np.unique(self.policy_ids[self.policy_ids >= 0])
+        used = used.tolist()
+        remap: np.ndarray = np.full(len(self._policies) + 1, -1, np.intp)
+        remap[used] = np.arange(len(used))
+        self.policy_ids = remap[self.policy_ids]
+        self._policies = [self._policies[index] for index in used]
+        self._ids = {id(p): index for index, p in enumerate(self._policies)}
+        size: int = len(self._stack)
+        if len(used) > size // 2:
+            size *= 2
+        stack: np.ndarray = np.empty((size, *self._stack.shape[1:]), np.int8)
+        stack[: len(used)] = self._stack[used]
+        self._stack = stack
+
+    def __getitem__(self, i: int) -> "RobotView":
+        return self._views[i]
+
+    def __len__(self) -> int:
+        return len(self._views)
+
+
+class RobotView:
+    """
+    View of a single robot of a `Fleet`, with the same interface as `Robot`.
+    Unlike a `Robot`, it keeps its resting location once there, until given
+    a new task.
+    """
+
+    def __init__(self, fleet: Fleet, i: int) -> None:
+        self.fleet: Fleet = fleet
+        self.i: int = i
+
+    @property
+    def location(self) -> Location2D:
+        x, y = self.fleet.xs[self.i], self.fleet.ys[self.i]
+        return Location2D(int(x), int(y))
+
+    @location.setter
+    def location(self, location: Location2D) -> None:
+        self.fleet.xs[self.i], self.fleet.ys[self.i] = location
+
+    @property
+    def package(self) -> Package | None:
+        return self.fleet.packages[self.i]
+
+    @package.setter
+    def package(self, package: Package | None) -> None:
+        self.fleet.packages[self.i] = package
+
+    @property
+    def rest(self) -> Location2D | None:
+        return self.fleet.rests[self.i]
+
+    @rest.setter
+    def rest(self, rest: Location2D | None) -> None:
+        self.fleet.rests[self.i] = rest
+        if rest is None and self.fleet.phases[self.i] == Phase.REST:
+            self.fleet.phases[self.i] = Phase.IDLE
+            self.fleet.policy_ids[self.i, Phase.REST] = -1
+
+    @property
+    def rest_policy(self) -> Mapping[Location2D, Action]:
+        return self.fleet.policy(self.i, Phase.REST) or {}
+
+    @property
+    def is_free(self) -> bool:
+        return self.package is None
+
+    @property
+    def is_going_to_rest(self) -> bool:
+        return self.rest is not None
+
+    @property
+    def is_picking_up(self) -> bool:
+        return self.fleet.phases[self.i] == Phase.PICKUP
+
+    @is_picking_up.setter
+    def is_picking_up(self, value: bool) -> None:
+        self._set_phase(Phase.PICKUP, value)
+
+    @property
+    def is_delivering(self) -> bool:
+        return self.fleet.phases[self.i] == Phase.DELIVERY
+
+    @is_delivering.setter
+    def is_delivering(self, value: bool) -> None:
+        self._set_phase(Phase.DELIVERY, value)
+
+    def step(self) -> Package | None:
+        """
+        Moves this robot alone one step forward (see `Fleet.step`).
+        :return: The package picked up in this step, if any.
+        """
+        picked, _ = self.fleet.step(np.array([self.i]))
+        return picked[0] if picked else None
+
+    def prepare(
+        self,
+        package: Package,
+        pickup_policy: GridPolicy,
+        delivery_policy: GridPolicy,
+    ) -> None:
+        fleet: Fleet = self.fleet
+        # Registering may compact the stack, so the robot's old policies are
+        # released first and the new ones stored right away.
+        fleet.policy_ids[self.i] = -1
+        index: int = fleet.register(pickup_policy)
+        fleet.policy_ids[self.i, Phase.PICKUP] = index
+        index = fleet.register(delivery_policy)
+        fleet.policy_ids[self.i, Phase.DELIVERY] = index
+        fleet.phases[self.i] = Phase.PICKUP
+        fleet.packages[self.i] = package
+        fleet.rests[self.i] = None
+
+    def set_rest(self, rest: Location2D, rest_policy: GridPolicy) -> None:
+        fleet: Fleet = self.fleet
+        fleet.policy_ids[self.i] = -1
+        index: int = fleet.register(rest_policy)
+        fleet.policy_ids[self.i, Phase.REST] = index
+        fleet.phases[self.i] = Phase.REST
+        fleet.rests[self.i] = rest
+
+    def _set_phase(self, phase: Phase, value: bool) -> None:
+        if value:
+            self.fleet.phases[self.i] = phase
+        elif self.fleet.phases[self.i] == phase:
+            self.fleet.phases[self.i] = Phase.IDLE
@@ -0,0 +1,252 @@
+import math
+from typing import Callable
+
+import numpy as np
+
+from problems import Action
+from problems import CompiledGrid2D
+from problems import Field
+from problems import Location2D
+from search import MultiPolicy
+
+
+class DistanceOracle:
+    """
+    Precomputed shortest-path distances between the key locations of a
+    warehouse (racks, belts and resting locations), answered in O(1), plus
+    the distances from a few landmark cells to every cell, which give ALT
+    lower bounds for any other pair of cells.
+
+    Racks and belts can't be stepped on: distances from or into them count
+    the step out of or into them, as the robots' policies do.
+
+    Arrays are stored as ``.npy`` files, and loaded back as read-only
+    `numpy.memmap` instances (see `PolicyStore`).
+    """
+
+    def __init__(
+        self,
+        keys: np.ndarray,
+        distances: np.ndarray,
+        landmarks: np.ndarray,
+        free: np.ndarray,
+    ) -> None:
+        """
+        :param keys: ``(x, y)`` coordinates of each key location, with shape
+            ``(n, 2)``.
+        :param distances: Distance between each pair of key locations, with
+            shape ``(n, n)``. For ``uint16`` arrays, the maximum value stands
+            for ``inf``.
+        :param landmarks: Distance from each landmark into each cell, with
+            shape ``(landmarks, rows, cols)``, and the same type as
+            `distances`.
+        :param free: Whether each cell can be stepped on, with shape ``(rows,
+            cols)``.
+        """
+        self.keys: np.ndarray = keys
+        self.distances: np.ndarray = distances
+        self.landmarks: np.ndarray = landmarks
+        self.free: np.ndarray = free
+        # Index of each key location in `distances`.
+        self._ids: dict[Location2D, int] = {
+            Location2D(x, y): i for i, (x, y) in enumerate(keys.tolist())
+        }
+        self._inf: float = math.inf
+        if np.issubdtype(distances.dtype, np.integer):
+            self._inf = np.iinfo(distances.dtype).max
+
+    @classmethod
+    def build(
+        cls,
+        graph: CompiledGrid2D,
+        keys: list[Location2D],
+        n_landmarks: int = 8,
+        chunk_size: int = 16,
+        workers: int = 1,
+    ) -> "DistanceOracle":
+        """
+        Searches the distances from each location in `keys` (in batches of
+        `chunk_size`), and from `n_landmarks` free cells spread around the
+        map by farthest-point selection. The key locations are searched on
+        `workers` processes (see `MultiPolicy`).
+        """
+        keys = list(dict.fromkeys(keys))
+        search: MultiPolicy = MultiPolicy(chunk_size, workers)
+        ids: np.ndarray = np.array([graph.index(key) for key in keys])
+        distances: np.ndarray = np.empty((len(keys), len(keys)))
+        # Keys searched at once: a chunk per worker. The workers are then
+        # shut down, as landmarks are searched one at a time, in process.
+        block: int = chunk_size * max(workers, 1)
+        with search:
+            for i in range(0, len(keys), block):
+                fields: list[Field] = search.run_compiled(
+                    graph, keys[i:i + block]
+                )
+                for k, field in enumerate(fields, i):
+                    distances[k] = _entering(graph, field)[ids]
+        free: np.ndarray = graph.free.ravel()
+        start: Location2D = keys[0] if keys else graph.location(
+            int(np.argmax(free))
+        )
+        # Distance from each cell into the closest landmark (into `start`,
+        # before choosing the first one).
+        closest: np.ndarray = _entering(
+            graph, search.run_compiled(graph, [start])[0]
+        )
+        landmarks: list[np.ndarray] = []
+        for k in range(min(n_landmarks, int(free.sum()))):
+            scores: np.ndarray = np.where(
+                free & np.isfinite(closest), closest, -1.0
+            )
+            landmark: Location2D = graph.location(int(np.argmax(scores)))
+            field: Field = search.run_compiled(graph, [landmark])[0]
+            landmarks.append(_entering(graph, field))
+            if k:
+                closest = np.minimum(closest, landmarks[-1])
+            else:
+                closest = landmarks[-1]
+        grids: np.ndarray = np.array(landmarks).reshape(
+            -1, graph.rows, graph.cols
+        )
+        finite: np.ndarray = np.concatenate(
+            [distances[np.isfinite(distances)], grids[np.isfinite(grids)]]
+        )
+        dtype: type = np.float32
+        if finite.max(initial=0) < np.iinfo(np.uint16).max:
+            dtype = np.uint16
+        return cls(
+            np.array([tuple(key) for key in keys], np.int32).reshape(-1, 2),
+            _compact(distances, dtype),
+            _compact(grids, dtype),
+            graph.free.copy(),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "DistanceOracle":
+        """
+        Memory-maps the oracle saved into `path` (a prefix for its files).
+        """
+        return cls(*(np.load(f"{path}.{name}.npy", "r") for name in _FILES))
+
+    def save(self, path: str) -> None:
+        """
+        Stores the oracle into `path` (a prefix for its files).
+        """
+        arrays: tuple[np.ndarray, ...] = (
+            self.keys, self.distances, self.landmarks, self.free
+        )
+        for name, array in zip(_FILES, arrays):
+            np.save(f"{path}.{name}.npy", array)
+
+    def __contains__(self, location: Location2D) -> bool:
+        return location in self._ids
+
+    def distance(self, a: Location2D, b: Location2D) -> float:
+        """
+        Returns the shortest-path distance between the key locations `a` and
+        `b` (``inf`` if there's no path).
+        """
+        distance: float = self.distances.item(self._ids[a], self._ids[b])
+        return math.inf if distance == self._inf else float(distance)
+
+    def lower_bound(self, a: Location2D, b: Location2D) -> float:
+        """
+        Returns a lower bound of the shortest-path distance between any cells
+        `a` and `b`: the exact distance if both are key locations, or the
+        largest one given by the triangle inequality over the landmarks.
+
+        As paths can't go through racks nor belts, each landmark only bounds
+        the distance from (or into) the cells that can be stepped on.
+        """
+        if a in self._ids and b in self._ids:
+            return self.distance(a, b)
+        from_a: np.ndarray = self._from_landmarks(a)
+        from_b: np.ndarray = self._from_landmarks(b)
+        bound: float = 0.0
+        with np.errstate(invalid="ignore"):
+            if self.free[a.y, a.x]:
+                bound = np.fmax.reduce(from_b - from_a, initial=bound)
+            if self.free[b.y, b.x]:
+                bound = np.fmax.reduce(from_a - from_b, initial=bound)
+        return float(bound)
+
+    def heuristic(self, goal: Location2D) -> Callable[[int], float]:
+        """
+        Returns a function giving the lower bound (see `lower_bound`) of the
+        distance from a cell id into `goal`, to be used as an A* heuristic.
+        Bounds are only computed for the cells the search reaches.
+        """
+        # Landmark distances into the goal and into each cell, skipping the
+        # landmarks that can't reach the goal.
+        landmarks: list[tuple[float, np.ndarray]] = [
+            (distance, grid)
+            for distance, grid in zip(
+                self._from_landmarks(goal).tolist(),
+                self.landmarks.reshape(len(self.landmarks), -1),
+            )
+            if distance != math.inf
+        ]
+        free: np.ndarray = self.free.ravel()
+        inf: float = self._inf
+        # Whether the bounds from the goal's side hold too.
+        both_ways: bool = bool(self.free[goal.y, goal.x])
+
+        def bound(i: int) -> float:
+            if not free.item(i):
+                return 0.0
+            best: float = 0.0
+            for to_goal, grid in landmarks:
+                distance: float = grid.item(i)
+                if distance == inf:
+                    continue
+                gap: float = to_goal - distance
+                if both_ways and gap < 0:
+                    gap = -gap
+                if gap > best:
+                    best = gap
+            return float(best)
+
+        return bound
+
+    def _from_landmarks(self, location: Location2D) -> np.ndarray:
+        """
+        Returns the distance from each landmark into `location`.
+        """
+        distances: np.ndarray = self.landmarks[:, location.y, location.x]
+        return np.where(distances == self._inf, math.inf, distances)
+
+
+# Suffixes of the files of a saved `DistanceOracle`, in constructor order.
+_FILES: tuple[str, ...] = ("keys", "distances", "landmarks", "free")
+
+
+def _entering(graph: CompiledGrid2D, field: Field) -> np.ndarray:
+    """
+    Returns the costs of `field`, completed with the cost of stepping into the
+    cells that can't be stepped on (e.g., racks) from their cheapest free
+    neighbour.
+    """
+    costs: np.ndarray = np.asarray(field.costs).reshape(graph.rows, graph.cols)
+    padded: np.ndarray = np.pad(costs, 1, constant_values=math.inf)
+    neighbours: np.ndarray = np.min(
+        [
+            padded[1 + dy:graph.rows + 1 + dy, 1 + dx:graph.cols + 1 + dx]
+            for dy, dx in (action.value for action in Action)
+        ],
+        axis=0,
+    )
+    entering: np.ndarray = np.where(
+        graph.free, costs, np.minimum(costs, neighbours + graph.min_cost)
+    )
+    return entering.ravel()
+
+
+def _compact(array: np.ndarray, dtype: type) -> np.ndarray:
+    """
+    Converts `array` into `dtype`, with its maximum value standing for
+    ``inf`` for integer types (as in `GridPolicy`).
+    """
+    if np.issubdtype(dtype, np.integer):
+        inf: int = np.iinfo(dtype).max
+        return np.where(np.isfinite(array), array, inf).astype(dtype)
+    return array.astype(dtype)
@@ -0,0 +1,165 @@
+import collections
+import csv
+import itertools
+import json
+import os
+import random
+from collections.abc import Iterable
+from collections.abc import Iterator
+
+from models import Package
+from problems import Location2D
+
+# Fields of each order in the CSV and JSONL order logs.
+FIELDS: tuple[str, ...] = ("tick", "x", "y", "belt_x", "belt_y")
+
+
+def poisson_orders(
+    rate: float,
+    racks: list[Location2D],
+    belts: list[Location2D],
+    seed: int | None = None,
+) -> Iterator[tuple[int, Package]]:
+    """
+    Generates an endless stream of orders arriving as a Poisson process, for
+    random racks and belts.
+    :param rate: Mean number of orders per tick.
+    :return: Pairs of arrival tick and package, in arrival order.
+    """
+    rng: random.Random = random.Random(seed)
+    time: float = 0.0
+    for order in itertools.count():
+        time += rng.expovariate(rate)
+        package: Package = Package(
+            rng.choice(racks), rng.choice(belts), order
+        )
+        yield int(time), package
+
+
+def read_orders(path: str) -> Iterator[tuple[int, Package]]:
+    """
+    Replays the orders logged in a CSV (with a header) or JSONL file, whose
+    records have the fields in `FIELDS`, sorted by tick.
+    :return: Pairs of arrival tick and package, in arrival order.
+    """
+    extension: str = os.path.splitext(path)[1]
+    with open(path, newline="") as file:
+        if extension == ".csv":
+            records: Iterable[dict] = csv.DictReader(file)
+        elif extension == ".jsonl":
+            records = (json.loads(line) for line in file if line.strip())
+        else:
+            raise ValueError(f"unknown order log format: {extension}")
+        for order, record in enumerate(records):
+            tick, x, y, belt_x, belt_y = (int(record[f]) for f in FIELDS)
+            package: Package = Package(
+                Location2D(x, y), Location2D(belt_x, belt_y), order
+            )
+            yield tick, package
+
+
+def write_orders(path: str, orders: Iterable[tuple[int, Package]]) -> None:
+    """
+    Logs `orders` into a CSV or JSONL file that `read_orders` can replay.
+    """
+    extension: str = os.path.splitext(path)[1]
+    records: Iterator[dict] = (
+        dict(zip(FIELDS, (tick, *package.location, *package.destination)))
+        for tick, package in orders
+    )
+    with open(path, "w", newline="") as file:
+        if extension == ".csv":
+            writer: csv.DictWriter = csv.DictWriter(file, FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+        elif extension == ".jsonl":
+            file.writelines(json.dumps(record) + "\n" for record in records)
+        else:
+            raise ValueError(f"unknown order log format: {extension}")
+
+
+class OrderQueue:
+    """
+    Admits a stream of orders into the simulation as they arrive, keeping at
+    most `capacity` of them open (admitted, but not delivered yet).
+
+    When full, new arrivals either wait outside (``"block"``), still counting
+    their waiting time in their latency, or are rejected (``"drop"``).
+    """
+
+    def __init__(
+        self,
+        orders: Iterable[tuple[int, Package]],
+        capacity: int | None = None,
+        overflow: str = "block",
+    ) -> None:
+        """
+        :param orders: Pairs of arrival tick and package, in arrival order
+            (e.g., from `poisson_orders` or `read_orders`).
+        :param capacity: Maximum number of open orders, or ``None`` for no
+            limit.
+        :param overflow: What happens to arrivals while the queue is full:
+            either ``"block"`` or ``"drop"``.
+        """
+        if overflow not in ("block", "drop"):
+            raise ValueError(f"unknown overflow: {overflow}")
+        self.capacity: int | None = capacity
+        self.overflow: str = overflow
+        self._orders: Iterator[tuple[int, Package]] = iter(orders)
+        self._next: tuple[int, Package] | None = next(self._orders, None)
+        # Arrivals waiting for room in the queue.
+        self.blocked: collections.deque[tuple[int, Package]] = (
+            collections.deque()
+        )
+        # Arrival tick of each open order.
+        self.arrivals: dict[Package, int] = {}
+        self.dropped: int = 0
+        # Ticks elapsed between the arrival and delivery of each order.
+        self.latencies: dict[int, int] = {}
+
+    def poll(self, tick: int) -> list[Package]:
+        """
+        Receives the orders arrived until `tick`, admitting as many as there
+        is room for.
+        :return: The admitted packages.
+        """
+        admitted: list[Package] = []
+        while self._next is not None and self._next[0] <= tick:
+            self.blocked.append(self._next)
+            self._next = next(self._orders, None)
+            self._admit(admitted)
+            if self.overflow == "drop" and self.blocked:
+                self.blocked.pop()
+                self.dropped += 1
+        self._admit(admitted)
+        return admitted
+
+    def complete(self, package: Package, tick: int) -> None:
+        """
+        Closes the order of `package`, delivered at `tick`.
+        """
+        arrival: int = self.arrivals.pop(package)
+        self.latencies[package.order] = tick - arrival
+
+    def next_tick(self) -> int | None:
+        """
+        Returns the arrival tick of the next order, if any is left.
+        """
+        return self._next[0] if self._next is not None else None
+
+    @property
+    def open(self) -> int:
+        return len(self.arrivals)
+
+    def _admit(self, admitted: list[Package]) -> None:
+        """
+        Moves the blocked orders into the queue while there is room, appending
+        them to `admitted`.
+        """
+        while self.blocked and not self._is_full():
+            arrival, package = self.blocked.popleft()
+            self.arrivals[package] = arrival
+            admitted.append(package)
+
+    def _is_full(self) -> bool:
+        return self.capacity is not None and self.open >= self.capacity
@@ -0,0 +1,256 @@
+import hashlib
+import os
+import tempfile
+from collections import Counter
+from collections import OrderedDict
+from collections.abc import Iterator
+from collections.abc import Mapping
+
+import numpy as np
+
+from problems import Action
+from problems import CompiledGrid2D
+from problems import Field
+from problems import Location2D
+
+_actions: list[Action] = list(Action)
+
+# Action codes for cells with no action to take (the policy's targets), and
+# for cells not covered by the policy (walls, unreachable cells).
+NO_ACTION: int = -1
+MISSING: int = -2
+
+
+class GridPolicy(Mapping):
+    """
+    Navigation policy backed by a 2D grid of action codes (indices in
+    `Action`), plus an optional grid with the cost-to-go of each cell.
+
+    Behaves as a read-only ``dict[Location2D, Action]``, so it can be used
+    wherever a policy built by `util.reverse_policy` is expected.
+    """
+
+    def __init__(
+        self,
+        actions: np.ndarray,
+        costs: np.ndarray | None = None,
+    ) -> None:
+        """
+        :param actions: ``int8`` array of shape ``(rows, cols)``.
+        :param costs: Optional ``float32`` or ``uint16`` array of the same
+            shape. For integer arrays, the maximum value stands for ``inf``.
+        """
+        self.actions: np.ndarray = actions
+        self.costs: np.ndarray | None = costs
+
+    @classmethod
+    def from_field(
+        cls,
+        graph: CompiledGrid2D,
+        field: Field,
+        cost_dtype: type | None = np.float32,
+    ) -> "GridPolicy":
+        """
+        Constructs the policy to go from any cell to the initial cells of the
+        search that produced `field`, as `util.reverse_policy` does.
+
+        :param cost_dtype: Type of the cost-to-go grid (``np.float32`` or
+            ``np.uint16``), or ``None`` to drop it.
+        """
+        shape: tuple[int, int] = (graph.rows, graph.cols)
+        costs: np.ndarray = np.asarray(field.costs).reshape(shape)
+        actions: np.ndarray = np.asarray(field.actions, dtype=np.int8)
+        actions = actions.reshape(shape).copy()
+        reached: np.ndarray = actions >= 0
+        actions[reached] = (actions[reached] + len(_actions) // 2) % len(
+            _actions
+        )
+        actions[np.isinf(costs)] = MISSING
+        if cost_dtype is None:
+            return cls(actions)
+        if np.issubdtype(cost_dtype, np.integer):
+            inf: int = np.iinfo(cost_dtype).max
+            if costs[~np.isinf(costs)].max(initial=0) >= inf:
+                raise ValueError(f"costs do not fit into {cost_dtype}")
+            costs = np.where(np.isinf(costs), inf, costs)
+        return cls(actions, costs.astype(cost_dtype))
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the policy's arrays, in bytes.
+        """
+        costs: int = 0 if self.costs is None else self.costs.nbytes
+        return self.actions.nbytes + costs
+
+    def cost(self, location: Location2D) -> float:
+        """
+        Returns the cost-to-go from `location` (``inf`` if not covered).
+        """
+        x, y = location
+        rows, cols = self.actions.shape
+        if self.costs is None or not (0 <= y < rows and 0 <= x < cols):
+            return float("inf")
+        cost = self.costs[y, x]
+        if np.issubdtype(self.costs.dtype, np.integer):
+            if cost == np.iinfo(self.costs.dtype).max:
+                return float("inf")
+        return float(cost)
+
+    def _code(self, location: Location2D) -> int:
+        x, y = location
+        rows, cols = self.actions.shape
+        if not (0 <= y < rows and 0 <= x < cols):
+            return MISSING
+        return int(self.actions[y, x])
+
+    def __contains__(self, location: Location2D) -> bool:
+        return self._code(location) != MISSING
+
+    def __getitem__(self, location: Location2D) -> Action | None:
+        code: int = self._code(location)
+        if code == MISSING:
+            raise KeyError(location)
+        return None if code == NO_ACTION else _actions[code]
+
+    def __iter__(self) -> Iterator[Location2D]:
+        for y, x in zip(*np.nonzero(self.actions != MISSING)):
+            yield Location2D(int(x), int(y))
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.actions != MISSING))
+
+
+class PolicyCache:
+    """
+    Bounded, in-memory cache of `GridPolicy` instances keyed by their target
+    location, evicting the least recently used ones first.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 2 ** 20) -> None:
+        """
+        :param max_bytes: Maximum memory used by the cached policies.
+        """
+        self.max_bytes: int = max_bytes
+        self.nbytes: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        # Number of times each target has been requested.
+        self.uses: Counter[Location2D] = Counter()
+        self._policies: OrderedDict[Location2D, GridPolicy] = OrderedDict()
+
+    def get(self, target: Location2D) -> GridPolicy | None:
+        """
+        Returns the cached policy to reach `target`, if any.
+        """
+        self.uses[target] += 1
+        if (policy := self._policies.get(target)) is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._policies.move_to_end(target)
+        return policy
+
+    def put(self, target: Location2D, policy: GridPolicy) -> None:
+        """
+        Caches `policy` as the policy to reach `target`, evicting the least
+        recently used policies if `max_bytes` is exceeded.
+        """
+        if (old := self._policies.pop(target, None)) is not None:
+            self.nbytes -= old.nbytes
+        self._policies[target] = policy
+        self.nbytes += policy.nbytes
+        while self.nbytes > self.max_bytes and len(self._policies) > 1:
+            _, evicted = self._policies.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Drops all cached policies, keeping the statistics.
+        """
+        self._policies.clear()
+        self.nbytes = 0
+
+    def most_used(self, n: int | None = None) -> list[Location2D]:
+        """
+        Returns the `n` most requested targets.
+        """
+        return [target for target, _ in self.uses.most_common(n)]
+
+    @property
+    def hit_rate(self) -> float:
+        requests: int = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    def __contains__(self, target: Location2D) -> bool:
+        return target in self._policies
+
+    def __len__(self) -> int:
+        return len(self._policies)
+
+
+class PolicyStore:
+    """
+    Persistent, on-disk cache of `GridPolicy` instances, keyed by a hash of
+    the map layout and the policy's target location.
+
+    Arrays are stored as ``.npy`` files and loaded back as read-only
+    `numpy.memmap` instances, so that several processes using the same
+    policies share the same memory pages.
+    """
+
+    def __init__(self, directory: str) -> None:
+        """
+        :param directory: Cache directory, created if it doesn't exist.
+        """
+        self.directory: str = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(grid: list[str], target: Location2D) -> str:
+        """
+        Returns the cache key of the policy to reach `target` in `grid`.
+        """
+        content: str = "\n".join(grid) + f"\n{target.x},{target.y}"
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def load(self, grid: list[str], target: Location2D) -> GridPolicy | None:
+        """
+        Returns the cached policy to reach `target` in `grid`, if any.
+        """
+        path: str = self._path(self.key(grid, target))
+        try:
+            actions: np.ndarray = np.load(f"{path}.actions.npy", "r")
+            costs: np.ndarray = np.load(f"{path}.costs.npy", "r")
+        except FileNotFoundError:
+            return None
+        return GridPolicy(actions, costs)
+
+    def save(
+        self,
+        grid: list[str],
+        target: Location2D,
+        policy: GridPolicy,
+    ) -> None:
+        """
+        Stores `policy` as the policy to reach `target` in `grid`.
+        """
+        path: str = self._path(self.key(grid, target))
+        # The actions go last: if they exist, so do the costs.
+        self._write(f"{path}.costs.npy", policy.costs)
+        self._write(f"{path}.actions.npy", policy.actions)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def _write(self, path: str, array: np.ndarray) -> None:
+        """
+        Writes `array` into `path` atomically, so that concurrent readers never
+        see partially written files.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as file:
+            np.save(file, array)
+        os.replace(tmp_path, path)
@@ -1,8 +1,11 @@
 import abc
 import enum
 import math
+from array import array
 from typing import NamedTuple
 
+import numpy as np
+
 
 class Successor(NamedTuple):
     """
@@ -95,6 +98,126 @@ class CellType(enum.Enum):
     WALL: str = "#"
 
 
+class Field(NamedTuple):
+    """
+    Contains the result of searching a `CompiledGrid2D`, indexed by cell id.
+    """
+
+    # Cost of reaching each cell (``inf`` if unreachable).
+    costs: array | np.ndarray
+    # Index (in `Action`) of the action used to reach each cell (``-1`` for
+    # initial or unreachable cells).
+    actions: array | np.ndarray
+
+
+def _array(typecode: str, values: np.ndarray) -> array:
+    """
+    Copies `values` into an `array` of the given `typecode`.
+    """
+    result: array = array(typecode)
+    result.frombytes(np.ascontiguousarray(values, typecode).tobytes())
+    return result
+
+
+class CompiledGrid2D:
+    """
+    Array-backed representation of a `Grid2D` map.
+
+    Each cell is identified by the integer ``y * cols + x``. The edges leaving
+    cell ``i`` are stored in a flat (CSR) table: ``targets[k]``,
+    ``actions[k]`` and ``costs[k]`` for ``offsets[i] <= k < offsets[i + 1]``.
+    """
+
+    def __init__(self, grid: list[str]) -> None:
+        self.rows: int = len(grid)
+        self.cols: int = len(grid[0])
+        content: bytes = "".join(grid).encode("ascii")
+        cells: np.ndarray = np.frombuffer(content, np.uint8)
+        # Whether each cell can be stepped on, with shape ``(rows, cols)``.
+        self.free: np.ndarray = (
+            cells.reshape(self.rows, self.cols) == ord(CellType.FREE.value)
+        )
+        # Edges are built for all cells and actions at once, then the ones
+        # into walls or out of the map are dropped.
+        padded: np.ndarray = np.pad(self.free, 1)
+        ids: np.ndarray = np.arange(len(self)).reshape(self.rows, self.cols)
+        shape: tuple[int, int, int] = (self.rows, self.cols, len(_actions))
+        valid: np.ndarray = np.empty(shape, bool)
+        targets: np.ndarray = np.empty(shape, np.int64)
+        for k, action in enumerate(_actions):
+            dy, dx = action.value
+            valid[..., k] = padded[
+                1 + dy:self.rows + 1 + dy, 1 + dx:self.cols + 1 + dx
+            ]
+            targets[..., k] = ids + dy * self.cols + dx
+        actions: np.ndarray = np.broadcast_to(
+            np.arange(len(_actions), dtype=np.int8), valid.shape
+        )
+        costs: np.ndarray = np.ones(int(valid.sum()))
+        offsets: np.ndarray = np.zeros(len(self) + 1, np.int64)
+        np.cumsum(valid.sum(axis=2).ravel(), out=offsets[1:])
+        self.offsets: array = _array("l", offsets)
+        self.targets: array = _array("l", targets[valid])
+        self.actions: array = _array("b", actions[valid])
+        self.costs: array = _array("d", costs)
+        # Cost shared by all edges, or ``None`` if costs are not uniform.
+        self.unit_cost: float | None = None
+        if len(costs) and (costs == costs[0]).all():
+            self.unit_cost = float(costs[0])
+        self.min_cost: float = float(costs.min()) if len(costs) else 0.0
+
+    def index(self, location: Location2D) -> int:
+        """
+        Returns the cell id of `location`.
+        """
+        return location.y * self.cols + location.x
+
+    def location(self, index: int) -> Location2D:
+        """
+        Returns the location of the cell id `index`.
+        """
+        y, x = divmod(index, self.cols)
+        return Location2D(x, y)
+
+    def policy(self, field: Field) -> dict[Location2D, Successor]:
+        """
+        Converts `field` into a policy, as returned by `search.Dijkstra`.
+        """
+        policy: dict[Location2D, Successor] = {}
+        actions: list[int] = field.actions.tolist()
+        for i, cost in enumerate(field.costs.tolist()):
+            if cost == math.inf:
+                continue
+            location: Location2D = self.location(i)
+            if (k := actions[i]) < 0:
+                policy[location] = Successor(None, None, cost)
+            else:
+                action: Action = _actions[k]
+                previous: Location2D = action.reverse().apply(location)
+                policy[location] = Successor(previous, action, cost)
+        return policy
+
+    def path_policy(
+        self,
+        path: dict[int, Successor],
+    ) -> dict[Location2D, Successor]:
+        """
+        Converts `path`, as returned by `search.AStar.run_compiled`, into a
+        policy covering only the locations along it.
+        """
+        return {
+            self.location(i): Successor(
+                None if previous is None else self.location(previous),
+                None if k < 0 else _actions[k],
+                cost,
+            )
+            for i, (previous, k, cost) in path.items()
+        }
+
+    def __len__(self) -> int:
+        return self.rows * self.cols
+
+
 class Grid2D(SearchProblem):
     """
     Implements `SearchProblem` for 2D-grid-based search problems, where there
@@ -110,6 +233,7 @@ class Grid2D(SearchProblem):
         self._grid: list[str] = grid
         self._initial: list[Location2D] = initial
         self._goals: list[Location2D] = goals
+        self._compiled: CompiledGrid2D | None = None
 
     @property
     def grid(self) -> list[str]:
@@ -119,15 +243,26 @@ class Grid2D(SearchProblem):
         new_state: Location2D = action.apply(state)
         return new_state if self._is_free(new_state) else None
 
+    def compile(self) -> CompiledGrid2D:
+        """
+        Returns the (cached) array-backed representation of the map.
+        """
+        if self._compiled is None:
+            self._compiled = CompiledGrid2D(self._grid)
+        return self._compiled
+
+    def get_goals(self) -> list[Location2D]:
+        return self._goals
+
     def get_initial_state(self) -> list[Location2D]:
         return self._initial
 
     def get_successors(self, state: Location2D) -> list[Successor]:
         successors: list[Successor] = []
-        for action in self._get_actions(state):
-            new_state: Location2D = self.apply(state, action)
-            cost: float = self._cost(state, new_state)
-            successors.append(Successor(new_state, action, cost))
+        for action in Action:
+            if new_state := self.apply(state, action):
+                cost: float = self._cost(state, new_state)
+                successors.append(Successor(new_state, action, cost))
         return successors
 
     @staticmethod
@@ -0,0 +1,178 @@
+import json
+import os
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable
+
+
+class Profiler:
+    """
+    Collects per-phase timers, event counters and gauges of a simulation run
+    (see the `profiler` argument of `ConsoleSimulator`), plus optional
+    `tracemalloc` snapshots of the memory held by the policies.
+
+    Phases may be nested, so their times are inclusive. Simulators only pay
+    for an ``is None`` check when no profiler is given.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[str, float], None] | None = None,
+        trace_memory: bool = False,
+    ) -> None:
+        """
+        :param callback: Optional function called with the name and elapsed
+            time (in seconds) of each phase, as it ends.
+        :param trace_memory: Whether to start `tracemalloc`, so that
+            `snapshot` can measure memory. It is stopped by `close`.
+        """
+        self.callback: Callable[[str, float], None] | None = callback
+        self.trace_memory: bool = trace_memory
+        # Total time spent in, and number of calls to, each phase.
+        self.times: Counter[str] = Counter()
+        self.calls: Counter[str] = Counter()
+        self.counters: Counter[str] = Counter()
+        # Last value of each measurement (e.g., the size of a cache).
+        self.gauges: dict[str, float] = {}
+        # Memory measurements of each snapshot, in bytes.
+        self.memory: dict[str, dict[str, int]] = {}
+        # Whether `tracemalloc` was started by this profiler (and not before).
+        self._tracing: bool = trace_memory and not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start()
+
+    def phase(self, name: str) -> "_Phase":
+        """
+        Returns a context manager timing the phase `name`.
+        """
+        return _Phase(self, name)
+
+    def add(self, name: str, elapsed: float) -> None:
+        """
+        Accounts for a call to the phase `name`, lasting `elapsed` seconds.
+        """
+        self.times[name] += elapsed
+        self.calls[name] += 1
+        if self.callback is not None:
+            self.callback(name, elapsed)
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] += n
+
+    def gauge(self, name: str, value: float) -> None:
+        self.gauges[name] = value
+
+    def queue(self, base: type) -> type:
+        """
+        Returns a subclass of the priority queue class `base` (see `util`)
+        counting its pops, pushes and priority decreases, to be given to a
+        search algorithm.
+        """
+        counters: Counter[str] = self.counters
+
+        class CountingQueue(base):
+            def pop(self) -> any:
+                counters["queue_pops"] += 1
+                return super().pop()
+
+            def update(self, item: any, priority: float) -> None:
+                if item in self:
+                    counters["queue_decreases"] += 1
+                else:
+                    counters["queue_pushes"] += 1
+                super().update(item, priority)
+
+        return CountingQueue
+
+    def snapshot(self, label: str) -> None:
+        """
+        Measures the memory currently traced, its peak, and the part of it
+        allocated by `policies` (the policy arrays), if `trace_memory`.
+        """
+        if not self.trace_memory:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot: tracemalloc.Snapshot = tracemalloc.take_snapshot()
+        policies: int = sum(
+            stat.size
+            for stat in snapshot.statistics("filename")
+            if os.path.basename(stat.traceback[0].filename) == "policies.py"
+        )
+        self.memory[label] = {
+            "current": current, "peak": peak, "policies": policies
+        }
+
+    def summary(self) -> dict[str, any]:
+        """
+        Returns all the measurements, as JSON-serializable values.
+        """
+        return {
+            "phases": {
+                name: {
+                    "calls": self.calls[name],
+                    "total": self.times[name],
+                    "mean": self.times[name] / self.calls[name],
+                }
+                for name in sorted(self.times)
+            },
+            "counters": dict(sorted(self.counters.items())),
+            "gauges": dict(sorted(self.gauges.items())),
+            "memory": self.memory,
+        }
+
+    def to_json(self, path: str | None = None) -> str:
+        """
+        Returns the `summary` as JSON, also writing it into `path` if given.
+        """
+        content: str = json.dumps(self.summary(), indent=2)
+        if path is not None:
+            with open(path, "w") as file:
+                file.write(content + "\n")
+        return content
+
+    def reset(self) -> None:
+        """
+        Drops all measurements.
+        """
+        self.times.clear()
+        self.calls.clear()
+        self.counters.clear()
+        self.gauges.clear()
+        self.memory.clear()
+
+    def close(self) -> None:
+        """
+        Stops `tracemalloc`, if started by this profiler, so that it no longer
+        slows down the process. Later snapshots then measure nothing.
+        """
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+        self.trace_memory = False
+
+    def __enter__(self) -> "Profiler":
+        return self
+
+    def __exit__(self, *exc_info: any) -> None:
+        self.close()
+
+
+class _Phase:
+    """
+    Context manager timing a phase of a `Profiler`, cheaper than one built by
+    `contextlib.contextmanager`.
+    """
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: Profiler, name: str) -> None:
+        self.profiler: Profiler = profiler
+        self.name: str = name
+        self.start: float = 0.0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info: any) -> None:
+        self.profiler.add(self.name, time.perf_counter() - self.start)
@@ -0,0 +1,124 @@
+import enum
+import sys
+from collections.abc import Iterable
+from typing import TextIO
+
+from problems import CellType
+from problems import Location2D
+
+
+class Icon(enum.Enum):
+    """
+    Possible icons appearing in a `Grid2D` map, for `ConsoleSimulator`.
+    """
+
+    BELT: str = "🎞️"
+    FREE: str = "⬜"
+    PACKAGE: str = "📦"
+    RACK: str = "🗄️"
+    REST: str = "🛋️"
+    ROBOT: str = "🤖"
+    WALL: str = "🧱"
+
+
+char_map: dict[str, str] = {
+    CellType.BELT.value: Icon.BELT.value,
+    CellType.FREE.value: Icon.FREE.value,
+    CellType.RACK.value: Icon.RACK.value,
+    CellType.WALL.value: Icon.WALL.value,
+}
+
+
+class TerminalRenderer:
+    """
+    Renders a warehouse map on an ANSI terminal. The static layout is drawn
+    once, and each new frame only rewrites the cells that changed since the
+    previous one, using cursor positioning.
+    """
+
+    def __init__(
+        self,
+        grid: list[str],
+        rests: list[Location2D],
+        stream: TextIO = sys.stdout,
+    ) -> None:
+        """
+        :param grid: Map layout.
+        :param rests: Resting locations.
+        :param stream: Output terminal.
+        """
+        self.stream: TextIO = stream
+        self._rows: int = len(grid)
+        # Icons of the cells without moving entities.
+        self._static: list[list[str]] = [
+            [char_map[cell] for cell in row] for row in grid
+        ]
+        for x, y in rests:
+            self._static[y][x] = Icon.REST.value
+        # Icons drawn over the static layout in the previous frame.
+        self._overlay: dict[Location2D, str] = {}
+        self._drawn: bool = False
+
+    def frame(
+        self,
+        packages: Iterable[Location2D],
+        robots: Iterable[Location2D],
+    ) -> str:
+        """
+        Returns the whole layout, with `packages` and `robots` on it.
+        """
+        overlay: dict[Location2D, str] = self._get_overlay(packages, robots)
+        return "\n".join(
+            "".join(
+                overlay.get((j, i), icon) for j, icon in enumerate(row)
+            )
+            for i, row in enumerate(self._static)
+        )
+
+    def render(
+        self,
+        packages: Iterable[Location2D],
+        robots: Iterable[Location2D],
+    ) -> None:
+        """
+        Draws the layout with `packages` and `robots` on it, only updating the
+        cells that changed since the previous call.
+        """
+        overlay: dict[Location2D, str] = self._get_overlay(packages, robots)
+        if not self._drawn:
+            # Clears the screen and draws everything from the top-left corner.
+            self.stream.write("\x1b[2J\x1b[H" + self.frame([], []))
+            changes: dict[Location2D, str] = overlay
+            self._drawn = True
+        else:
+            changes = {
+                location: self._static[location[1]][location[0]]
+                for location in self._overlay.keys() - overlay.keys()
+            }
+            changes.update(
+                (location, icon)
+                for location, icon in overlay.items()
+                if self._overlay.get(location) != icon
+            )
+        self.stream.write("".join(
+            f"\x1b[{y + 1};{2 * x + 1}H{icon}"
+            for (x, y), icon in changes.items()
+        ))
+        # Leaves the cursor below the map.
+        self.stream.write(f"\x1b[{self._rows + 1};1H")
+        self.stream.flush()
+        self._overlay = overlay
+
+    @staticmethod
+    def _get_overlay(
+        packages: Iterable[Location2D],
+        robots: Iterable[Location2D],
+    ) -> dict[Location2D, str]:
+        """
+        Returns the icons of the moving entities, where packages are drawn
+        over robots.
+        """
+        overlay: dict[Location2D, str] = {}
+        overlay.update(dict.fromkeys(robots, Icon.ROBOT.value))
+        overlay.update(dict.fromkeys(packages, Icon.PACKAGE.value))
+        return overlay
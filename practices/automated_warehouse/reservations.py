@@ -0,0 +1,373 @@
+import heapq
+import math
+from typing import Callable
+
+import numpy as np
+
+from models import Fleet
+from models import Package
+from models import Phase
+from orders import OrderQueue
+from policies import GridPolicy
+from problems import Action
+from problems import CellType
+from problems import Location2D
+from simulators import ConsoleSimulator
+
+_moves: list[tuple[int, int]] = [action.value for action in Action]
+
+
+class ReservationTable:
+    """
+    Space-time reservations of the cells of a grid, used to keep robots from
+    sharing a cell or swapping cells.
+
+    Reservations are hashed by ``t * n_cells + cell``, so memory grows with
+    the number of robots and the planning window, not with the map size.
+    """
+
+    def __init__(self, n_cells: int) -> None:
+        """
+        :param n_cells: Number of cells of the grid.
+        """
+        self.n_cells: int = n_cells
+        # Robot holding each reserved space-time key.
+        self.owners: dict[int, int] = {}
+
+    def owner(self, cell: int, t: int) -> int:
+        """
+        Returns the robot holding `cell` at time `t`, or -1.
+        """
+        return self.owners.get(t * self.n_cells + cell, -1)
+
+    def reserve(self, cell: int, t: int, robot: int) -> None:
+        self.owners[t * self.n_cells + cell] = robot
+
+    def release(self, cell: int, t: int, robot: int) -> None:
+        key: int = t * self.n_cells + cell
+        if self.owners.get(key) == robot:
+            del self.owners[key]
+
+    def can_move(self, robot: int, source: int, target: int, t: int) -> bool:
+        """
+        Whether `robot` can move from `source` at time `t` into `target` at
+        ``t + 1`` (waiting, if both are the same), without running into nor
+        swapping places with another robot.
+        """
+        other: int = self.owner(target, t + 1)
+        if other not in (-1, robot):
+            return False
+        if source == target:
+            return True
+        other = self.owner(target, t)
+        return other in (-1, robot) or self.owner(source, t + 1) != other
+
+    def __len__(self) -> int:
+        return len(self.owners)
+
+
+class CooperativePlanner:
+    """
+    Plans collision-free paths for several robots over a 2D-grid map, with
+    Windowed Hierarchical Cooperative A* (WHCA*).
+
+    Robots are planned one after the other, in space-time, over the next
+    `window` ticks: each search avoids the cells reserved by the robots
+    planned before, and then reserves its own path. Beyond the window, the
+    cost-to-go of the robot's policy serves as a true distance heuristic.
+    """
+
+    def __init__(self, free: np.ndarray, window: int = 16) -> None:
+        """
+        :param free: Whether each cell can be stepped on, with shape ``(rows,
+            cols)``.
+        :param window: Number of ticks planned ahead.
+        """
+        self.rows, self.cols = free.shape
+        self.free: np.ndarray = free
+        self.window: int = window
+        self.table: ReservationTable = ReservationTable(free.size)
+        # Cells planned for each robot, starting at the tick in `starts`.
+        self.paths: dict[int, list[int]] = {}
+        self.starts: dict[int, int] = {}
+        # Policy and goal cost of each robot (see `plan`).
+        self.goals: dict[int, tuple[GridPolicy | None, float]] = {}
+        self.expansions: int = 0
+
+    def plan(
+        self,
+        robot: int,
+        start: int,
+        t: int,
+        policy: GridPolicy | None = None,
+        goal_cost: float = 0.0,
+    ) -> list[int]:
+        """
+        Plans and reserves the path of `robot` over the next `window` ticks.
+        Robots without a policy stay in place, or step aside to the closest
+        cell they can hold.
+
+        A robot with no way to move holds its cell, and any robot whose path
+        went through it is planned again.
+
+        :param start: Cell where the robot is at time `t`.
+        :param policy: Policy to reach the robot's target, with costs.
+        :param goal_cost: Cost-to-go of the cells where the robot must stop
+            (e.g., 1 to stop next to a rack, 0 to stop on a resting location).
+        :return: The cells planned for times `t` to ``t + window``.
+        """
+        self.goals[robot] = (policy, goal_cost)
+        pending: list[tuple[int, int]] = [(robot, start)]
+        # Bounds the chain of robots planned again.
+        for _ in range(len(self.paths) + 1):
+            if not pending:
+                break
+            other, cell = pending.pop()
+            for evicted in self._plan(other, cell, t):
+                pending.append((evicted, self.position(evicted, t)))
+        return self.paths[robot]
+
+    def hold(self, robot: int, cell: int, t: int, steps: int) -> None:
+        """
+        Replaces the path of `robot` by staying on `cell` from time `t`, for
+        the given `steps`.
+        """
+        self.release(robot)
+        for k in range(steps):
+            self.table.reserve(cell, t + k, robot)
+        self.paths[robot] = [cell] * steps
+        self.starts[robot] = t
+
+    def release(self, robot: int) -> None:
+        """
+        Drops the path planned for `robot`, along with its reservations.
+        """
+        path: list[int] = self.paths.pop(robot, [])
+        start: int = self.starts.pop(robot, 0)
+        for k, cell in enumerate(path):
+            self.table.release(cell, start + k, robot)
+
+    def position(self, robot: int, t: int) -> int:
+        """
+        Returns the cell planned for `robot` at time `t`.
+        """
+        path: list[int] = self.paths[robot]
+        return path[min(t - self.starts[robot], len(path) - 1)]
+
+    def _plan(self, robot: int, start: int, t: int) -> list[int]:
+        """
+        Plans and reserves the path of `robot` towards its goal.
+        :return: The robots whose reservations were taken over.
+        """
+        self.release(robot)
+        policy, goal_cost = self.goals[robot]
+        heuristic: Callable[[int], float] = lambda cell: 0.0
+        if policy is not None:
+            heuristic = _heuristic(policy, goal_cost)
+        path: list[int] | None = self._search(robot, start, t, heuristic)
+        evicted: list[int] = []
+        if path is None:
+            path = [start] * (self.window + 1)
+            for k, cell in enumerate(path):
+                owner: int = self.table.owner(cell, t + k)
+                if owner not in (-1, robot, *evicted):
+                    evicted.append(owner)
+        for k, cell in enumerate(path):
+            self.table.reserve(cell, t + k, robot)
+        self.paths[robot] = path
+        self.starts[robot] = t
+        return evicted
+
+    def _search(
+        self,
+        robot: int,
+        start: int,
+        t: int,
+        heuristic: Callable[[int], float],
+    ) -> list[int] | None:
+        """
+        Runs a space-time A* search from `start` at time `t`, until reaching a
+        goal cell (where `heuristic` is 0) that can be held for the rest of the
+        window, or the end of the window. Waiting costs as much as moving,
+        except on a goal.
+        """
+        free: np.ndarray = self.free.reshape(-1)
+        owners: dict[int, int] = self.table.owners
+        can_move: Callable[[int, int, int, int], bool] = self.table.can_move
+        n: int = self.rows * self.cols
+        window: int = self.window
+        if heuristic(start) == math.inf:
+            return None
+        # Elements are: ``(f, -depth, g, key)``, with ``key = depth * n +
+        # cell``. Reservations are keyed by ``(t + depth) * n + cell``.
+        queue: list[tuple[float, int, float, int]] = [
+            (heuristic(start), 0, 0.0, start)
+        ]
+        best: dict[int, float] = {start: 0.0}
+        parents: dict[int, int] = {}
+        offset: int = t * n
+        while queue:
+            _, depth, g, key = heapq.heappop(queue)
+            depth = -depth
+            if g > best[key]:
+                continue
+            self.expansions += 1
+            cell: int = key - depth * n
+            h: float = heuristic(cell)
+            if depth == window or h <= 0 and all(
+                owners.get(offset + k * n + cell, robot) == robot
+                for k in range(depth, window + 1)
+            ):
+                path: list[int] = [cell] * (window + 1 - depth)
+                while key in parents:
+                    key = parents[key]
+                    path.append(key % n)
+                return path[::-1]
+            y, x = divmod(cell, self.cols)
+            neighbours: list[int] = [cell]
+            for dy, dx in _moves:
+                if 0 <= y + dy < self.rows and 0 <= x + dx < self.cols:
+                    neighbours.append(cell + dy * self.cols + dx)
+            for neighbour in neighbours:
+                if not free.item(neighbour):
+                    continue
+                if not can_move(robot, cell, neighbour, t + depth):
+                    continue
+                next_h: float = heuristic(neighbour)
+                if next_h == math.inf:
+                    continue
+                cost: float = 0.0 if neighbour == cell and h <= 0 else 1.0
+                next_key: int = key + n - cell + neighbour
+                if g + cost < best.get(next_key, math.inf):
+                    best[next_key] = g + cost
+                    parents[next_key] = key
+                    heapq.heappush(
+                        queue,
+                        (g + cost + next_h, -depth - 1, g + cost, next_key),
+                    )
+        return None
+
+
+def _heuristic(
+    policy: GridPolicy,
+    goal_cost: float,
+) -> Callable[[int], float]:
+    """
+    Returns the cost-to-go from each cell (by id) to the cells where
+    `policy` has a cost of `goal_cost`.
+    """
+    costs: np.ndarray = policy.costs.reshape(-1)
+    unreachable: float = math.inf
+    if np.issubdtype(costs.dtype, np.integer):
+        unreachable = np.iinfo(costs.dtype).max
+
+    def heuristic(cell: int) -> float:
+        cost: float = costs.item(cell)
+        return math.inf if cost >= unreachable else cost - goal_cost
+
+    return heuristic
+
+
+class CooperativeSimulator(ConsoleSimulator):
+    """
+    Collision-free version of `ConsoleSimulator`: instead of following their
+    policies blindly, robots move along paths planned by a
+    `CooperativePlanner`, so that they never share a cell nor swap cells.
+
+    Every ``window // 2`` ticks, all robots are planned again in a rotating
+    order, after reserving their current cells; in between, only the robots
+    whose target changed are.
+    """
+
+    def __init__(self, *args: any, window: int = 16, **kwargs: any) -> None:
+        """
+        Takes the same arguments as `ConsoleSimulator`, plus:
+
+        :param window: Number of ticks planned ahead.
+        """
+        super().__init__(*args, **kwargs)
+        self.window: int = window
+        self.planner: CooperativePlanner = CooperativePlanner(
+            self._free, window
+        )
+        # Phase and policy (`Fleet.policy_ids`) each robot was planned for.
+        self._goals: dict[int, tuple[int, int]] = {}
+        # Whether all robots must be planned again on the next tick.
+        self._replan: bool = True
+        self._picked: list[Package] = []
+        self._delivered: list[Package] = []
+
+    def _start(
+        self,
+        n_robots: int,
+        orders: OrderQueue | None = None,
+    ) -> None:
+        super()._start(n_robots, orders)
+        self.planner = CooperativePlanner(self._free, self.window)
+        self._goals = {}
+        self._replan = True
+
+    def set_cells(self, changes: dict[Location2D, CellType]) -> None:
+        super().set_cells(changes)
+        # Planned paths may go through the new walls.
+        self._replan = True
+
+    def _plan(self) -> None:
+        """
+        Makes the robots standing next to their target pick up or deliver
+        their package, and plans the paths of the robots.
+        """
+        t: int = self.metrics.ticks
+        fleet: Fleet = self.robots
+        self._picked, self._delivered = [], []
+        for i, robot in enumerate(fleet):
+            phase: int = fleet.phases.item(i)
+            if phase not in (Phase.PICKUP, Phase.DELIVERY):
+                continue
+            if fleet.policy(i, phase).cost(robot.location) != 1:
+                continue
+            if phase == Phase.PICKUP:
+                fleet.phases[i] = Phase.DELIVERY
+                self._picked.append(robot.package)
+            else:
+                fleet.phases[i] = Phase.IDLE
+                fleet.policy_ids[i] = -1
+                self._delivered.append(robot.package)
+                robot.package = None
+        cells: list[int] = (fleet.ys * self.graph.cols + fleet.xs).tolist()
+        period: int = max(self.window // 2, 1)
+        if t % period == 0 or self._replan:
+            self._replan = False
+            for i in range(len(fleet)):
+                self.planner.hold(i, cells[i], t, 2)
+            first: int = t // period % max(len(fleet), 1)
+            robots: list[int] = [
+                *range(first, len(fleet)), *range(first)
+            ]
+        else:
+            robots = [
+                i for i in range(len(fleet)) if self._goal(i) != self._goals[i]
+            ]
+        for i in robots:
+            self._goals[i] = phase, policy_id = self._goal(i)
+            policy: GridPolicy | None = None
+            if policy_id >= 0:
+                policy = fleet.policy(i, Phase(phase))
+            goal_cost: float = 0.0 if phase == Phase.REST else 1.0
+            self.planner.plan(i, cells[i], t, policy, goal_cost)
+
+    def _step(self) -> tuple[list[Package], list[Package]]:
+        t: int = self.metrics.ticks
+        fleet: Fleet = self.robots
+        for i in range(len(fleet)):
+            fleet.ys[i], fleet.xs[i] = divmod(
+                self.planner.position(i, t + 1), self.graph.cols
+            )
+        return self._picked, self._delivered
+
+    def _goal(self, i: int) -> tuple[int, int]:
+        """
+        Returns the phase and policy of the `i`-th robot.
+        """
+        phase: int = self.robots.phases.item(i)
+        return phase, self.robots.policy_ids.item(i, phase)
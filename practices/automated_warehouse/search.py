@@ -1,11 +1,22 @@
 import abc
+import math
+from array import array
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable
+
+import numpy as np
 
 import util
+from problems import Action
+from problems import CompiledGrid2D
+from problems import Field
 from problems import Grid2D
 from problems import Location2D
 from problems import SearchProblem
 from problems import Successor
+from profiling import Profiler
 
 
 class SearchAlgorithm(abc.ABC):
@@ -27,30 +38,299 @@ class Dijkstra(SearchAlgorithm):
     problem's initial state(s) and every other state.
     """
 
+    def __init__(
+        self,
+        queue: type = util.PriorityQueue,
+        wavefront: bool = True,
+    ) -> None:
+        """
+        :param queue: Priority queue class used for the frontier, such as
+            `util.PriorityQueue` or `util.LazyPriorityQueue`.
+        :param wavefront: Whether to switch to `Wavefront` on compiled grids
+            whose moves all have the same cost.
+        """
+        self.queue: type = queue
+        self.wavefront: bool = wavefront
+
     def run(self, problem: SearchProblem) -> dict[any, Successor]:
+        if isinstance(problem, Grid2D):
+            graph: CompiledGrid2D = problem.compile()
+            sources: list[int] = [
+                graph.index(state) for state in problem.get_initial_state()
+            ]
+            return graph.policy(self.run_compiled(graph, sources))
         policy: dict[any, Successor] = defaultdict(
             lambda: Successor(None, None, float("inf"))
         )
-        # Elements are: ``(state, cost)``
-        frontier: util.PriorityQueue = util.PriorityQueue()
+        frontier: util.PriorityQueue = self.queue()
         for state in problem.get_initial_state():
             policy[state] = Successor(None, None, 0)
-            frontier.update((state, 0), 0)
+            frontier.update(state, 0)
         while frontier:
-            state, cost = frontier.pop()
+            state = frontier.pop()
+            cost: float = policy[state].cost
             for next_state, action, act_cost in problem.get_successors(state):
                 total_cost: float = cost + act_cost
                 if total_cost < policy[next_state].cost:
                     policy[next_state] = Successor(state, action, total_cost)
-                    frontier.update((next_state, total_cost), total_cost)
+                    frontier.update(next_state, total_cost)
         return dict(policy)
 
+    def run_compiled(self, graph: CompiledGrid2D, sources: list[int]) -> Field:
+        """
+        Runs the search directly over the edge table of `graph`, starting from
+        the cell ids in `sources`.
+        """
+        if self.wavefront and graph.unit_cost is not None:
+            return Wavefront().run_compiled(graph, sources)
+        costs: array = array("d", [math.inf]) * len(graph)
+        actions: array = array("b", [-1]) * len(graph)
+        offsets, targets = graph.offsets, graph.targets
+        edge_actions, edge_costs = graph.actions, graph.costs
+        frontier: util.PriorityQueue = self.queue()
+        for source in sources:
+            costs[source] = 0.0
+            frontier.update(source, 0.0)
+        while frontier:
+            i: int = frontier.pop()
+            cost: float = costs[i]
+            for k in range(offsets[i], offsets[i + 1]):
+                j: int = targets[k]
+                total_cost: float = cost + edge_costs[k]
+                if total_cost < costs[j]:
+                    costs[j] = total_cost
+                    actions[j] = edge_actions[k]
+                    frontier.update(j, total_cost)
+        return Field(costs, actions)
+
+
+class AStar(SearchAlgorithm):
+    """
+    Implements the A* algorithm to find the shortest path between a `Grid2D`
+    problem's initial state(s) and its closest goal, guided by the Manhattan
+    distance. Only the cells needed to reach the goal are explored.
+    """
+
+    def __init__(self, queue: type = util.PriorityQueue) -> None:
+        """
+        :param queue: Priority queue class used for the frontier.
+        """
+        self.queue: type = queue
+
+    def run(self, problem: Grid2D) -> dict[Location2D, Successor]:
+        """
+        Returns the policy of the states along the shortest path, from the
+        reached goal back to an initial state (empty if there's no path).
+        """
+        graph: CompiledGrid2D = problem.compile()
+        path: dict[int, Successor] = self.run_compiled(
+            graph,
+            [graph.index(state) for state in problem.get_initial_state()],
+            [graph.index(state) for state in problem.get_goals()],
+        )
+        return graph.path_policy(path)
+
+    def run_compiled(
+        self,
+        graph: CompiledGrid2D,
+        sources: list[int],
+        goals: list[int],
+        bound: Callable[[int], float] | None = None,
+    ) -> dict[int, Successor]:
+        """
+        Searches the edge table of `graph`, from the cell ids in `sources` to
+        the closest cell id in `goals`.
+
+        :param bound: Optional function giving a lower bound of the cost to
+            reach the goals from a cell id (e.g., `DistanceOracle.heuristic`),
+            tightening the Manhattan distance. It is only called for the cells
+            reached, and dropped if it doesn't beat the Manhattan distance from
+            any source, as it then hardly prunes the search.
+        :return: The path's cells, each mapped to ``(previous, action,
+            cost)``, where the action is an index in `Action`.
+        """
+        if not goals:
+            return {}
+        cols: int = graph.cols
+        targets: list[tuple[int, int]] = [divmod(g, cols) for g in goals]
+        goal_set: set[int] = set(goals)
+
+        def manhattan(i: int) -> float:
+            y, x = divmod(i, cols)
+            distance: int = min(
+                abs(y - ty) + abs(x - tx) for ty, tx in targets
+            )
+            return distance * graph.min_cost
+
+        if bound is not None and all(
+            bound(source) <= manhattan(source) for source in sources
+        ):
+            bound = None
+
+        def heuristic(i: int) -> float:
+            if bound is None:
+                return manhattan(i)
+            return max(manhattan(i), bound(i))
+
+        offsets, edge_targets = graph.offsets, graph.targets
+        edge_actions, edge_costs = graph.actions, graph.costs
+        parents: dict[int, Successor] = {}
+        closed: set[int] = set()
+        frontier: util.PriorityQueue = self.queue()
+        for source in sources:
+            parents[source] = Successor(None, -1, 0.0)
+            frontier.update(source, heuristic(source))
+        while frontier:
+            i: int = frontier.pop()
+            if i in goal_set:
+                path: dict[int, Successor] = {}
+                while i is not None:
+                    path[i] = parents[i]
+                    i = parents[i].successor
+                return path
+            closed.add(i)
+            cost: float = parents[i].cost
+            for k in range(offsets[i], offsets[i + 1]):
+                j: int = edge_targets[k]
+                total_cost: float = cost + edge_costs[k]
+                if j in closed:
+                    continue
+                if j not in parents or total_cost < parents[j].cost:
+                    parents[j] = Successor(i, edge_actions[k], total_cost)
+                    frontier.update(j, total_cost + heuristic(j))
+        return {}
+
+
+class Wavefront(SearchAlgorithm):
+    """
+    Implements a vectorized breadth-first search over `Grid2D` problems whose
+    moves all have the same cost, expanding the whole frontier at once.
+    """
+
+    def run(self, problem: Grid2D) -> dict[Location2D, Successor]:
+        graph: CompiledGrid2D = problem.compile()
+        sources: list[int] = [
+            graph.index(state) for state in problem.get_initial_state()
+        ]
+        return graph.policy(self.run_compiled(graph, sources))
+
+    def run_compiled(self, graph: CompiledGrid2D, sources: list[int]) -> Field:
+        """
+        Computes the distance and action fields of `graph`, starting from the
+        cell ids in `sources`.
+        """
+        return self.run_many(graph, [sources])[0]
+
+    def run_many(
+        self,
+        graph: CompiledGrid2D,
+        sources: list[list[int]],
+    ) -> list[Field]:
+        """
+        Computes one field per group of cell ids in `sources`, advancing all
+        their frontiers together.
+        """
+        n: int = len(sources)
+        frontier: np.ndarray = np.zeros((n, graph.rows, graph.cols), bool)
+        for i, group in enumerate(sources):
+            frontier[i].flat[group] = True
+        steps, actions = wavefront(graph.free, frontier)
+        costs: np.ndarray = np.where(
+            steps >= 0, steps * (graph.unit_cost or 1.0), math.inf
+        )
+        return [
+            Field(costs[i].ravel(), actions[i].ravel()) for i in range(n)
+        ]
+
+
+def wavefront(
+    free: np.ndarray,
+    sources: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Runs a breadth-first search over the cells of `free`, for each boolean
+    mask of initial cells in `sources` (with shape ``(n, rows, cols)``).
+
+    Only the cells of the frontier are expanded at each step, as flat ids
+    into the masks padded with a border of non-free cells (so that moves
+    never wrap around rows, nor into the next mask).
+    :return: The number of steps needed to reach each cell (``-1`` if
+        unreachable), and the index (in `Action`) of the action used to reach
+        it (``-1`` for initial or unreachable cells).
+    """
+    n, rows, cols = sources.shape
+    padded: tuple[int, int, int] = (n, rows + 2, cols + 2)
+    steps: np.ndarray = np.full(padded, -1, dtype=np.int32)
+    actions: np.ndarray = np.full(padded, -1, dtype=np.int8)
+    unvisited: np.ndarray = np.zeros(padded, dtype=bool)
+    unvisited[:, 1:-1, 1:-1] = free & ~sources
+    steps[:, 1:-1, 1:-1][sources] = 0
+    frontier: np.ndarray = np.flatnonzero(steps == 0)
+    # Offset of the flat id of each move.
+    moves: list[int] = [
+        dy * (cols + 2) + dx for dy, dx in (action.value for action in Action)
+    ]
+    flat_steps, flat_actions = steps.ravel(), actions.ravel()
+    unvisited = unvisited.ravel()
+    step: int = 0
+    while len(frontier):
+        step += 1
+        reached: list[np.ndarray] = []
+        for k, move in enumerate(moves):
+            new: np.ndarray = frontier + move
+            new = new[unvisited[new]]
+            unvisited[new] = False
+            flat_actions[new] = k
+            reached.append(new)
+        frontier = np.concatenate(reached)
+        flat_steps[frontier] = step
+    return (
+        np.ascontiguousarray(steps[:, 1:-1, 1:-1]),
+        np.ascontiguousarray(actions[:, 1:-1, 1:-1]),
+    )
+
 
 class MultiPolicy(SearchAlgorithm):
     """
-    Runs Dijkstra's algorithm for each initial state in a `Grid2D` problem.
+    Runs a shortest-path search for each initial state in a `Grid2D` problem.
+
+    With several `workers`, the chunks of initial states are split across a
+    process pool: the compiled grid is shared with the workers (read-only)
+    through `multiprocessing.shared_memory`, and each worker writes its fields
+    straight into a preallocated array, also shared.
+
+    The pool, the shared grid and the fields array are created on first use,
+    and kept for later searches (on the same grid) until `close` is called.
     """
 
+    def __init__(
+        self,
+        chunk_size: int = 16,
+        workers: int = 1,
+        profiler: Profiler | None = None,
+    ) -> None:
+        """
+        :param chunk_size: Number of initial states searched together by
+            `Wavefront` on uniform-cost grids, and sent at once to a worker.
+        :param workers: Number of worker processes. Searches with fewer
+            chunks than workers run in the calling process, unless the pool is
+            already running (and there are several chunks).
+        :param profiler: Optional profiler counting the searches, the cells
+            they expand and, for `Dijkstra` in this process, its queue
+            operations.
+        """
+        self.chunk_size: int = chunk_size
+        self.workers: int = workers
+        self.profiler: Profiler | None = profiler
+        self._executor: ProcessPoolExecutor | None = None
+        # Grid shared with the workers, with its block and its layout (see
+        # `_share_graph`).
+        self._graph: CompiledGrid2D | None = None
+        self._shared: SharedMemory | None = None
+        self._layout: tuple = ()
+        # Block the workers write their fields into, grown as needed.
+        self._fields: SharedMemory | None = None
+
     def run(
         self,
         problem: Grid2D,
@@ -58,7 +338,225 @@ class MultiPolicy(SearchAlgorithm):
         """
         Returns a policy for each initial state in `problem`.
         """
+        graph: CompiledGrid2D = problem.compile()
+        states: list[Location2D] = problem.get_initial_state()
         return {
-            state: Dijkstra().run(Grid2D(problem.grid, [state], []))
-            for state in problem.get_initial_state()
+            state: graph.policy(field)
+            for state, field in zip(states, self.run_compiled(graph, states))
         }
+
+    def run_compiled(
+        self,
+        graph: CompiledGrid2D,
+        states: list[Location2D],
+    ) -> list[Field]:
+        """
+        Returns the field of each location in `states`, searching uniform-cost
+        grids in vectorized batches of `chunk_size` locations.
+        """
+        sources: list[list[int]] = [[graph.index(state)] for state in states]
+        n_chunks: int = -(-len(sources) // self.chunk_size)
+        # Starting the pool only pays off with a chunk for each worker.
+        parallel: bool = self.workers > 1 and n_chunks > 1 and (
+            self._executor is not None or n_chunks >= self.workers
+        )
+        fields: list[Field]
+        if parallel:
+            fields = self._run_parallel(graph, sources)
+        else:
+            fields = _search(graph, sources, self.chunk_size, self.profiler)
+        if self.profiler is not None:
+            self.profiler.count("searches", len(fields))
+            self.profiler.count(
+                "nodes_expanded",
+                sum(int(np.isfinite(field.costs).sum()) for field in fields),
+            )
+        return fields
+
+    def _run_parallel(
+        self,
+        graph: CompiledGrid2D,
+        sources: list[list[int]],
+    ) -> list[Field]:
+        """
+        Searches the chunks of `sources` on the pool of `workers` processes,
+        sharing `graph` with them unless already shared.
+        """
+        shape: tuple[int, int] = (len(sources), len(graph))
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers)
+        if graph is not self._graph:
+            _release(self._shared)
+            self._shared, self._layout = _share_graph(graph)
+            self._graph = graph
+        # Costs of each field, followed by its actions.
+        size: int = shape[0] * shape[1] * 9
+        if self._fields is None or self._fields.size < size:
+            _release(self._fields)
+            self._fields = SharedMemory(create=True, size=size)
+        chunks: list[tuple] = [
+            (
+                self._shared.name,
+                self._layout,
+                self._fields.name,
+                shape,
+                i,
+                sources[i:i + self.chunk_size],
+            )
+            for i in range(0, len(sources), self.chunk_size)
+        ]
+        for _ in self._executor.map(_search_chunk, chunks):
+            pass
+        costs: np.ndarray = np.ndarray(
+            shape, np.float64, self._fields.buf
+        ).copy()
+        actions: np.ndarray = np.ndarray(
+            shape, np.int8, self._fields.buf, costs.nbytes
+        ).copy()
+        return [Field(costs[i], actions[i]) for i in range(len(sources))]
+
+    def close(self) -> None:
+        """
+        Shuts the worker processes down, and frees the shared memory blocks.
+        Later searches start them again if needed.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        _release(self._shared)
+        _release(self._fields)
+        self._graph = self._shared = self._fields = None
+        self._layout = ()
+
+    def __enter__(self) -> "MultiPolicy":
+        return self
+
+    def __exit__(self, *exc_info: any) -> None:
+        self.close()
+
+
+def _search(
+    graph: CompiledGrid2D,
+    sources: list[list[int]],
+    chunk_size: int,
+    profiler: Profiler | None = None,
+) -> list[Field]:
+    """
+    Returns the field of each group of cell ids in `sources` (see
+    `MultiPolicy.run_compiled`).
+    """
+    if graph.unit_cost is None:
+        queue: type = util.PriorityQueue
+        if profiler is not None:
+            queue = profiler.queue(queue)
+        dijkstra: Dijkstra = Dijkstra(queue)
+        return [dijkstra.run_compiled(graph, group) for group in sources]
+    wavefront: Wavefront = Wavefront()
+    return [
+        field
+        for i in range(0, len(sources), chunk_size)
+        for field in wavefront.run_many(graph, sources[i:i + chunk_size])
+    ]
+
+
+def _share_graph(graph: CompiledGrid2D) -> tuple[SharedMemory, tuple]:
+    """
+    Copies the arrays of `graph` needed by `_search` (its free cells, and its
+    edge table unless costs are uniform) into a new shared memory block.
+    :return: The block, and its layout for `_attach`.
+    """
+    arrays: dict[str, np.ndarray] = {"free": graph.free}
+    if graph.unit_cost is None:
+        for name in ("offsets", "targets", "actions", "costs"):
+            values: array = getattr(graph, name)
+            arrays[name] = np.frombuffer(values, values.typecode)
+    # Name, type code, byte offset and shape of each array, aligned to 8
+    # bytes.
+    specs: list[tuple[str, str, int, tuple[int, ...]]] = []
+    size: int = 0
+    for name, values in arrays.items():
+        specs.append((name, values.dtype.char, size, values.shape))
+        size += -(-values.nbytes // 8) * 8
+    memory: SharedMemory = SharedMemory(create=True, size=max(size, 1))
+    for name, typecode, offset, shape in specs:
+        np.ndarray(shape, typecode, memory.buf, offset)[...] = arrays[name]
+    layout: tuple = (
+        graph.rows, graph.cols, graph.unit_cost, graph.min_cost, specs
+    )
+    return memory, layout
+
+
+def _release(memory: SharedMemory | None) -> None:
+    """
+    Closes and unlinks the shared memory block `memory`, if any.
+    """
+    if memory is not None:
+        memory.close()
+        memory.unlink()
+
+
+# Shared memory blocks attached by the current worker process (by name),
+# with the graph and the fields they hold.
+_shared: dict[str, any] = {}
+
+
+def _attach(
+    graph_name: str,
+    layout: tuple,
+    fields_name: str,
+    shape: tuple[int, int],
+) -> None:
+    """
+    Attaches the worker process to the graph shared by `_share_graph`, and to
+    the fields to write, detaching it from the previous ones if they changed.
+    """
+    if _shared.get("graph_name") != graph_name:
+        _shared.pop("graph", None)
+        if "graph_memory" in _shared:
+            _shared.pop("graph_memory").close()
+        rows, cols, unit_cost, min_cost, specs = layout
+        memory: SharedMemory = SharedMemory(graph_name)
+        graph: CompiledGrid2D = CompiledGrid2D.__new__(CompiledGrid2D)
+        graph.rows, graph.cols = rows, cols
+        graph.unit_cost, graph.min_cost = unit_cost, min_cost
+        for name, typecode, offset, array_shape in specs:
+            if name == "free":
+                graph.free = np.ndarray(array_shape, bool, memory.buf, offset)
+            else:
+                # Edge tables are read one item at a time, faster from a
+                # `memoryview` than from a NumPy array.
+                size: int = np.dtype(typecode).itemsize * array_shape[0]
+                view: memoryview = memory.buf[offset:offset + size]
+                setattr(graph, name, view.cast(typecode))
+        _shared.update(
+            graph_name=graph_name, graph_memory=memory, graph=graph
+        )
+    if _shared.get("fields_name") != fields_name:
+        _shared.pop("costs", None)
+        _shared.pop("actions", None)
+        if "fields_memory" in _shared:
+            _shared.pop("fields_memory").close()
+        _shared.update(
+            fields_name=fields_name, fields_memory=SharedMemory(fields_name)
+        )
+    fields: SharedMemory = _shared["fields_memory"]
+    _shared.update(
+        costs=np.ndarray(shape, np.float64, fields.buf),
+        actions=np.ndarray(
+            shape, np.int8, fields.buf, shape[0] * shape[1] * 8
+        ),
+    )
+
+
+def _search_chunk(chunk: tuple) -> None:
+    """
+    Searches the chunk ``(graph_name, layout, fields_name, shape, index,
+    sources)`` in the worker process (see `_attach`), writing its fields from
+    row `index` on.
+    """
+    *blocks, i, sources = chunk
+    _attach(*blocks)
+    fields: list[Field] = _search(_shared["graph"], sources, len(sources))
+    for k, field in enumerate(fields, i):
+        _shared["costs"][k] = field.costs
+        _shared["actions"][k] = field.actions
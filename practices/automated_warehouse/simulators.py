@@ -1,39 +1,91 @@
 import abc
-import enum
-import itertools
+import contextlib
+import dataclasses
 import random
 import time
+from typing import Callable
+
+import numpy as np
 
 import util
+from assignment import hungarian
+from incremental import IncrementalField
+from maps import WarehouseMap
+from models import Fleet
 from models import Package
-from models import Robot
+from models import RobotView
+from oracle import DistanceOracle
+from orders import OrderQueue
+from policies import GridPolicy
+from policies import PolicyCache
+from policies import PolicyStore
 from problems import Action
 from problems import CellType
-from problems import Grid2D
+from problems import CompiledGrid2D
+from problems import Field
 from problems import Location2D
+from problems import Successor
+from profiling import Profiler
+from renderers import TerminalRenderer
+from search import AStar
 from search import MultiPolicy
+from spatial import GridIndex
+from traces import TraceEvent
+from traces import TraceRecorder
+
+# Context manager of the phases timed without a profiler.
+_no_phase: contextlib.nullcontext = contextlib.nullcontext()
 
 
-class Icon(enum.Enum):
+@dataclasses.dataclass
+class Metrics:
     """
-    Possible icons appearing in a `Grid2D` map, for `ConsoleSimulator`.
+    Performance measurements of a simulation run.
     """
 
-    BELT: str = "🎞️"
-    FREE: str = "⬜"
-    PACKAGE: str = "📦"
-    RACK: str = "🗄️"
-    REST: str = "🛋️"
-    ROBOT: str = "🤖"
-    WALL: str = "🧱"
+    ticks: int = 0
+    deliveries: int = 0
+    # Wall-clock time, in seconds.
+    elapsed: float = 0.0
+    planning_time: float = 0.0
+    stepping_time: float = 0.0
+    # Ticks elapsed between the creation and delivery of each package.
+    latencies: list[int] = dataclasses.field(default_factory=list)
+
+    @property
+    def ticks_per_second(self) -> float:
+        return self.ticks / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def deliveries_per_tick(self) -> float:
+        return self.deliveries / self.ticks if self.ticks else 0.0
 
+    @property
+    def mean_latency(self) -> float:
+        latencies: list[int] = self.latencies
+        return sum(latencies) / len(latencies) if latencies else 0.0
+
+    def per_hour(self, tick_seconds: float = 1.0) -> float:
+        """
+        Returns the sustained deliveries per hour, given the duration of a tick
+        in seconds.
+        """
+        return self.deliveries_per_tick * 3600 / tick_seconds
 
-char_map: dict[str, str] = {
-    CellType.BELT.value: Icon.BELT.value,
-    CellType.FREE.value: Icon.FREE.value,
-    CellType.RACK.value: Icon.RACK.value,
-    CellType.WALL.value: Icon.WALL.value,
-}
+    def summary(self) -> dict[str, float]:
+        """
+        Returns the main measurements, along with the derived ones.
+        """
+        return {
+            "ticks": self.ticks,
+            "deliveries": self.deliveries,
+            "elapsed": self.elapsed,
+            "planning_time": self.planning_time,
+            "stepping_time": self.stepping_time,
+            "ticks_per_second": self.ticks_per_second,
+            "deliveries_per_tick": self.deliveries_per_tick,
+            "mean_latency": self.mean_latency,
+        }
 
 
 class Simulator(abc.ABC):
@@ -58,150 +110,618 @@ class ConsoleSimulator(Simulator):
     def __init__(
         self,
         map_path: str,
-        rests: list[Location2D]
+        rests: list[Location2D],
+        cache_dir: str | None = None,
+        cache_bytes: int = 64 * 2 ** 20,
+        assignment: str = "batch",
+        oracle: DistanceOracle | None = None,
+        workers: int = 1,
+        profiler: Profiler | None = None,
     ) -> None:
         """
-        :param map_path: File path of the warehouse layout.
+        :param map_path: File path of the warehouse layout, either as text or
+            compiled (see `maps.WarehouseMap.save`).
         :param belts: Locations of the conveyor belts.
         :param rests: Resting locations.
+        :param cache_dir: Optional directory where computed policies are
+            stored, and loaded from in later runs.
+        :param cache_bytes: Maximum memory used to keep rack policies across
+            waves.
+        :param assignment: How packages are assigned to free robots: either
+            ``"greedy"`` (one robot at a time, by estimated distance) or
+            ``"batch"`` (all at once, minimizing the total path cost).
+        :param oracle: Optional distances between the racks, belts and resting
+            locations, replacing the Euclidean distance in the estimates.
+        :param workers: Number of processes computing the policies of several
+            targets at once (see `MultiPolicy`), kept until `close`.
+        :param profiler: Optional profiler timing the phases of each tick and
+            counting the searches (see `profiling.Profiler`).
         """
-        self.map: list[str] = util.read_map(map_path)
+        if assignment not in ("batch", "greedy"):
+            raise ValueError(f"unknown assignment: {assignment}")
+        self.assignment: str = assignment
+        self.oracle: DistanceOracle | None = oracle
+        self.profiler: Profiler | None = profiler
+        self.search: MultiPolicy = MultiPolicy(
+            workers=workers, profiler=profiler
+        )
+        # Map layout, along with the cells of each type.
+        self.layout: WarehouseMap = WarehouseMap.load(map_path)
+        self.map: list[str] = self.layout.lines()
+        self.graph: CompiledGrid2D = CompiledGrid2D(self.map)
+        # Free cells of the current map, shared by `self._fields`.
+        self._free: np.ndarray = self.graph.free.copy()
+        # Incremental searches repairing the policy to reach each target.
+        self._fields: dict[Location2D, IncrementalField] = {}
+        self.store: PolicyStore | None = (
+            PolicyStore(cache_dir) if cache_dir else None
+        )
         self.belts: list[Location2D] = self._get_cells(CellType.BELT)
         self.rests: list[Location2D] = rests
         # Optimal navigation policy for each conveyor belt.
-        self.belt_policies: dict[
-            Location2D, dict[Location2D, Action]] = self._get_policies(
+        self.belt_policies: dict[Location2D, GridPolicy] = self._get_policies(
             self.belts,
         )
         # Optional navigation policy for each resting location.
-        self.rest_policies: dict[
-            Location2D, dict[Location2D, Action]] = self._get_policies(
+        self.rest_policies: dict[Location2D, GridPolicy] = self._get_policies(
             self.rests,
         )
+        # Navigation policy for the racks, reused across waves.
+        self.rack_policies: PolicyCache = PolicyCache(cache_bytes)
+        self.random: random.Random = random.Random()
+        self.renderer: TerminalRenderer | None = None
         # Run-dependent objects.
         self.packages: dict[Package, bool] = {}
-        self.robots: list[Robot] = []
+        self.robots: Fleet = Fleet([])
+        self.metrics: Metrics = Metrics()
+        # Stream of incoming orders, replacing the waves of packages.
+        self.orders: OrderQueue | None = None
+        # Recorder of the current headless run, if any.
+        self.recorder: TraceRecorder | None = None
+        self._package_policies: dict[Package, GridPolicy] = {}
+        # Tick at which each undelivered package was created.
+        self._created: dict[Package, int] = {}
+        # Whether robots or packages became available since the last batch
+        # assignment.
+        self._assignment_pending: bool = False
+        # Untaken packages and unclaimed resting locations, by location.
+        self._package_index: GridIndex = self._new_index()
+        self._rest_index: GridIndex = self._new_index()
+        if profiler is not None:
+            profiler.snapshot("startup")
 
-    def run(self, n_robots: int = 1, n_packages: int = 1) -> None:
-        package_policies: dict[Package, dict[Location2D, Action]] = {}
-        self.robots = self._create_robots(n_robots)
+    def run(
+        self,
+        n_robots: int = 1,
+        n_packages: int = 1,
+        orders: OrderQueue | None = None,
+    ) -> None:
+        """
+        Runs the simulation using the given number of robots and packages per
+        wave, or the given stream of `orders`.
+        """
+        self._start(n_robots, orders)
         while True:
-            # Creates new packages if all previous have been delivered.
-            all_free: bool = all(robot.is_free for robot in self.robots)
-            if not self.packages and all_free:
-                package_policies = self._new_packages(n_packages)
+            self._tick(n_packages)
+            self._print()
+            time.sleep(0.1)
+
+    def run_headless(
+        self,
+        n_robots: int = 1,
+        n_packages: int = 1,
+        max_ticks: int | None = None,
+        max_deliveries: int | None = None,
+        seed: int = 0,
+        orders: OrderQueue | None = None,
+        recorder: TraceRecorder | None = None,
+    ) -> Metrics:
+        """
+        Runs the simulation as fast as possible, without rendering, until
+        `max_ticks` ticks have elapsed or `max_deliveries` packages have been
+        delivered (whichever comes first).
+
+        :param orders: Optional stream of orders. Packages are then admitted as
+            they arrive, instead of in waves of `n_packages`, and their latency
+            is measured from their arrival.
+        :param recorder: Optional recorder of every tick of the run, to replay
+            it later (see `traces.Trace`).
+        """
+        if max_ticks is None and max_deliveries is None:
+            raise ValueError("either max_ticks or max_deliveries is needed")
+        self.random.seed(seed)
+        self.recorder = recorder
+        self._start(n_robots, orders)
+        start: float = time.perf_counter()
+        while max_ticks is None or self.metrics.ticks < max_ticks:
+            if max_deliveries and self.metrics.deliveries >= max_deliveries:
+                break
+            self._tick(n_packages)
+        self.metrics.elapsed = time.perf_counter() - start
+        if recorder is not None:
+            recorder.flush()
+            self.recorder = None
+        self._profile_run()
+        return self.metrics
+
+    def close(self) -> None:
+        """
+        Shuts down the worker processes computing the policies, if any (see
+        `MultiPolicy.close`).
+        """
+        self.search.close()
+
+    def __enter__(self) -> "ConsoleSimulator":
+        return self
+
+    def __exit__(self, *exc_info: any) -> None:
+        self.close()
+
+    def _start(
+        self,
+        n_robots: int,
+        orders: OrderQueue | None = None,
+    ) -> None:
+        """
+        Resets the run-dependent objects, placing `n_robots` new robots.
+        """
+        self.packages = {}
+        self.robots = self._create_robots(n_robots)
+        self.metrics = Metrics()
+        self.orders = orders
+        self._package_policies = {}
+        self._created = {}
+        self._assignment_pending = False
+        self._package_index = self._new_index()
+        self._rest_index = self._new_index()
+        for rank, rest in enumerate(self.rests):
+            self._rest_index.insert(rest, rest, rank)
+        if self.recorder is not None:
+            self.recorder.start(self.map, self.rests, n_robots)
+
+    def _tick(self, n_packages: int) -> None:
+        """
+        Advances the simulation by one step, creating `n_packages` new packages
+        if all previous have been delivered.
+        """
+        metrics: Metrics = self.metrics
+        start: float = time.perf_counter()
+        # Creates new packages if all previous have been delivered, unless
+        # they arrive as a stream.
+        with self._phase("packages"):
+            if self.orders is not None:
+                self._admit_orders(metrics.ticks)
+            elif not self.packages and all(r.is_free for r in self.robots):
+                self._package_policies = self._new_packages(n_packages)
+                for package in self.packages:
+                    self._created[package] = metrics.ticks
+                    if self.recorder is not None:
+                        self.recorder.event(TraceEvent.CREATE, package)
+                self._assignment_pending = True
+        with self._phase("assignment"):
+            if self.assignment == "batch" and self._assignment_pending:
+                self._assign_packages()
             # Queries all robots to try to make package assignations.
+            greedy: bool = self.assignment == "greedy"
             for robot in self.robots:
                 if robot.is_free:
                     # Tries to assign a package.
-                    if package := self._get_package(self.packages, robot):
-                        self.packages[package] = True
-                        robot.prepare(
-                            package,
-                            package_policies[package],
-                            self.belt_policies[package.destination],
-                        )
+                    if greedy and (
+                        package := self._get_package(robot)
+                    ):
+                        self._prepare(robot, package)
                     # If not possible, it goes to a resting location.
                     elif rest := self._get_optimal_rest(robot):
-                        robot.set_rest(rest, self.rest_policies[rest])
-                if package := robot.step():
-                    del self.packages[package]
-            self._print()
-            time.sleep(0.1)
+                        self._claim_rest(robot, rest)
+        with self._phase("planning"):
+            self._plan()
+        stepping: float = time.perf_counter()
+        metrics.planning_time += stepping - start
+        with self._phase("stepping"):
+            if self.recorder is not None:
+                carriers: list[Package | None] = list(self.robots.packages)
+            picked, delivered = self._step()
+            for package in picked:
+                del self.packages[package]
+            for package in delivered:
+                self._deliver(package, metrics.ticks)
+        metrics.stepping_time += time.perf_counter() - stepping
+        if self.recorder is not None:
+            self._record(carriers, picked, delivered)
+        metrics.ticks += 1
+
+    def _plan(self) -> None:
+        """
+        Plans the moves of the robots for the current tick, once they have
+        been assigned their targets. Robots just follow their policies here.
+        """
+
+    def _step(self) -> tuple[list[Package], list[Package]]:
+        """
+        Moves all robots one step forward.
+        :return: The packages picked up and delivered in this step.
+        """
+        return self.robots.step()
+
+    def _record(
+        self,
+        carriers: list[Package | None],
+        picked: list[Package],
+        delivered: list[Package],
+    ) -> None:
+        """
+        Records the packages `picked` up and `delivered` in this tick, given
+        the package of each robot before stepping, and the new state of the
+        robots.
+        """
+        robots: dict[Package, int] = {
+            package: i
+            for i, package in enumerate(carriers)
+            if package is not None
+        }
+        for package in picked:
+            self.recorder.event(
+                TraceEvent.PICKUP, package, robots.get(package, -1)
+            )
+        for package in delivered:
+            self.recorder.event(TraceEvent.DELIVERY, package)
+        self.recorder.frame(self.robots)
+
+    def _admit_orders(self, tick: int) -> None:
+        """
+        Turns the orders admitted by `self.orders` at `tick` into packages.
+        """
+        admitted: list[Package] = self.orders.poll(tick)
+        if not admitted:
+            return
+        policies: dict[Location2D, GridPolicy] = self._get_rack_policies(
+            list({package.location: None for package in admitted})
+        )
+        for package in admitted:
+            self.packages[package] = False
+            self._index_package(package)
+            self._package_policies[package] = policies[package.location]
+            self._created[package] = self.orders.arrivals[package]
+            if self.recorder is not None:
+                self.recorder.event(TraceEvent.CREATE, package)
+        self._assignment_pending = True
+
+    def _deliver(self, package: Package, tick: int) -> None:
+        """
+        Accounts for the delivery of `package` at `tick`.
+        """
+        self._assignment_pending = True
+        self.metrics.deliveries += 1
+        created: int = self._created.pop(package)
+        self.metrics.latencies.append(tick - created)
+        if self.orders is not None:
+            self.orders.complete(package, tick)
+            del self._package_policies[package]
+
+    def _assign_packages(self) -> None:
+        """
+        Assigns the untaken packages to the free robots all at once, minimizing
+        the total cost-to-go of picking up and delivering them.
+        """
+        self._assignment_pending = False
+        robots: list[RobotView] = [r for r in self.robots if r.is_free]
+        packages: list[Package] = [
+            package for package, taken in self.packages.items() if not taken
+        ]
+        if not robots or not packages:
+            return
+        xs: np.ndarray = np.array([robot.location.x for robot in robots])
+        ys: np.ndarray = np.array([robot.location.y for robot in robots])
+        costs: np.ndarray = np.empty((len(robots), len(packages)))
+        for j, package in enumerate(packages):
+            pickup: np.ndarray = self._package_policies[package].costs
+            costs[:, j] = pickup[ys, xs] + self._delivery_cost(package)
+        for i, j in hungarian(costs):
+            self._prepare(robots[i], packages[j])
+
+    def _delivery_cost(self, package: Package) -> float:
+        """
+        Returns the cost-to-go from the cells next to `package` into its
+        destination belt.
+        """
+        policy: GridPolicy = self.belt_policies[package.destination]
+        return min(
+            policy.cost(action.apply(package.location)) for action in Action
+        )
+
+    def _prepare(self, robot: RobotView, package: Package) -> None:
+        """
+        Assigns `package` to `robot`.
+        """
+        self.packages[package] = True
+        self._package_index.remove(package)
+        self._release_rest(robot)
+        robot.prepare(
+            package,
+            self._package_policies[package],
+            self.belt_policies[package.destination],
+        )
+
+    def set_cells(self, changes: dict[Location2D, CellType]) -> None:
+        """
+        Changes the type of the given cells while the simulation runs (e.g., to
+        block an aisle, move a rack or take a belt offline), repairing the
+        belt, resting and in-flight package policies incrementally. Cached
+        rack policies are dropped, and so are the policies of removed belts,
+        while new belts get their own.
+
+        Cells under a robot or on a resting location can't change. Racks and
+        belts can't be removed while an undelivered package comes from or
+        goes to them, nor at all while orders stream in (as later orders may
+        still refer to them).
+        """
+        occupied: set[Location2D] = {robot.location for robot in self.robots}
+        occupied.update(self.rests)
+        # Racks and belts of the undelivered packages.
+        used: set[Location2D] = {package.location for package in self.packages}
+        used.update(package.destination for package in self._created)
+        removable: tuple[str, str] = (CellType.RACK.value, CellType.BELT.value)
+        for (x, y), type_ in changes.items():
+            if (x, y) in occupied:
+                raise ValueError(f"cell {(x, y)} is occupied")
+            old: str = self.map[y][x]
+            if old in removable and old != type_.value and (
+                self.orders is not None or (x, y) in used
+            ):
+                raise ValueError(f"cell {(x, y)} is in use")
+        rows: list[list[str]] = [list(row) for row in self.map]
+        for (x, y), type_ in changes.items():
+            rows[y][x] = type_.value
+            self._free[y, x] = type_ == CellType.FREE
+        self.map = ["".join(row) for row in rows]
+        self.layout = WarehouseMap.from_lines(self.map)
+        self.graph = CompiledGrid2D(self.map)
+        self.belts = self._get_cells(CellType.BELT)
+        for belt in set(self.belt_policies).difference(self.belts):
+            del self.belt_policies[belt]
+        policies: dict[Location2D, GridPolicy] = {
+            **self.belt_policies,
+            **self.rest_policies,
+            **{p.location: self._package_policies[p] for p in self._created},
+        }
+        fields: dict[Location2D, IncrementalField] = {}
+        with self._phase("repairs"):
+            for target, policy in policies.items():
+                field: IncrementalField | None = self._fields.get(target)
+                if field is None or field.policy is not policy:
+                    field = IncrementalField(self._free, policy)
+                field.repair(changes)
+                fields[target] = field
+        self._fields = fields
+        self.belt_policies.update(self._get_policies([
+            belt for belt in self.belts if belt not in self.belt_policies
+        ]))
+        self.robots.refresh()
+        self.rack_policies.clear()
+        # Its distances are outdated, until built again.
+        self.oracle = None
+        # The static layout must be drawn again.
+        self.renderer = None
+
+    def get_route(
+        self,
+        start: Location2D,
+        target: Location2D,
+    ) -> dict[Location2D, Action]:
+        """
+        Returns the policy to reach `target` from `start`, which only covers
+        the locations along the shortest path between both.
+        """
+        bound: Callable[[int], float] | None = None
+        if self.oracle is not None:
+            bound = self.oracle.heuristic(start)
+        queue: type = util.PriorityQueue
+        if self.profiler is not None:
+            queue = self.profiler.queue(queue)
+        with self._phase("routes"):
+            path: dict[int, Successor] = AStar(queue).run_compiled(
+                self.graph,
+                [self.graph.index(target)],
+                [self.graph.index(start)],
+                bound,
+            )
+        with self._phase("reverse_policy"):
+            return util.reverse_policy(self.graph.path_policy(path))
 
     def _create_packages(self, n: int) -> dict[Package, bool]:
         """
         Returns `n` packages randomly distributed from the racks.
         """
-        rack_cells: list[Location2D] = self._get_cells(CellType.RACK)
         return {
-            Package(location, random.choice(self.belts)): False
-            for location in random.sample(rack_cells, n)
+            Package(location, self.random.choice(self.belts)): False
+            for location in self.layout.sample(CellType.RACK, n, self.random)
         }
 
-    def _create_robots(self, n: int) -> list[Robot]:
+    def _create_robots(self, n: int) -> Fleet:
         """
         Returns `n` robots randomly distributed around the warehouse.
         """
-        locations: list[Location2D] = self._get_cells(CellType.FREE)
-        return [Robot(location) for location in random.sample(locations, n)]
+        return Fleet(self.layout.sample(CellType.FREE, n, self.random))
 
     def _get_cells(self, type_: CellType) -> list[Location2D]:
         """
         Returns the cells in `self.map` of the given `type_`.
         """
-        rows, cols = len(self.map), len(self.map[0])
-        return [
-            Location2D(j, i)
-            for i, j in itertools.product(range(rows), range(cols))
-            if self.map[i][j] == type_.value
-        ]
+        return self.layout.locations(type_)
 
-    @staticmethod
-    def _get_package(packages: dict[Package, bool], robot: Robot) -> Package:
+    def _get_package(self, robot: RobotView) -> Package | None:
         """
-        Returns the package that's most "transport efficient" for `robot`.
+        Returns the untaken package that's most "transport efficient" for
+        `robot`.
         """
 
         def cost(package: Package) -> float:
             """
             Computes the cost of transporting `package`.
             """
-            c1: float = util.distance(robot.location, package.location)
-            c2: float = util.distance(package.location, package.destination)
+            c1: float = self._distance(robot.location, package.location)
+            c2: float = self._distance(package.location, package.destination)
             return c1 + c2
 
-        packages: list = [pkg for pkg, taken in packages.items() if not taken]
-        return min(packages, key=cost) if packages else None
+        return self._package_index.nearest(robot.location, cost)
 
     def _get_policies(
         self,
         targets: list[Location2D],
-    ) -> dict[Location2D, dict[Location2D, Action]]:
+    ) -> dict[Location2D, GridPolicy]:
         """
-        Returns the optimal policy to reach each location in `targets`.
+        Returns the optimal policy to reach each location in `targets`, loading
+        it from `self.store` when available.
         """
-        problem: Grid2D = Grid2D(self.map, targets, [])
-        policies: dict = MultiPolicy().run(problem)
-        return {t: util.reverse_policy(policies[t]) for t in targets}
+        policies: dict[Location2D, GridPolicy] = {}
+        with self._phase("policies"):
+            if self.store:
+                for target in targets:
+                    policy: GridPolicy | None = self.store.load(
+                        self.map, target
+                    )
+                    if policy is not None:
+                        policies[target] = policy
+            missing: list[Location2D] = [
+                t for t in targets if t not in policies
+            ]
+            fields: list[Field] = self.search.run_compiled(
+                self.graph, missing
+            )
+            for target, field in zip(missing, fields):
+                policies[target] = GridPolicy.from_field(self.graph, field)
+                if self.store:
+                    self.store.save(self.map, target, policies[target])
+        if self.profiler is not None:
+            self.profiler.count("policies_loaded", len(targets) - len(missing))
+            self.profiler.count("policies_computed", len(missing))
+        return {target: policies[target] for target in targets}
 
-    def _get_optimal_rest(self, robot: Robot) -> Location2D | None:
+    def _get_rack_policies(
+        self,
+        racks: list[Location2D],
+    ) -> dict[Location2D, GridPolicy]:
         """
-        Returns the resting location closest `robot`, if not already in one.
+        Returns the optimal policy to reach each location in `racks`, reusing
+        the ones in `self.rack_policies`.
+        """
+        policies: dict[Location2D, GridPolicy] = {}
+        for rack in racks:
+            if (policy := self.rack_policies.get(rack)) is not None:
+                policies[rack] = policy
+        missing: list[Location2D] = [r for r in racks if r not in policies]
+        for rack, policy in self._get_policies(missing).items():
+            self.rack_policies.put(rack, policy)
+            policies[rack] = policy
+        return policies
+
+    def warm_up(self, n: int | None = None) -> None:
+        """
+        Precomputes the policies of the `n` most used racks so far, or of any
+        `n` racks if none has been used yet.
+        """
+        racks: list[Location2D] = self.rack_policies.most_used(n)
+        if not racks:
+            racks = self._get_cells(CellType.RACK)[:n]
+        missing: list[Location2D] = [
+            rack for rack in racks if rack not in self.rack_policies
+        ]
+        for rack, policy in self._get_policies(missing).items():
+            self.rack_policies.put(rack, policy)
+
+    def _index_package(self, package: Package) -> None:
+        """
+        Adds the untaken `package` to `self._package_index`, for
+        `_get_package`.
+        """
+        offset: float = util.distance(package.location, package.destination)
+        self._package_index.insert(package, package.location, offset=offset)
+
+    def _get_optimal_rest(self, robot: RobotView) -> Location2D | None:
+        """
+        Returns the unclaimed resting location closest `robot`, if not already
+        in one.
         """
         if robot.rest or robot.location in self.rests:
             return None
-        rests: list[Location2D] = self.rests[:]
-        for robot in self.robots:
-            if robot.rest:
-                rests.remove(robot.rest)
-        cost = lambda rest: util.distance(robot.location, rest)
-        return min(rests, key=cost)
+        cost = lambda rest: self._distance(robot.location, rest)
+        return self._rest_index.nearest(robot.location, cost)
 
-    def _new_packages(self, n: int) -> dict[Package, dict[Location2D, Action]]:
+    def _claim_rest(self, robot: RobotView, rest: Location2D) -> None:
+        """
+        Sends `robot` to `rest`, which no other robot can claim until it
+        leaves.
+        """
+        self._rest_index.remove(rest)
+        robot.set_rest(rest, self.rest_policies[rest])
+
+    def _release_rest(self, robot: RobotView) -> None:
+        """
+        Makes the resting location claimed by `robot`, if any, available again.
+        """
+        if robot.rest is not None:
+            rest: Location2D = robot.rest
+            self._rest_index.insert(rest, rest, self.rests.index(rest))
+
+    def _distance(self, a: Location2D, b: Location2D) -> float:
+        """
+        Estimates the path cost between `a` and `b`: the Euclidean distance, or
+        the lower bound given by `self.oracle` (exact between key locations),
+        if any and higher. Either way, it never underestimates the Euclidean
+        distance, as `GridIndex.nearest` requires.
+        """
+        distance: float = util.distance(a, b)
+        if self.oracle is not None:
+            return max(self.oracle.lower_bound(a, b), distance)
+        return distance
+
+    def _new_packages(self, n: int) -> dict[Package, GridPolicy]:
         """
         Creates a new set of packages and returns the policy to (independently)
         deliver each one.
         """
         self.packages = self._create_packages(n)
+        self._package_index = self._new_index()
+        for package in self.packages:
+            self._index_package(package)
+        policies: dict[Location2D, GridPolicy] = self._get_rack_policies(
+            [package.location for package in self.packages]
+        )
         return {
-            package: self._get_policies([package.location])[package.location]
-            for package in self.packages
+            package: policies[package.location] for package in self.packages
         }
 
+    def _new_index(self) -> GridIndex:
+        return GridIndex(self.graph.rows, self.graph.cols)
+
     def _print(self) -> None:
-        layout: list[str] = []
-        p_locations: list[Location2D] = [p.location for p in self.packages]
-        r_locations: list[Location2D] = [r.location for r in self.robots]
-        for i, row in enumerate(self.map):
-            layout.append("")
-            for j, cell in enumerate(row):
-                if (j, i) in p_locations:
-                    layout[-1] += Icon.PACKAGE.value
-                elif (j, i) in r_locations:
-                    layout[-1] += Icon.ROBOT.value
-                elif (j, i) in self.rests:
-                    layout[-1] += Icon.REST.value
-                else:
-                    layout[-1] += char_map[cell]
-        print("\n".join(layout))
+        with self._phase("rendering"):
+            if self.renderer is None:
+                self.renderer = TerminalRenderer(self.map, self.rests)
+            self.renderer.render(
+                [package.location for package in self.packages],
+                [robot.location for robot in self.robots],
+            )
+
+    def _phase(self, name: str) -> contextlib.AbstractContextManager:
+        """
+        Returns a context manager timing the phase `name` with
+        `self.profiler`, or doing nothing without it.
+        """
+        if self.profiler is None:
+            return _no_phase
+        return self.profiler.phase(name)
+
+    def _profile_run(self) -> None:
+        """
+        Reports the state of the policy caches and the memory used at the end
+        of a run to `self.profiler`, if any.
+        """
+        if self.profiler is None:
+            return
+        cache: PolicyCache = self.rack_policies
+        for name in ("hits", "misses", "evictions", "nbytes"):
+            self.profiler.gauge(f"rack_cache_{name}", getattr(cache, name))
+        self.profiler.gauge("rack_policies_cached", len(cache))
+        self.profiler.gauge("package_policies", len(self._package_policies))
+        self.profiler.snapshot("run")
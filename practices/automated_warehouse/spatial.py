@@ -0,0 +1,193 @@
+import bisect
+import heapq
+import itertools
+import math
+from collections.abc import Hashable
+from collections.abc import Iterator
+from typing import Callable
+
+import util
+from problems import Location2D
+
+
+class GridIndex:
+    """
+    Grid-bucket spatial index of items placed on the cells of a map, for
+    nearest-item queries under insertions and removals.
+
+    The map is split into square buckets of `bucket_size` cells, and queries
+    visit the buckets in rings around the queried location, stopping as soon
+    as no bucket left can hold a cheaper item. Items may have a fixed
+    `offset` added to their cost (e.g., the distance of a package to its
+    belt): buckets keep their items sorted by offset, so that only the ones
+    that might be cheaper are evaluated.
+    """
+
+    def __init__(self, rows: int, cols: int, bucket_size: int = 8) -> None:
+        """
+        :param rows: Number of rows of the map.
+        :param cols: Number of columns of the map.
+        :param bucket_size: Side of the buckets, in cells.
+        """
+        self.bucket_size: int = bucket_size
+        self._shape: tuple[int, int] = (
+            -(-rows // bucket_size), -(-cols // bucket_size)
+        )
+        # Items in each (non-empty) bucket, by ``(row, column)``. Elements are:
+        # ``(offset, rank, item)``, sorted.
+        self._buckets: dict[
+            tuple[int, int], list[tuple[float, int, Hashable]]
+        ] = {}
+        # Location, rank and offset of each item.
+        self._items: dict[Hashable, tuple[Location2D, int, float]] = {}
+        # Elements are: ``(offset, rank, item)``, including removed items (and
+        # duplicates of re-inserted ones), until rebuilt past twice the items.
+        self._offsets: list[tuple[float, int, Hashable]] = []
+        self._ranks: Iterator[int] = itertools.count()
+
+    def insert(
+        self,
+        item: Hashable,
+        location: Location2D,
+        rank: int | None = None,
+        offset: float = 0.0,
+    ) -> None:
+        """
+        Places `item` at `location`, moving it if already indexed.
+
+        :param rank: Breaks ties between items as cheap as each other (the
+            lowest first), and must be unique. Defaults to the insertion
+            order.
+        :param offset: Lower bound of the item's cost, on top of its Euclidean
+            distance from the queried location (see `nearest`).
+        """
+        self.remove(item)
+        if rank is None:
+            rank = next(self._ranks)
+        self._items[item] = (location, rank, offset)
+        if len(self._offsets) >= 2 * len(self._items):
+            self._offsets = [
+                (offset, rank, item)
+                for item, (_, rank, offset) in self._items.items()
+            ]
+            heapq.heapify(self._offsets)
+        else:
+            heapq.heappush(self._offsets, (offset, rank, item))
+        bucket: tuple[int, int] = self._bucket(location)
+        bisect.insort(
+            self._buckets.setdefault(bucket, []), (offset, rank, item)
+        )
+
+    def remove(self, item: Hashable) -> None:
+        """
+        Removes `item` from the index, if present.
+        """
+        if (entry := self._items.pop(item, None)) is None:
+            return
+        location, rank, offset = entry
+        bucket: tuple[int, int] = self._bucket(location)
+        items: list[tuple[float, int, Hashable]] = self._buckets[bucket]
+        del items[bisect.bisect_left(items, (offset, rank))]
+        if not items:
+            del self._buckets[bucket]
+
+    def nearest(
+        self,
+        location: Location2D,
+        cost: Callable[[Hashable], float] | None = None,
+    ) -> Hashable | None:
+        """
+        Returns the item of minimum `cost` (by default, the Euclidean distance
+        from `location`, plus its offset), if any.
+
+        :param cost: Cost of each item, which must never be lower than its
+            Euclidean distance from `location` plus its offset (e.g., any path
+            cost through it), so that far away buckets can be skipped.
+        """
+        if not self._items:
+            return None
+        if cost is None:
+            cost = lambda item: util.distance(
+                location, self._items[item][0]
+            ) + self._items[item][2]
+        floor: float = self._floor()
+        rows, cols = self._shape
+        by, bx = self._bucket(location)
+        best: Hashable | None = None
+        best_cost: float = math.inf
+        best_rank: int = 0
+        max_ring: int = max(by, bx, rows - 1 - by, cols - 1 - bx)
+        for ring in range(max_ring + 1):
+            # Closest any cell of the ring can be to `location`.
+            if ring and (ring - 1) * self.bucket_size + 1 + floor > best_cost:
+                break
+            for bucket in self._ring(by, bx, ring):
+                if (items := self._buckets.get(bucket)) is None:
+                    continue
+                bound: float = self._distance(location, bucket)
+                for offset, rank, item in items:
+                    if bound + offset > best_cost:
+                        break
+                    item_cost: float = cost(item)
+                    if (item_cost, rank) < (best_cost, best_rank):
+                        best, best_cost, best_rank = item, item_cost, rank
+        return best
+
+    def _bucket(self, location: Location2D) -> tuple[int, int]:
+        return location.y // self.bucket_size, location.x // self.bucket_size
+
+    def _distance(
+        self,
+        location: Location2D,
+        bucket: tuple[int, int],
+    ) -> float:
+        """
+        Returns the Euclidean distance from `location` to the closest cell of
+        `bucket`.
+        """
+        size: int = self.bucket_size
+        y0, x0 = bucket[0] * size, bucket[1] * size
+        dy: int = max(y0 - location.y, 0, location.y - (y0 + size - 1))
+        dx: int = max(x0 - location.x, 0, location.x - (x0 + size - 1))
+        return math.hypot(dx, dy)
+
+    def _floor(self) -> float:
+        """
+        Returns the lowest offset of all items, dropping the stale entries of
+        `self._offsets` on the way.
+        """
+        while self._offsets:
+            offset, rank, item = self._offsets[0]
+            entry: tuple[Location2D, int, float] | None = self._items.get(item)
+            if entry is not None and entry[1:] == (rank, offset):
+                return offset
+            heapq.heappop(self._offsets)
+        return 0.0
+
+    def _ring(self, by: int, bx: int, ring: int) -> Iterator[tuple[int, int]]:
+        """
+        Yields the buckets at a Chebyshev distance of `ring` from ``(by,
+        bx)``, inside the map.
+        """
+        rows, cols = self._shape
+        if ring == 0:
+            yield by, bx
+            return
+        for x in range(max(bx - ring, 0), min(bx + ring, cols - 1) + 1):
+            for y in (by - ring, by + ring):
+                if 0 <= y < rows:
+                    yield y, x
+        top, bottom = max(by - ring + 1, 0), min(by + ring - 1, rows - 1)
+        for y in range(top, bottom + 1):
+            for x in (bx - ring, bx + ring):
+                if 0 <= x < cols:
+                    yield y, x
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self._items
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
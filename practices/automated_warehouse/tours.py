@@ -0,0 +1,310 @@
+import itertools
+
+import numpy as np
+
+from assignment import hungarian
+from models import Package
+from models import RobotView
+from orders import OrderQueue
+from policies import GridPolicy
+from problems import Action
+from problems import CellType
+from problems import Location2D
+from simulators import ConsoleSimulator
+
+
+def tour_cost(
+    order: list[int],
+    legs: np.ndarray,
+    drops: np.ndarray,
+    firsts: np.ndarray | None = None,
+) -> float:
+    """
+    Returns the cost of picking up packages in the given `order` and then
+    delivering them.
+
+    :param order: Indices of the packages, in pickup order.
+    :param legs: Cost of going from picking up each package to picking up
+        each other, with shape ``(n, n)``.
+    :param drops: Cost of delivering after picking up each package.
+    :param firsts: Optional cost of going from the robot to pick up each
+        package. The start is free if not given.
+    """
+    cost: float = 0.0 if firsts is None else float(firsts[order[0]])
+    for a, b in itertools.pairwise(order):
+        cost += legs.item(a, b)
+    return cost + drops.item(order[-1])
+
+
+def cheapest_insertion(
+    order: list[int],
+    candidates: list[int],
+    legs: np.ndarray,
+    drops: np.ndarray,
+    firsts: np.ndarray | None = None,
+) -> tuple[int, int] | None:
+    """
+    Finds the candidate adding the least cost to the tour (see `tour_cost`)
+    when inserted at its best position.
+
+    :param candidates: Indices of the packages that can join the tour.
+    :return: The candidate and its position in `order`, or ``None`` if none
+        can be reached.
+    """
+    if not candidates:
+        return None
+    left: np.ndarray = np.array(candidates, np.intp)
+    first, last = order[0], order[-1]
+    # Extra cost of each candidate (rows) at each position (columns).
+    deltas: np.ndarray = np.empty((len(left), len(order) + 1))
+    deltas[:, 0] = legs[left, first]
+    if firsts is not None:
+        deltas[:, 0] += firsts[left] - firsts[first]
+    for k, (a, b) in enumerate(itertools.pairwise(order), 1):
+        deltas[:, k] = legs[a, left] + legs[left, b] - legs[a, b]
+    deltas[:, -1] = legs[last, left] + drops[left] - drops[last]
+    row, position = divmod(int(np.argmin(deltas)), len(order) + 1)
+    if not np.isfinite(deltas[row, position]):
+        return None
+    return int(left[row]), position
+
+
+def two_opt(
+    order: list[int],
+    legs: np.ndarray,
+    drops: np.ndarray,
+    firsts: np.ndarray | None = None,
+) -> list[int]:
+    """
+    Improves the pickup `order` of a tour by reversing any of its segments
+    while it lowers the tour cost (see `tour_cost`).
+    :return: The improved order.
+    """
+    best: float = tour_cost(order, legs, drops, firsts)
+    improved: bool = True
+    while improved:
+        improved = False
+        for i, j in itertools.combinations(range(len(order)), 2):
+            new_order: list[int] = (
+                order[:i] + order[i : j + 1][::-1] + order[j + 1 :]
+            )
+            cost: float = tour_cost(new_order, legs, drops, firsts)
+            if cost < best:
+                order, best, improved = new_order, cost, True
+    return order
+
+
+class TourSimulator(ConsoleSimulator):
+    """
+    Version of `ConsoleSimulator` where robots carry up to `capacity`
+    packages per trip: each free robot is given a tour of several pickups,
+    all bound to the same belt, followed by a single delivery.
+
+    Free robots are first assigned a package each, as in `ConsoleSimulator`;
+    then, their tours are grown in turns by cheapest insertion, and their
+    pickup order refined by 2-opt. All distances come from the cost-to-go
+    grids of the policies, gathered once for every rack (see `_approach`)
+    and cached while their packages are pending, so no search is run while
+    deciding. With a `capacity` of 1, this is the same as `ConsoleSimulator`.
+    """
+
+    def __init__(self, *args: any, capacity: int = 4, **kwargs: any) -> None:
+        """
+        Takes the same arguments as `ConsoleSimulator`, plus:
+
+        :param capacity: Maximum number of packages carried by a robot.
+        """
+        super().__init__(*args, **kwargs)
+        if self.assignment != "batch":
+            raise ValueError("tours can only be assigned in batches")
+        self.capacity: int = capacity
+        racks: list[Location2D] = self._get_cells(CellType.RACK)
+        self._rack_ids: dict[Location2D, int] = {
+            rack: k for k, rack in enumerate(racks)
+        }
+        # Cells next to each rack, with shape ``(racks, actions)``.
+        self._xs: np.ndarray = np.array(
+            [[action.apply(rack).x for action in Action] for rack in racks]
+        )
+        self._ys: np.ndarray = np.array(
+            [[action.apply(rack).y for action in Action] for rack in racks]
+        )
+        # Cost-to-go from each rack into each target (see `_approach`).
+        self._approaches: dict[Location2D, np.ndarray] = {}
+        # Packages left to pick up and packages carried by each robot.
+        self._tours: dict[int, list[Package]] = {}
+        self._loads: dict[int, list[Package]] = {}
+        # Robot transporting each taken package.
+        self._carriers: dict[Package, int] = {}
+
+    def _start(
+        self,
+        n_robots: int,
+        orders: OrderQueue | None = None,
+    ) -> None:
+        super()._start(n_robots, orders)
+        self._tours, self._loads, self._carriers = {}, {}, {}
+
+    def set_cells(self, changes: dict[Location2D, CellType]) -> None:
+        super().set_cells(changes)
+        self._approaches = {}
+
+    def _step(self) -> tuple[list[Package], list[Package]]:
+        """
+        Moves all robots one step forward, sending the robots that picked up a
+        package to the next one of their tour.
+        :return: The packages picked up and delivered in this step.
+        """
+        picked, delivered = super()._step()
+        for package in picked:
+            i: int = self._carriers[package]
+            self._loads[i].append(package)
+            if self._tours[i]:
+                next_package: Package = self._tours[i].pop(0)
+                self.robots[i].prepare(
+                    next_package,
+                    self._package_policies[next_package],
+                    self.belt_policies[next_package.destination],
+                )
+        loads: list[Package] = []
+        for package in delivered:
+            i = self._carriers[package]
+            del self._tours[i]
+            for carried in self._loads.pop(i):
+                del self._carriers[carried]
+                loads.append(carried)
+        return picked, loads
+
+    def _assign_packages(self) -> None:
+        """
+        Assigns a tour of untaken packages to each free robot, seeded by the
+        assignment of `ConsoleSimulator` and grown in turns.
+        """
+        self._assignment_pending = False
+        robots: list[RobotView] = [r for r in self.robots if r.is_free]
+        packages: list[Package] = [
+            package for package, taken in self.packages.items() if not taken
+        ]
+        if not robots or not packages:
+            return
+        # Only the costs into the belts and pending racks are kept.
+        targets: set[Location2D] = {p.location for p in self._created}
+        targets.update(self.belt_policies)
+        self._approaches = {
+            target: approach
+            for target, approach in self._approaches.items()
+            if target in targets
+        }
+        xs: np.ndarray = np.array([robot.location.x for robot in robots])
+        ys: np.ndarray = np.array([robot.location.y for robot in robots])
+        pickups: np.ndarray = np.empty((len(robots), len(packages)))
+        for j, package in enumerate(packages):
+            pickups[:, j] = _costs(self._package_policies[package], ys, xs)
+        # Indices of the packages bound to each belt.
+        groups: dict[Location2D, list[int]] = {}
+        for j, package in enumerate(packages):
+            groups.setdefault(package.destination, []).append(j)
+        costs: dict[Location2D, tuple[np.ndarray, np.ndarray]] = {}
+        drops: np.ndarray = np.empty(len(packages))
+        for belt, group in groups.items():
+            costs[belt] = self._tour_costs([packages[j] for j in group])
+            drops[group] = costs[belt][1]
+        # Robot assigned to each package, as in `ConsoleSimulator`.
+        seeds: dict[int, int] = {
+            j: i for i, j in hungarian(pickups + drops)
+        }
+        for belt, group in groups.items():
+            legs, group_drops = costs[belt]
+            firsts: np.ndarray = pickups[:, group]
+            # Tours of the robots seeded in the group, as indices in `group`.
+            tours: dict[int, list[int]] = {
+                seeds[j]: [k] for k, j in enumerate(group) if j in seeds
+            }
+            left: list[int] = [
+                k for k, j in enumerate(group) if j not in seeds
+            ]
+            for _ in range(self.capacity - 1):
+                for i, order in tours.items():
+                    insertion: tuple[int, int] | None = cheapest_insertion(
+                        order, left, legs, group_drops, firsts[i]
+                    )
+                    if insertion is not None:
+                        k, position = insertion
+                        order.insert(position, k)
+                        left.remove(k)
+            for i, order in tours.items():
+                order = two_opt(order, legs, group_drops, firsts[i])
+                self._prepare_tour(
+                    robots[i], [packages[group[k]] for k in order]
+                )
+
+    def _tour_costs(
+        self,
+        packages: list[Package],
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the leg costs between `packages` and their delivery costs (see
+        `tour_cost`), all of them bound to the same belt.
+        """
+        ids: list[int] = [self._rack_ids[p.location] for p in packages]
+        approaches: np.ndarray = np.stack(
+            [
+                self._approach(p.location, self._package_policies[p])
+                for p in packages
+            ],
+            axis=1,
+        )
+        destination: Location2D = packages[0].destination
+        belt: np.ndarray = self._approach(
+            destination, self.belt_policies[destination]
+        )
+        return approaches[ids], belt[ids]
+
+    def _approach(self, target: Location2D, policy: GridPolicy) -> np.ndarray:
+        """
+        Returns the cost-to-go of the `policy` to reach `target` from every
+        rack. A robot picks up a package from a cell next to its rack, so the
+        cheapest of these cells is taken, as in `_delivery_cost`.
+        """
+        if (approach := self._approaches.get(target)) is not None:
+            return approach
+        rows, cols = policy.costs.shape
+        inside: np.ndarray = (
+            (0 <= self._xs) & (self._xs < cols)
+            & (0 <= self._ys) & (self._ys < rows)
+        )
+        costs: np.ndarray = _costs(
+            policy, self._ys.clip(0, rows - 1), self._xs.clip(0, cols - 1)
+        )
+        approach = np.where(inside, costs, np.inf).min(axis=1)
+        self._approaches[target] = approach
+        return approach
+
+    def _prepare_tour(self, robot: RobotView, tour: list[Package]) -> None:
+        """
+        Assigns the packages of `tour` to `robot`, in pickup order.
+        """
+        for package in tour:
+            self.packages[package] = True
+            self._package_index.remove(package)
+            self._carriers[package] = robot.i
+        self._release_rest(robot)
+        self._tours[robot.i] = tour[1:]
+        self._loads[robot.i] = []
+        robot.prepare(
+            tour[0],
+            self._package_policies[tour[0]],
+            self.belt_policies[tour[0].destination],
+        )
+
+
+def _costs(policy: GridPolicy, ys: np.ndarray, xs: np.ndarray) -> np.ndarray:
+    """
+    Returns the cost-to-go of `policy` from the given cells as floats, with
+    ``inf`` for the cells it doesn't cover.
+    """
+    costs: np.ndarray = policy.costs[ys, xs]
+    if np.issubdtype(costs.dtype, np.integer):
+        inf: int = np.iinfo(costs.dtype).max
+        return np.where(costs == inf, np.inf, costs)
+    return costs.astype(float)
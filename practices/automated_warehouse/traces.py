@@ -0,0 +1,311 @@
+import enum
+import json
+import os
+import sys
+
+import numpy as np
+
+from models import Fleet
+from models import Package
+from models import Phase
+from problems import Location2D
+from renderers import TerminalRenderer
+
+
+class TraceEvent(enum.IntEnum):
+    """
+    Package events of a recorded run.
+    """
+
+    CREATE = 0
+    PICKUP = 1
+    DELIVERY = 2
+
+
+# State of each robot after each tick.
+FRAME: np.dtype = np.dtype([("x", "<i2"), ("y", "<i2"), ("phase", "i1")])
+# Package events, in tick order. The robot is -1 for creations, or if not
+# known.
+EVENT: np.dtype = np.dtype(
+    [
+        ("tick", "<i4"),
+        ("kind", "i1"),
+        ("robot", "<i4"),
+        ("x", "<i2"),
+        ("y", "<i2"),
+        ("belt_x", "<i2"),
+        ("belt_y", "<i2"),
+        ("order", "<i8"),
+    ]
+)
+# Number of events before each tick (and after the last one).
+OFFSET: np.dtype = np.dtype("<i8")
+# Suffixes of the files of a trace, besides its ``.json`` header.
+_FILES: dict[str, np.dtype] = {
+    "frames": FRAME, "events": EVENT, "offsets": OFFSET
+}
+
+
+class TraceRecorder:
+    """
+    Records a run of `ConsoleSimulator` (see its `run_headless`) tick by tick:
+    the location and phase of each robot, and the package events.
+
+    Records are buffered in chunks of `chunk_ticks` ticks, then appended to
+    raw binary files of NumPy structured arrays, which `Trace` memory-maps.
+    A JSON header, rewritten after each chunk, holds the map, the resting
+    locations and the length of the arrays, so that a trace can be read
+    while (or after) it is recorded.
+    """
+
+    def __init__(self, path: str, chunk_ticks: int = 1024) -> None:
+        """
+        :param path: Prefix of the trace files.
+        :param chunk_ticks: Number of ticks buffered before each write.
+        """
+        self.path: str = path
+        self.chunk_ticks: int = chunk_ticks
+        self.ticks: int = 0
+        self.n_events: int = 0
+        self._header: dict[str, any] = {}
+        self._frames: np.ndarray = np.empty((0, 0), FRAME)
+        # Records of the current chunk.
+        self._buffered: int = 0
+        self._events: list[tuple] = []
+        self._offsets: list[int] = []
+        # Robot carrying each package picked up, for its delivery.
+        self._carriers: dict[Package, int] = {}
+
+    def start(
+        self,
+        grid: list[str],
+        rests: list[Location2D],
+        n_robots: int,
+    ) -> None:
+        """
+        Starts a new trace (replacing any previous one in `path`), for a run
+        on `grid` with `n_robots` robots.
+        """
+        self.ticks, self.n_events, self._buffered = 0, 0, 0
+        self._header = {
+            "map": grid,
+            "rests": [list(rest) for rest in rests],
+            "n_robots": n_robots,
+        }
+        self._frames = np.empty((self.chunk_ticks, n_robots), FRAME)
+        self._events, self._offsets, self._carriers = [], [0], {}
+        for name in _FILES:
+            open(f"{self.path}.{name}.bin", "wb").close()
+        self.flush()
+
+    def event(
+        self,
+        kind: TraceEvent,
+        package: Package,
+        robot: int = -1,
+    ) -> None:
+        """
+        Records an event of `package` in the current tick. Deliveries default
+        to the robot that picked the package up.
+        """
+        if kind == TraceEvent.PICKUP:
+            self._carriers[package] = robot
+        elif kind == TraceEvent.DELIVERY:
+            carrier: int = self._carriers.pop(package, -1)
+            robot = carrier if robot < 0 else robot
+        (x, y), (belt_x, belt_y) = package.location, package.destination
+        self._events.append(
+            (self.ticks, kind, robot, x, y, belt_x, belt_y, package.order)
+        )
+
+    def frame(self, fleet: Fleet) -> None:
+        """
+        Records the state of `fleet` at the end of the current tick, and moves
+        on to the next one.
+        """
+        frame: np.ndarray = self._frames[self._buffered]
+        frame["x"], frame["y"] = fleet.xs, fleet.ys
+        frame["phase"] = fleet.phases
+        self._buffered += 1
+        self.ticks += 1
+        self._offsets.append(self.n_events + len(self._events))
+        if self._buffered == self.chunk_ticks:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Appends the buffered records to the trace files, and updates the
+        header.
+        """
+        chunks: dict[str, np.ndarray] = {
+            "frames": self._frames[:self._buffered],
+            "events": np.array(self._events, EVENT),
+            "offsets": np.array(self._offsets, OFFSET),
+        }
+        for name, chunk in chunks.items():
+            with open(f"{self.path}.{name}.bin", "ab") as file:
+                file.write(chunk.tobytes())
+        self.n_events += len(self._events)
+        self._buffered, self._events, self._offsets = 0, [], []
+        header: dict[str, any] = {
+            **self._header, "ticks": self.ticks, "events": self.n_events
+        }
+        tmp_path: str = f"{self.path}.json.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(header, file)
+        os.replace(tmp_path, f"{self.path}.json")
+
+
+class Trace:
+    """
+    Recorded run (see `TraceRecorder`), memory-mapped for replaying or
+    analyzing it without running the planners again. The robots and events
+    of any tick are found in O(1); the packages waiting are found after a
+    single pass over the events, done on the first call.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        :param path: Prefix of the trace files.
+        """
+        with open(f"{path}.json") as file:
+            header: dict[str, any] = json.load(file)
+        self.map: list[str] = header["map"]
+        self.rests: list[Location2D] = [
+            Location2D(*rest) for rest in header["rests"]
+        ]
+        self.n_robots: int = header["n_robots"]
+        self.ticks: int = header["ticks"]
+        # Arrays, only covering the ticks in the header.
+        self.frames: np.ndarray = _map(
+            f"{path}.frames.bin", FRAME, (self.ticks, self.n_robots)
+        )
+        self.events: np.ndarray = _map(
+            f"{path}.events.bin", EVENT, (header["events"],)
+        )
+        self.offsets: np.ndarray = _map(
+            f"{path}.offsets.bin", OFFSET, (self.ticks + 1,)
+        )
+        self._renderer: TerminalRenderer | None = None
+        # Packages waiting for each tick (see `_waiting_intervals`).
+        self._waiting: tuple[np.ndarray, ...] | None = None
+
+    def robots(self, tick: int) -> list[Location2D]:
+        """
+        Returns the location of each robot after `tick`.
+        """
+        frame: np.ndarray = self.frames[tick]
+        return [
+            Location2D(x, y)
+            for x, y in zip(frame["x"].tolist(), frame["y"].tolist())
+        ]
+
+    def phases(self, tick: int) -> list[Phase]:
+        """
+        Returns the phase of each robot after `tick`.
+        """
+        return [Phase(phase) for phase in self.frames[tick]["phase"].tolist()]
+
+    def tick_events(self, tick: int) -> np.ndarray:
+        """
+        Returns the package events of `tick`.
+        """
+        return self.events[self.offsets[tick]:self.offsets[tick + 1]]
+
+    def packages(self, tick: int) -> list[Location2D]:
+        """
+        Returns the racks of the packages created but not picked up yet after
+        `tick`, as drawn by `ConsoleSimulator`.
+        """
+        if self._waiting is None:
+            self._waiting = self._waiting_intervals()
+        xs, ys, starts, ends = self._waiting
+        waiting: np.ndarray = (starts <= tick) & (tick < ends)
+        return [
+            Location2D(x, y)
+            for x, y in zip(xs[waiting].tolist(), ys[waiting].tolist())
+        ]
+
+    def render(self, tick: int) -> str:
+        """
+        Returns the frame of `tick`, as drawn by `TerminalRenderer`.
+        """
+        if self._renderer is None:
+            self._renderer = TerminalRenderer(self.map, self.rests)
+        return self._renderer.frame(self.packages(tick), self.robots(tick))
+
+    def deliveries(self) -> np.ndarray:
+        """
+        Returns the number of deliveries in each tick.
+        """
+        kinds: np.ndarray = self.events["kind"]
+        ticks: np.ndarray = self.events["tick"][kinds == TraceEvent.DELIVERY]
+        return np.bincount(ticks, minlength=self.ticks)
+
+    def latencies(self) -> np.ndarray:
+        """
+        Returns the ticks elapsed between the creation and delivery of each
+        delivered package, in delivery order.
+        """
+        # Creation tick of each package in flight.
+        created: dict[tuple, int] = {}
+        latencies: list[int] = []
+        for key, kind, tick in zip(
+            _keys(self.events),
+            self.events["kind"].tolist(),
+            self.events["tick"].tolist(),
+        ):
+            if kind == TraceEvent.CREATE:
+                created[key] = tick
+            elif kind == TraceEvent.DELIVERY:
+                latencies.append(tick - created.pop(key))
+        return np.array(latencies, np.int64)
+
+    def _waiting_intervals(self) -> tuple[np.ndarray, ...]:
+        """
+        Returns the rack of each created package, along with the first tick
+        it is waiting after and the tick it is picked up (the trace's length
+        if never), for `packages`.
+        """
+        # Index of each package waiting, by key, in the lists below.
+        waiting: dict[tuple, int] = {}
+        xs, ys, starts, ends = [], [], [], []
+        for key, kind, tick in zip(
+            _keys(self.events),
+            self.events["kind"].tolist(),
+            self.events["tick"].tolist(),
+        ):
+            if kind == TraceEvent.CREATE:
+                waiting[key] = len(starts)
+                xs.append(key[0])
+                ys.append(key[1])
+                starts.append(tick)
+                ends.append(self.ticks)
+            elif kind == TraceEvent.PICKUP:
+                ends[waiting.pop(key)] = tick
+        return tuple(np.array(values) for values in (xs, ys, starts, ends))
+
+
+def _keys(events: np.ndarray) -> list[tuple]:
+    """
+    Returns the package of each event, as ``(x, y, belt_x, belt_y, order)``.
+    """
+    return events[["x", "y", "belt_x", "belt_y", "order"]].tolist()
+
+
+def _map(path: str, dtype: np.dtype, shape: tuple[int, ...]) -> np.ndarray:
+    """
+    Memory-maps the first records of the raw array in `path`.
+    """
+    if not np.prod(shape):
+        return np.empty(shape, dtype)
+    return np.memmap(path, dtype, "r", shape=shape)
+
+
+if __name__ == "__main__":
+    # Usage: python traces.py <trace> [tick]
+    trace: Trace = Trace(sys.argv[1])
+    tick: int = int(sys.argv[2]) if len(sys.argv) > 2 else trace.ticks - 1
+    print(trace.render(tick))
+    deliveries: int = int(trace.deliveries()[:tick + 1].sum())
+    print(f"tick {tick + 1}/{trace.ticks}, {deliveries} deliveries")
@@ -7,8 +7,183 @@ from problems import Successor
 
 
 class PriorityQueue:
+    """
+    Defines an indexed binary Priority (Min) Queue.
+
+    Keeps track of each item's position in the heap, so that updating the
+    priority of an existing item (decrease-key) takes O(log n) time.
+    """
+
+    def __init__(self, initial: any = None, priority: float = 0.0) -> None:
+        """
+        :param initial: Optional, to avoid 2-line initialization.
+        """
+        # Elements are: ``(priority, padding, item)``
+        self._queue: list[tuple[float, int, any]] = []
+        # Position of each item in `_queue`.
+        self._index: dict[any, int] = {}
+        self._padding: int = 0
+        if initial:
+            self.update(initial, priority)
+
+    def pop(self) -> any:
+        """
+        Removes the element with the minimum priority from the queue, returning
+        such element.
+        """
+        last: tuple[float, int, any] = self._queue.pop()
+        if not self._queue:
+            del self._index[last[2]]
+            return last[2]
+        _, _, item = self._queue[0]
+        del self._index[item]
+        self._queue[0] = last
+        self._index[last[2]] = 0
+        self._sift_down(0)
+        return item
+
+    def update(self, item: any, priority: float) -> None:
+        """
+        Inserts a new `item` into the queue, or updates its priority if it
+        already exists with a higher one.
+        """
+        if (i := self._index.get(item)) is not None:
+            if priority < self._queue[i][0]:
+                self._queue[i] = (priority, self._queue[i][1], item)
+                self._sift_up(i)
+            return
+        self._queue.append((priority, self._padding, item))
+        self._index[item] = len(self._queue) - 1
+        self._padding += 1
+        self._sift_up(len(self._queue) - 1)
+
+    def remove(self, item: any) -> None:
+        """
+        Removes `item` from the queue, if present.
+        """
+        if (i := self._index.pop(item, None)) is None:
+            return
+        last: tuple[float, int, any] = self._queue.pop()
+        if i < len(self._queue):
+            self._queue[i] = last
+            self._index[last[2]] = i
+            self._sift_down(i)
+            self._sift_up(self._index[last[2]])
+
+    def set(self, item: any, priority: float) -> None:
+        """
+        Inserts a new `item` into the queue, or changes its priority (either
+        up or down) if it already exists.
+        """
+        if (i := self._index.get(item)) is None:
+            self.update(item, priority)
+            return
+        self._queue[i] = (priority, self._queue[i][1], item)
+        self._sift_down(i)
+        self._sift_up(self._index[item])
+
+    def _sift_down(self, i: int) -> None:
+        """
+        Moves the element at position `i` down until the heap invariant holds.
+        """
+        queue, index = self._queue, self._index
+        n: int = len(queue)
+        entry: tuple[float, int, any] = queue[i]
+        while (child := 2 * i + 1) < n:
+            if child + 1 < n and queue[child + 1] < queue[child]:
+                child += 1
+            if not queue[child] < entry:
+                break
+            queue[i] = queue[child]
+            index[queue[i][2]] = i
+            i = child
+        queue[i] = entry
+        index[entry[2]] = i
+
+    def _sift_up(self, i: int) -> None:
+        """
+        Moves the element at position `i` up until the heap invariant holds.
+        """
+        queue, index = self._queue, self._index
+        entry: tuple[float, int, any] = queue[i]
+        while i > 0:
+            parent: int = (i - 1) // 2
+            if not entry < queue[parent]:
+                break
+            queue[i] = queue[parent]
+            index[queue[i][2]] = i
+            i = parent
+        queue[i] = entry
+        index[entry[2]] = i
+
+    def __bool__(self) -> bool:
+        return bool(self._queue)
+
+    def __contains__(self, item: any) -> bool:
+        return item in self._index
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+
+class LazyPriorityQueue:
+    """
+    Defines a Priority (Min) Queue with lazy deletion.
+
+    Priority updates push a new entry instead of moving the existing one, and
+    outdated entries are discarded when they reach the top of the heap. This
+    trades some memory for cheaper updates.
+    """
+
+    def __init__(self, initial: any = None, priority: float = 0.0) -> None:
+        """
+        :param initial: Optional, to avoid 2-line initialization.
+        """
+        # Elements are: ``(priority, padding, item)``
+        self._queue: list[tuple[float, int, any]] = []
+        # Current (best) priority of each item in the queue.
+        self._priorities: dict[any, float] = {}
+        self._padding: int = 0
+        if initial:
+            self.update(initial, priority)
+
+    def pop(self) -> any:
+        """
+        Removes the element with the minimum priority from the queue, returning
+        such element.
+        """
+        while True:
+            priority, _, item = heapq.heappop(self._queue)
+            if self._priorities.get(item) == priority:
+                del self._priorities[item]
+                return item
+
+    def update(self, item: any, priority: float) -> None:
+        """
+        Inserts a new `item` into the queue, or updates its priority if it
+        already exists with a higher one.
+        """
+        if priority < self._priorities.get(item, float("inf")):
+            self._priorities[item] = priority
+            heapq.heappush(self._queue, (priority, self._padding, item))
+            self._padding += 1
+
+    def __bool__(self) -> bool:
+        return bool(self._priorities)
+
+    def __contains__(self, item: any) -> bool:
+        return item in self._priorities
+
+    def __len__(self) -> int:
+        return len(self._priorities)
+
+
+class LinearPriorityQueue:
     """
     Defines a minimalistic Priority (Min) Queue.
+
+    Updates scan the whole queue and re-heapify it, taking O(n) time. Kept as
+    a reference for benchmarking purposes; prefer `PriorityQueue`.
     """
 
     def __init__(self, initial: any = None, priority: float = 0.0) -> None: